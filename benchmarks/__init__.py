@@ -0,0 +1,20 @@
+from core import conexion, database
+
+def crear_base(ruta, productos, cantidad=100, precio=1.5, categoria="Otros", codigos_por_producto=0):
+    """Crea una base temporal en `ruta` con `productos` productos y la deja como base del proceso.
+
+    `cantidad` y `precio` pueden ser un valor fijo o una función del número de
+    producto (desde 0). Con `codigos_por_producto` se asignan códigos EAN-13
+    `779...` consecutivos. Los datos propios de cada benchmark se cargan después.
+    """
+    def valor(dato, i):
+        return dato(i) if callable(dato) else dato
+
+    conexion.configurar_ruta_db(ruta)
+    database.inicializar_db()
+    with database.conectar_db() as conn:
+        conn.executemany("INSERT INTO productos (nombre, categoria, cantidad, precio) VALUES (?, ?, ?, ?)",
+                         ((f"Producto {i}", categoria, valor(cantidad, i), valor(precio, i)) for i in range(productos)))
+        conn.executemany("INSERT INTO codigos_producto (codigo, producto_id) VALUES (?, ?)",
+                         ((f"779{i * codigos_por_producto + j:010d}", i + 1)
+                          for i in range(productos) for j in range(codigos_por_producto)))
@@ -0,0 +1,160 @@
+"""Prueba de carga del servidor JSON: pedidos por segundo y latencia p50/p99 por operación.
+
+Uso: python -m benchmarks.bench_api [--productos N] [--clientes N] [--segundos S]
+                                    [--cobros F] [--busquedas F] [--lote-escrituras N [N ...]]
+
+Genera una base con `benchmarks.generador`, levanta `cli.py serve` en localhost
+en otro proceso y simula `--clientes` cajas con conexiones keep-alive: cada una
+inicia sesión y después consulta productos por ID, busca (fracción `--busquedas`)
+o cobra tickets de 1 a 5 líneas (fracción `--cobros`). Se corre una vez por cada
+valor de `--lote-escrituras` para comparar un commit por cobro con los cobros agrupados.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generador import PASSWORD_PREDETERMINADA, generar
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cli.py")
+BUSQUEDAS = ("arroz", "cafe", "agua", "jabon", "chocolate", "pilas", "yerba", "vino")
+
+class ConexionHTTP:
+    """Cliente HTTP/1.1 keep-alive mínimo sobre asyncio (solo lo que usa la prueba)."""
+
+    def __init__(self, lector, escritor):
+        self.lector = lector
+        self.escritor = escritor
+        self.token = None
+
+    @classmethod
+    async def abrir(cls, puerto):
+        return cls(*await asyncio.open_connection("127.0.0.1", puerto))
+
+    async def pedir(self, metodo, ruta, datos=None):
+        cuerpo = json.dumps(datos).encode("utf-8") if datos is not None else b""
+        cabeceras = f"{metodo} {ruta} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(cuerpo)}\r\n"
+        if self.token:
+            cabeceras += f"Authorization: Bearer {self.token}\r\n"
+        self.escritor.write(cabeceras.encode("latin-1") + b"\r\n" + cuerpo)
+        estado = int((await self.lector.readline()).split()[1])
+        largo = 0
+        while (linea := await self.lector.readline()) not in (b"\r\n", b""):
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            if nombre.lower() == "content-length":
+                largo = int(valor)
+        return estado, json.loads(await self.lector.readexactly(largo))
+
+    def cerrar(self):
+        self.escritor.close()
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def esperar_servidor(puerto, proceso, limite=30.0):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if proceso.poll() is not None:
+            raise RuntimeError("El servidor terminó al arrancar.")
+        try:
+            socket.create_connection(("127.0.0.1", puerto), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("El servidor no respondió a tiempo.")
+
+async def caja(numero, puerto, productos, args, fin, latencias):
+    conexion = await ConexionHTTP.abrir(puerto)
+    estado, respuesta = await conexion.pedir("POST", "/sesiones", {"usuario": f"cajero{numero}",
+                                                                   "password": PASSWORD_PREDETERMINADA})
+    if estado != 201:
+        raise RuntimeError(f"cajero{numero} no pudo iniciar sesión: {respuesta}")
+    conexion.token = respuesta["token"]
+    while time.perf_counter() < fin:
+        azar = random.random()
+        if azar < args.cobros:
+            operacion = "cobro"
+            lineas = [{"producto_id": random.randint(1, productos), "cantidad": 1} for _ in range(random.randint(1, 5))]
+            pedido = ("POST", "/ventas", {"lineas": lineas})
+        elif azar < args.cobros + args.busquedas:
+            operacion = "búsqueda"
+            pedido = ("GET", f"/productos/buscar?texto={random.choice(BUSQUEDAS)}&limit=20", None)
+        else:
+            operacion = "producto por ID"
+            pedido = ("GET", f"/productos/{random.randint(1, productos)}", None)
+        inicio = time.perf_counter()
+        estado, _ = await conexion.pedir(*pedido)
+        latencias.setdefault(operacion, []).append(time.perf_counter() - inicio)
+        if estado >= 500:
+            latencias.setdefault("errores", []).append(0.0)
+    conexion.cerrar()
+
+def percentil(valores, p):
+    return valores[min(int(len(valores) * p), len(valores) - 1)]
+
+async def carga(puerto, productos, args):
+    latencias = {}
+    inicio = time.perf_counter()
+    fin = inicio + args.segundos
+    await asyncio.gather(*(caja(i, puerto, productos, args, fin, latencias) for i in range(1, args.clientes + 1)))
+    duracion = time.perf_counter() - inicio
+    conexion = await ConexionHTTP.abrir(puerto)
+    _, estado = await conexion.pedir("GET", "/estado")
+    conexion.cerrar()
+    return latencias, duracion, estado
+
+def imprimir(latencias, duracion, estado):
+    errores = len(latencias.pop("errores", []))
+    todas = sorted(t for valores in latencias.values() for t in valores)
+    print(f"  {'operación':<18} {'pedidos':>9} {'pedidos/s':>11} {'p50 ms':>8} {'p99 ms':>8}")
+    for operacion, valores in sorted(latencias.items()) + [("total", todas)]:
+        valores = sorted(valores)
+        print(f"  {operacion:<18} {len(valores):>9,} {len(valores) / duracion:>11,.0f} "
+              f"{percentil(valores, 0.5) * 1000:>8.2f} {percentil(valores, 0.99) * 1000:>8.2f}")
+    lotes = estado["lotes_escritura"] or 1
+    print(f"  escrituras: {estado['escrituras']:,} en {estado['lotes_escritura']:,} transacciones "
+          f"({estado['escrituras'] / lotes:.1f} por commit); errores 5xx: {errores}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--productos", type=int, default=10_000)
+    parser.add_argument("--clientes", type=int, default=32, help="cajas simultáneas")
+    parser.add_argument("--segundos", type=float, default=10.0)
+    parser.add_argument("--cobros", type=float, default=0.2, help="fracción de pedidos que son cobros")
+    parser.add_argument("--busquedas", type=float, default=0.1, help="fracción de pedidos que son búsquedas")
+    parser.add_argument("--lectores", type=int, default=4)
+    parser.add_argument("--lote-escrituras", type=int, nargs="+", default=[1, 256])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "bench.db")
+        generar(ruta, productos=args.productos, usuarios=args.clientes + 1, ventas=0, iteraciones=1_000)
+        # Mismo costo que los hashes generados: ningún inicio de sesión dispara un rehash
+        entorno = dict(os.environ, ORDICO_HASH_ITERACIONES="1000")
+        for lote in args.lote_escrituras:
+            puerto = puerto_libre()
+            proceso = subprocess.Popen(
+                [sys.executable, CLI, "--db", ruta, "--log", "WARNING", "serve", "--puerto", str(puerto),
+                 "--lectores", str(args.lectores), "--lote-escrituras", str(lote)],
+                cwd=directorio, env=entorno)
+            try:
+                esperar_servidor(puerto, proceso)
+                latencias, duracion, estado = asyncio.run(carga(puerto, args.productos, args))
+            finally:
+                proceso.terminate()
+                proceso.wait()
+            print(f"\n{args.clientes} cajas, {args.segundos:.0f} s, {args.lectores} lectores, "
+                  f"hasta {lote} escrituras por transacción")
+            imprimir(latencias, duracion, estado)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
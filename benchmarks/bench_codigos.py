@@ -0,0 +1,52 @@
+"""Mide la latencia de `obtener_producto_por_codigo` con un catálogo grande de códigos.
+
+Uso: python -m benchmarks.bench_codigos [--productos N] [--codigos-por-producto N] [--lecturas N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks import crear_base
+from core import conexion
+from core.codigos import obtener_producto_por_codigo, precargar_codigos
+
+def medir(codigos):
+    """Devuelve las latencias, en microsegundos, de cada lectura."""
+    latencias = []
+    for codigo in codigos:
+        inicio = time.perf_counter()
+        producto = obtener_producto_por_codigo(codigo)
+        latencias.append((time.perf_counter() - inicio) * 1e6)
+        assert producto is not None, codigo
+    latencias.sort()
+    return latencias
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--productos", type=int, default=250_000)
+    parser.add_argument("--codigos-por-producto", type=int, default=2)
+    parser.add_argument("--lecturas", type=int, default=50_000)
+    args = parser.parse_args(argv)
+    total_codigos = args.productos * args.codigos_por_producto
+
+    with tempfile.TemporaryDirectory() as directorio:
+        crear_base(os.path.join(directorio, "bench.db"), args.productos, codigos_por_producto=args.codigos_por_producto)
+        inicio = time.perf_counter()
+        precargar_codigos()
+        carga = time.perf_counter() - inicio
+        codigos = [f"779{random.randrange(total_codigos):010d}" for _ in range(args.lecturas)]
+        latencias = medir(codigos)
+        conexion.cerrar_conexiones()
+
+    def percentil(p):
+        return latencias[min(len(latencias) - 1, int(len(latencias) * p))]
+
+    print(f"obtener_producto_por_codigo ({total_codigos:,} códigos, {args.lecturas:,} lecturas)")
+    print(f"  precarga de códigos : {carga * 1000:>8.0f} ms")
+    print(f"  p50                 : {percentil(0.50):>8.1f} µs")
+    print(f"  p99                 : {percentil(0.99):>8.1f} µs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Compara `obtener_producto_por_id` abriendo una conexión por llamada vs. la conexión persistente.
+
+Uso: python -m benchmarks.bench_conexion [--productos N] [--llamadas N]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from benchmarks import crear_base
+from core import conexion, database
+
+def medir(llamadas, cantidad):
+    ids = [random.randint(1, cantidad) for _ in range(llamadas)]
+    inicio = time.perf_counter()
+    for id_producto in ids:
+        database.obtener_producto_por_id(id_producto)
+    return llamadas / (time.perf_counter() - inicio)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--productos", type=int, default=10_000)
+    parser.add_argument("--llamadas", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "bench.db")
+        crear_base(ruta, args.productos, cantidad=lambda i: i % 100, precio=lambda i: i * 1.5)
+
+        # Comportamiento anterior: una conexión nueva por llamada
+        with mock.patch.object(database, "conectar_db", lambda: sqlite3.connect(ruta)):
+            antes = medir(args.llamadas, args.productos)
+        despues = medir(args.llamadas, args.productos)
+        conexion.cerrar_conexiones()
+
+    print(f"obtener_producto_por_id ({args.productos} productos, {args.llamadas} llamadas)")
+    print(f"  conexión por llamada : {antes:>10,.0f} llamadas/s")
+    print(f"  conexión persistente : {despues:>10,.0f} llamadas/s  (x{despues / antes:.1f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Compara enviar N correos con una conexión SMTP por correo vs. la bandeja de salida.
+
+Uso: python -m benchmarks.bench_correo [--correos N] [--latencia SEGUNDOS] [--rechazados N]
+
+Levanta un servidor SMTP local mínimo (sin TLS ni login) que simula con
+`--latencia` el costo de cada conexión (saludo, STARTTLS y autenticación). Con
+`--rechazados` esa cantidad de destinatarios recibe un 550, para comprobar que
+terminan como `fallido` sin frenar al resto.
+"""
+import argparse
+import logging
+import os
+import smtplib
+import socketserver
+import tempfile
+import threading
+import time
+
+from benchmarks import crear_base
+from core import conexion
+from core.email_service import EnviadorCorreos, construir_mensaje, encolar_correos, estado_bandeja
+from utils import config
+
+class ServidorSMTP(socketserver.ThreadingTCPServer):
+    """Servidor SMTP de prueba: acepta todo salvo los destinatarios que empiezan con `rechazar`."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latencia):
+        super().__init__(("127.0.0.1", 0), ManejadorSMTP)
+        self.latencia = latencia
+        self.conexiones = 0
+        self.mensajes = 0
+        self._lock = threading.Lock()
+
+    def anotar(self, conexiones=0, mensajes=0):
+        with self._lock:
+            self.conexiones += conexiones
+            self.mensajes += mensajes
+
+class ManejadorSMTP(socketserver.StreamRequestHandler):
+    def responder(self, linea):
+        self.wfile.write(f"{linea}\r\n".encode("ascii"))
+
+    def handle(self):
+        self.server.anotar(conexiones=1)
+        time.sleep(self.server.latencia)
+        self.responder("220 localhost ESMTP prueba")
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            comando = linea.decode("utf-8", "replace").strip()
+            verbo = comando[:4].upper()
+            if verbo in ("EHLO", "HELO"):
+                self.responder("250 localhost")
+            elif verbo == "MAIL" or verbo == "RSET" or verbo == "NOOP":
+                self.responder("250 OK")
+            elif verbo == "RCPT":
+                self.responder("550 Buzon inexistente" if "<rechazar" in comando else "250 OK")
+            elif verbo == "DATA":
+                self.responder("354 Fin con <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                self.server.anotar(mensajes=1)
+                self.responder("250 OK")
+            elif verbo == "QUIT":
+                self.responder("221 Adios")
+                return
+            else:
+                self.responder("502 No implementado")
+
+def enviar_uno_por_conexion(correos):
+    """Lo que hacía `enviar_correo`: conectar, enviar y cerrar por cada correo."""
+    for destinatario, asunto, mensaje in correos:
+        try:
+            with smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT) as server:
+                server.sendmail(config.EMAIL_ADDRESS, destinatario, construir_mensaje(destinatario, asunto, mensaje).as_string())
+        except smtplib.SMTPException:
+            pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--correos", type=int, default=1_000)
+    parser.add_argument("--latencia", type=float, default=0.02, help="segundos de saludo por conexión")
+    parser.add_argument("--rechazados", type=int, default=10)
+    args = parser.parse_args(argv)
+    logging.disable(logging.ERROR)
+
+    servidor = ServidorSMTP(args.latencia)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    config.SMTP_SERVER, config.SMTP_PORT = servidor.server_address
+    config.SMTP_TLS, config.EMAIL_PASSWORD = "ninguno", ""
+
+    correos = [(f"cliente{i}@ordico.test", f"Ticket {i}", f"Gracias por su compra n.º {i}.")
+               for i in range(args.correos - args.rechazados)]
+    correos += [(f"rechazar{i}@ordico.test", "Stock bajo", "Producto por agotarse.") for i in range(args.rechazados)]
+
+    inicio = time.perf_counter()
+    enviar_uno_por_conexion(correos)
+    directo = time.perf_counter() - inicio
+    conexiones_directo, mensajes_directo = servidor.conexiones, servidor.mensajes
+    servidor.conexiones = servidor.mensajes = 0
+
+    with tempfile.TemporaryDirectory() as directorio:
+        crear_base(os.path.join(directorio, "bench.db"), 0)
+        inicio = time.perf_counter()
+        encolar_correos(correos)
+        encolado = time.perf_counter() - inicio
+        enviador = EnviadorCorreos()
+        while enviador.procesar_pendientes()["enviados"] or estado_bandeja()["pendiente"]:
+            pass
+        enviador._cerrar_smtp()
+        bandeja = time.perf_counter() - inicio
+        estado = estado_bandeja()
+        conexion.cerrar_conexiones()
+    servidor.shutdown()
+
+    print(f"{args.correos:,} correos, {args.latencia * 1000:.0f} ms de saludo por conexión")
+    print(f"  una conexión por correo : {args.correos / directo:>8,.0f} correos/s  "
+          f"({conexiones_directo:,} conexiones, {mensajes_directo:,} aceptados)")
+    print(f"  bandeja de salida       : {args.correos / bandeja:>8,.0f} correos/s  "
+          f"({servidor.conexiones:,} conexiones, {servidor.mensajes:,} aceptados)")
+    print(f"  encolar {args.correos:,} correos     : {encolado * 1000:>8,.1f} ms")
+    print(f"  estado final de la bandeja: {estado}")
+
+if __name__ == "__main__":
+    main()
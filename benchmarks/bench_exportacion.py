@@ -0,0 +1,43 @@
+"""Mide filas/s y memoria de `exportar_ventas` a CSV y XLSX para distintos volúmenes.
+
+Uso: python -m benchmarks.bench_exportacion [--filas N [N ...]] [--formatos csv xlsx]
+"""
+import argparse
+import os
+import resource
+import tempfile
+
+from benchmarks import crear_base
+from core import conexion, database
+from core.exportacion import exportar_ventas
+
+def cargar_ventas(filas):
+    """Agrega `filas` líneas de venta sobre los 1.000 productos de la base."""
+    with database.conectar_db() as conn:
+        conn.executemany("""
+            INSERT INTO ventas (ticket_id, usuario_id, producto_id, cantidad, precio_unitario, fecha)
+            VALUES (?, 1, ?, 1, 1.5, ?)
+        """, ((f"t{i // 10}", i % 1000 + 1, f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d} 12:00:00")
+              for i in range(filas)))
+
+def rss_maximo_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--formatos", nargs="+", default=["csv", "xlsx"], choices=["csv", "xlsx"])
+    args = parser.parse_args(argv)
+
+    print(f"{'filas':>10} {'formato':>8} {'filas/s':>10} {'RSS máx. (MB)':>14}")
+    for filas in args.filas:
+        with tempfile.TemporaryDirectory() as directorio:
+            crear_base(os.path.join(directorio, "bench.db"), 1000)
+            cargar_ventas(filas)
+            for formato in args.formatos:
+                resultado = exportar_ventas(os.path.join(directorio, f"ventas.{formato}"))
+                print(f"{filas:>10,} {formato:>8} {resultado['filas_por_segundo']:>10,.0f} {rss_maximo_mb():>14.0f}")
+            conexion.cerrar_conexiones()
+
+if __name__ == "__main__":
+    main()
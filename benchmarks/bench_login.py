@@ -0,0 +1,63 @@
+"""Mide inicios de sesión por segundo con muchos usuarios (búsqueda, verificación y usuarios inexistentes).
+
+Uso: python -m benchmarks.bench_login [--usuarios N] [--intentos N] [--iteraciones N]
+
+La base se crea con `benchmarks.generador`. Con el valor por defecto de
+`--iteraciones` (1) el hash casi no cuesta y lo medido es la búsqueda del
+usuario; con el costo real (`config.HASH_ITERACIONES`) domina el PBKDF2.
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.generador import PASSWORD_PREDETERMINADA, generar
+from core import auth, conexion, usuarios
+from utils import config
+
+def medir(nombre, operacion, entradas):
+    inicio = time.perf_counter()
+    for entrada in entradas:
+        operacion(entrada)
+    duracion = time.perf_counter() - inicio
+    print(f"  {nombre:<48} {len(entradas) / duracion:>12,.0f} /s")
+
+def busqueda_anterior(entrada):
+    """Lo que hacía `autenticar_usuario` antes: email y, si no estaba, nombre (dos consultas)."""
+    return usuarios.obtener_usuario_por_email(entrada) or usuarios.obtener_usuario_por_nombre(entrada)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--usuarios", type=int, default=100_000)
+    parser.add_argument("--intentos", type=int, default=20_000)
+    parser.add_argument("--iteraciones", type=int, default=1, help="iteraciones PBKDF2 de los hashes guardados")
+    args = parser.parse_args(argv)
+    # Mismo costo que los hashes generados: así ningún inicio de sesión dispara un rehash
+    config.HASH_ITERACIONES = args.iteraciones
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        generar(os.path.join(directorio, "bench.db"), productos=0, usuarios=args.usuarios, ventas=0,
+                iteraciones=args.iteraciones)
+        nombres = [f"cajero{random.randrange(1, args.usuarios)}" for _ in range(args.intentos)]
+        emails = [f"{nombre}@ordico.test" for nombre in nombres]
+        inexistentes = [f"fantasma{random.randrange(20)}" for _ in range(args.intentos)]
+
+        print(f"{args.usuarios:,} usuarios, {args.iteraciones:,} iteraciones PBKDF2")
+        medir("búsqueda por nombre (email o nombre, 2 consultas)", busqueda_anterior, nombres)
+        medir("búsqueda por nombre (obtener_usuario_para_login)", usuarios.obtener_usuario_para_login, nombres)
+        medir("búsqueda por email (obtener_usuario_para_login)", usuarios.obtener_usuario_para_login, emails)
+        medir("autenticar_usuario por nombre", lambda n: auth.autenticar_usuario(n, PASSWORD_PREDETERMINADA), nombres)
+        medir("autenticar_usuario por email", lambda e: auth.autenticar_usuario(e, PASSWORD_PREDETERMINADA), emails)
+        medir("autenticar_usuario con clave incorrecta", lambda n: auth.autenticar_usuario(n, "incorrecta"), nombres)
+        auth.olvidar_inexistentes()
+        medir("usuario inexistente (con caché negativa)", lambda n: auth.autenticar_usuario(n, "x"), inexistentes)
+        config.AUTH_TTL_INEXISTENTES = 0
+        auth.olvidar_inexistentes()
+        medir("usuario inexistente (sin caché negativa)", lambda n: auth.autenticar_usuario(n, "x"), inexistentes)
+        conexion.cerrar_conexiones()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Compara editar un producto en la vista de stock parcheando la fila contra recargar la tabla.
+
+Uso: python -m benchmarks.bench_stock [--productos N] [--cargadas N] [--ediciones N]
+
+Crea una base temporal con `--productos` productos, muestra `ModeloProductos` en
+una `QTableView` (sin pantalla) con `--cargadas` filas ya leídas y mide, para
+varias columnas de orden, `aplicar_cambios` con la fila que devuelve
+`actualizar_producto` frente a `recargar()` más volver a leer las mismas filas.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication, QTableView
+
+from benchmarks import crear_base
+from core import conexion, database
+from gui.modelos import ModeloProductos
+
+def cargar(modelo, filas, app):
+    while modelo.rowCount() < filas and modelo.canFetchMore():
+        modelo.fetchMore()
+    app.processEvents()
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(int(len(valores) * p), len(valores) - 1)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--productos", type=int, default=100_000)
+    parser.add_argument("--cargadas", type=int, default=100_000, help="filas leídas en la vista")
+    parser.add_argument("--ediciones", type=int, default=200)
+    parser.add_argument("--recargas", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as directorio:
+        crear_base(os.path.join(directorio, "bench.db"), args.productos, cantidad=lambda i: random.randint(0, 500),
+                   precio=lambda i: random.randint(100, 99_999) / 100)
+        modelo = ModeloProductos(tamano_pagina=1000)
+        vista = QTableView()
+        vista.setModel(modelo)
+        vista.setSortingEnabled(True)
+        vista.show()
+        print(f"Vista de stock: {args.productos:,} productos, {args.cargadas:,} filas cargadas")
+        print(f"  {'orden':<10} {'edición p50':>12} {'edición p99':>12} {'recarga':>10}")
+        for columna in (0, 1, 4):
+            vista.sortByColumn(columna, Qt.AscendingOrder)
+            cargar(modelo, args.cargadas, app)
+            tiempos = []
+            for _ in range(args.ediciones):
+                id_producto, nombre, cantidad, _, categoria = modelo.producto(random.randrange(modelo.rowCount()))
+                fila = database.actualizar_producto(id_producto, nombre, categoria, cantidad,
+                                                    random.randint(100, 99_999) / 100)
+                inicio = time.perf_counter()
+                modelo.aplicar_cambios([fila])
+                app.processEvents()
+                tiempos.append(time.perf_counter() - inicio)
+            recargas = []
+            for _ in range(args.recargas):
+                inicio = time.perf_counter()
+                modelo.recargar()
+                cargar(modelo, args.cargadas, app)
+                recargas.append(time.perf_counter() - inicio)
+            print(f"  {ModeloProductos.CAMPOS[columna]:<10} {percentil(tiempos, 0.5) * 1000:>9.2f} ms "
+                  f"{percentil(tiempos, 0.99) * 1000:>9.2f} ms {min(recargas) * 1000:>7.0f} ms")
+        vista.close()
+        conexion.cerrar_conexiones()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
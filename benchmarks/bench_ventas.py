@@ -0,0 +1,78 @@
+"""Mide tickets/s de `registrar_venta` con una o varias cajas cobrando a la vez.
+
+Uso: python -m benchmarks.bench_ventas [--productos N] [--tickets N] [--lineas N] [--cajeros N] [--diario]
+
+Con `--diario` los tickets pasan por el diario de ventas (`core.diario`) y el
+tiempo medido incluye el volcado final de lo pendiente.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks import crear_base
+from core import conexion, database
+from core.diario import DiarioVentas
+from core.ventas import Carrito, StockInsuficiente, registrar_venta
+
+def cajero(tickets, lineas, productos, resultados, registrar=registrar_venta):
+    """Cobra `tickets` tickets de `lineas` productos al azar y anota aceptados y rechazados."""
+    aceptados = rechazados = 0
+    for _ in range(tickets):
+        carrito = Carrito()
+        for id_producto in random.sample(range(1, productos + 1), lineas):
+            carrito.agregar((id_producto, f"Producto {id_producto - 1}", None, 1.0), random.randint(1, 3))
+        try:
+            if registrar(carrito, usuario_id=None):
+                aceptados += 1
+        except StockInsuficiente:
+            rechazados += 1
+    conexion.liberar_conexion()
+    resultados.append((aceptados, rechazados))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--productos", type=int, default=5_000)
+    parser.add_argument("--tickets", type=int, default=2_000, help="tickets por cajero")
+    parser.add_argument("--lineas", type=int, default=50)
+    parser.add_argument("--cajeros", type=int, default=1)
+    parser.add_argument("--stock", type=int, default=1_000, help="unidades iniciales por producto")
+    parser.add_argument("--diario", action="store_true", help="cobrar a través del diario de ventas")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        crear_base(os.path.join(directorio, "bench.db"), args.productos, cantidad=args.stock, precio=lambda i: 1 + i % 500)
+        resultados = []
+        diario = DiarioVentas(os.path.join(directorio, "ventas.diario")).abrir() if args.diario else None
+        registrar = diario.registrar if diario else registrar_venta
+        hilos = [threading.Thread(target=cajero, args=(args.tickets, args.lineas, args.productos, resultados, registrar))
+                 for _ in range(args.cajeros)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        if diario:
+            diario.cerrar()
+        duracion = time.perf_counter() - inicio
+
+        with database.conectar_db() as conn:
+            negativos = conn.execute("SELECT COUNT(*) FROM productos WHERE cantidad < 0").fetchone()[0]
+            lineas_vendidas = conn.execute("SELECT COUNT(*) FROM ventas").fetchone()[0]
+        conexion.cerrar_conexiones()
+
+    aceptados = sum(r[0] for r in resultados)
+    rechazados = sum(r[1] for r in resultados)
+    modo = "diario de ventas" if args.diario else "registrar_venta"
+    print(f"{modo} ({args.cajeros} cajeros, {args.lineas} líneas por ticket)")
+    print(f"  tickets cobrados     : {aceptados:>10,}  ({lineas_vendidas:,} líneas)")
+    print(f"  rechazados por stock : {rechazados:>10,}")
+    print(f"  rendimiento          : {aceptados / duracion:>10,.0f} tickets/s")
+    print(f"  productos con stock negativo: {negativos}")
+    if negativos:
+        raise SystemExit("❌ El stock quedó negativo.")
+
+if __name__ == "__main__":
+    main()
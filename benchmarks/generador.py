@@ -0,0 +1,242 @@
+"""Genera una base ORDICO sintética y grande para reproducir problemas de escala.
+
+Uso: python -m benchmarks.generador RUTA.db [--productos N] [--usuarios N] [--ventas N]
+                                    [--dias N] [--hasta AAAA-MM-DD] [--semilla N] [--zipf S]
+                                    [--password CLAVE] [--iteraciones-hash N] [--reemplazar]
+
+Con la misma semilla y los mismos parámetros el contenido generado es idéntico,
+así que los benchmarks corridos sobre distintas bases generadas son comparables.
+La popularidad de los productos sigue una ley de Zipf y la hora de las ventas
+la curva típica de un comercio (picos al mediodía y a la tarde).
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import string
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from core import conexion, database
+from core.reportes import actualizar_resumenes
+
+CATEGORIAS = {
+    "Comestibles": ("Arroz", "Fideos", "Harina", "Aceite", "Azúcar", "Yerba", "Café", "Lentejas", "Galletitas"),
+    "Productos de limpieza": ("Detergente", "Lavandina", "Jabón", "Esponja", "Desinfectante", "Suavizante"),
+    "Bebidas": ("Agua", "Gaseosa", "Jugo", "Cerveza", "Vino", "Soda", "Té helado"),
+    "Frutas y verduras": ("Manzana", "Banana", "Naranja", "Papa", "Cebolla", "Tomate", "Lechuga", "Zanahoria"),
+    "Golosinas": ("Chocolate", "Caramelos", "Alfajor", "Chicles", "Turrón", "Bombones"),
+    "Otros": ("Pilas", "Velas", "Encendedor", "Servilletas", "Bolsas"),
+}
+MARCAS = ("La Serena", "Don Julio", "Del Valle", "Santa Ana", "El Ceibo", "Los Andes", "Sur", "Primavera")
+PRESENTACIONES = ("500 g", "1 kg", "1,5 L", "2 L", "x 6", "x 12", "chico", "grande", "familiar")
+
+# Peso relativo de cada hora del día (el comercio abre de 8 a 22)
+PESO_POR_HORA = np.array([0, 0, 0, 0, 0, 0, 0, 0, 3, 5, 6, 8, 10, 9, 5, 4, 5, 7, 9, 10, 8, 5, 2, 0], dtype=float)
+FECHA_FINAL_PREDETERMINADA = "2025-12-31"
+TAMANO_LOTE = 500_000
+PASSWORD_PREDETERMINADA = "ordico"
+
+### **🔹 Distribuciones**
+def zipf_acotada(rng, cantidad, elementos, exponente):
+    """Índices en [0, elementos) con probabilidad proporcional a 1 / rango^exponente."""
+    pesos = 1.0 / np.arange(1, elementos + 1, dtype=float) ** exponente
+    acumulada = np.cumsum(pesos)
+    acumulada /= acumulada[-1]
+    return np.minimum(np.searchsorted(acumulada, rng.random(cantidad)), elementos - 1)
+
+def momentos_de_venta(rng, cantidad, primer_dia, dias):
+    """Segundos desde la época para `cantidad` tickets, con más ventas los fines de semana y en horas pico."""
+    pesos_dia = np.array([1.3 if (primer_dia + timedelta(days=int(d))).weekday() >= 5 else 1.0
+                          for d in range(dias)])
+    dia = rng.choice(dias, size=cantidad, p=pesos_dia / pesos_dia.sum())
+    hora = rng.choice(24, size=cantidad, p=PESO_POR_HORA / PESO_POR_HORA.sum())
+    inicio = (np.datetime64(primer_dia) - np.datetime64("1970-01-01")).astype("timedelta64[s]").astype(np.int64)
+    return inicio + dia * 86400 + hora * 3600 + rng.integers(0, 3600, size=cantidad)
+
+def como_fechas(segundos):
+    """Convierte segundos desde la época al formato de fecha que guarda la aplicación."""
+    return np.char.replace(np.datetime_as_string(segundos.astype("datetime64[s]")), "T", " ")
+
+def hash_password(rng, password, iteraciones):
+    """Hash en el formato pbkdf2 de werkzeug, con una sal derivada de la semilla."""
+    alfabeto = string.ascii_letters + string.digits
+    sal = "".join(alfabeto[i] for i in rng.integers(0, len(alfabeto), size=16))
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), sal.encode(), iteraciones).hex()
+    return f"pbkdf2:sha256:{iteraciones}${sal}${digest}"
+
+### **🔹 Carga**
+def _insertar_productos(conn, rng, cantidad):
+    categorias = list(CATEGORIAS)
+    categoria = rng.integers(0, len(categorias), size=cantidad)
+    articulo = rng.integers(0, 1000, size=cantidad)
+    marca = rng.integers(0, len(MARCAS), size=cantidad)
+    presentacion = rng.integers(0, len(PRESENTACIONES), size=cantidad)
+    precios = np.round(rng.lognormal(mean=6.0, sigma=0.9, size=cantidad), 2)
+    stock = rng.integers(0, 500, size=cantidad)
+
+    def filas():
+        for i in range(cantidad):
+            nombre_categoria = categorias[categoria[i]]
+            articulos = CATEGORIAS[nombre_categoria]
+            nombre = (f"{articulos[articulo[i] % len(articulos)]} {MARCAS[marca[i]]} "
+                      f"{PRESENTACIONES[presentacion[i]]} #{i + 1}")
+            yield nombre, nombre_categoria, int(stock[i]), float(precios[i])
+
+    conn.executemany("INSERT INTO productos (nombre, categoria, cantidad, precio) VALUES (?, ?, ?, ?)", filas())
+    conn.executemany("INSERT INTO codigos_producto (codigo, producto_id) VALUES (?, ?)",
+                     ((f"779{i:010d}", i) for i in range(1, cantidad + 1)))
+    return precios
+
+def _insertar_usuarios(conn, rng, cantidad, password, iteraciones):
+    filas = []
+    for i in range(cantidad):
+        nombre = "admin" if i == 0 else f"cajero{i}"
+        filas.append((nombre, hash_password(rng, password, iteraciones), f"{nombre}@ordico.test",
+                      f"{20_000_000 + i}", "admin" if i == 0 else "cajero"))
+    conn.executemany("INSERT INTO usuarios (nombre, password, email, dni, rol) VALUES (?, ?, ?, ?, ?)", filas)
+    return [fila[0] for fila in conn.execute("SELECT id FROM usuarios ORDER BY id")]
+
+def _insertar_ventas(conn, rng, cantidad, precios, usuarios_ids, primer_dia, dias, exponente, progreso):
+    """Inserta `cantidad` líneas de venta agrupadas en tickets de tamaño geométrico (media 3 líneas)."""
+    usuarios_ids = np.array(usuarios_ids)
+    insertadas = tickets_generados = 0
+    while insertadas < cantidad:
+        lote = min(TAMANO_LOTE, cantidad - insertadas)
+        tamanos = rng.geometric(1 / 3, size=lote)
+        tamanos = tamanos[np.cumsum(tamanos) <= lote]
+        if tamanos.sum() < lote:
+            tamanos = np.append(tamanos, lote - tamanos.sum())
+        tickets = len(tamanos)
+
+        ids_ticket = np.array([f"g{n:012d}" for n in range(tickets_generados, tickets_generados + tickets)])
+        # Dentro del lote, los tickets quedan en orden cronológico como en una base real
+        segundos = np.sort(momentos_de_venta(rng, tickets, primer_dia, dias))
+        fechas = como_fechas(segundos)
+        cajeros = usuarios_ids[rng.integers(0, len(usuarios_ids), size=tickets)]
+
+        productos = zipf_acotada(rng, lote, len(precios), exponente)
+        cantidades = rng.geometric(0.6, size=lote)
+        precio_linea = precios[productos]
+        importe = np.bincount(np.repeat(np.arange(tickets), tamanos), weights=cantidades * precio_linea)
+
+        conn.executemany("INSERT INTO tickets (id, usuario_id, fecha, total) VALUES (?, ?, ?, ?)",
+                         zip(ids_ticket.tolist(), cajeros.tolist(), fechas.tolist(), np.round(importe, 2).tolist()))
+        conn.executemany("""
+            INSERT INTO ventas (ticket_id, usuario_id, producto_id, cantidad, precio_unitario, fecha)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, zip(np.repeat(ids_ticket, tamanos).tolist(), np.repeat(cajeros, tamanos).tolist(),
+                 (productos + 1).tolist(), cantidades.tolist(), precio_linea.tolist(),
+                 np.repeat(fechas, tamanos).tolist()))
+        insertadas += lote
+        tickets_generados += tickets
+        progreso(insertadas)
+    return tickets_generados
+
+def generar(ruta, productos=10_000, usuarios=20, ventas=100_000, dias=365, hasta=FECHA_FINAL_PREDETERMINADA,
+            semilla=1, exponente=1.1, password=PASSWORD_PREDETERMINADA, iteraciones=10_000, progreso=None):
+    """Crea `ruta` con el esquema actual y la llena con datos sintéticos deterministas.
+
+    Durante la carga se desactivan el journal y los índices de ventas/tickets, que
+    se recrean al final junto con los resúmenes de `core.reportes`. Todos los
+    usuarios tienen la contraseña `password` (el primero es admin). Devuelve un
+    diccionario con las cantidades generadas y los segundos que llevó cada etapa.
+    """
+    if os.path.exists(ruta):
+        raise FileExistsError(f"'{ruta}' ya existe; use otra ruta o --reemplazar.")
+    progreso = progreso or (lambda etapa, hechas, total: None)
+    rng = np.random.default_rng(semilla)
+    primer_dia = date.fromisoformat(hasta) - timedelta(days=dias - 1)
+    tiempos = {}
+
+    conexion.configurar_ruta_db(ruta)
+    database.inicializar_db()
+    conexion.cerrar_conexiones()
+
+    conn = sqlite3.connect(ruta)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    indices = conn.execute("""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND tbl_name IN ('ventas', 'tickets') AND sql IS NOT NULL
+    """).fetchall()
+    try:
+        inicio = time.perf_counter()
+        with conn:
+            precios = _insertar_productos(conn, rng, productos)
+        tiempos["productos"] = time.perf_counter() - inicio
+        progreso("productos", productos, productos)
+
+        inicio = time.perf_counter()
+        with conn:
+            usuarios_ids = _insertar_usuarios(conn, rng, usuarios, password, iteraciones)
+        tiempos["usuarios"] = time.perf_counter() - inicio
+        progreso("usuarios", usuarios, usuarios)
+
+        inicio = time.perf_counter()
+        for nombre, _ in indices:
+            conn.execute(f"DROP INDEX {nombre}")
+        with conn:
+            tickets = _insertar_ventas(conn, rng, ventas, precios, usuarios_ids, primer_dia, dias, exponente,
+                                       lambda hechas: progreso("ventas", hechas, ventas))
+        tiempos["ventas"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        with conn:
+            for _, sql in indices:
+                conn.execute(sql)
+            actualizar_resumenes(conn.cursor())
+        conn.execute("ANALYZE")
+        tiempos["indices_y_resumenes"] = time.perf_counter() - inicio
+    finally:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.close()
+
+    return {"productos": productos, "usuarios": usuarios, "tickets": tickets, "ventas": ventas,
+            "desde": primer_dia.isoformat(), "hasta": hasta, "segundos": tiempos}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.generador", description=__doc__.splitlines()[0])
+    parser.add_argument("ruta", help="base de datos a crear")
+    parser.add_argument("--productos", type=int, default=10_000)
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--ventas", type=int, default=100_000, help="líneas de venta")
+    parser.add_argument("--dias", type=int, default=365, help="días de historia")
+    parser.add_argument("--hasta", default=FECHA_FINAL_PREDETERMINADA, help="último día con ventas (AAAA-MM-DD)")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--zipf", type=float, default=1.1, help="exponente de popularidad de los productos")
+    parser.add_argument("--password", default=PASSWORD_PREDETERMINADA, help="contraseña de todos los usuarios")
+    parser.add_argument("--iteraciones-hash", type=int, default=10_000, help="iteraciones pbkdf2 de las contraseñas")
+    parser.add_argument("--reemplazar", action="store_true", help="borrar la base si ya existe")
+    args = parser.parse_args(argv)
+
+    if args.reemplazar:
+        for sufijo in ("", "-wal", "-shm"):
+            if os.path.exists(args.ruta + sufijo):
+                os.remove(args.ruta + sufijo)
+
+    logging.disable(logging.INFO)
+    def informar(etapa, hechas, total):
+        print(f"\r{etapa}: {hechas:,}/{total:,}", end="" if hechas < total else "\n", flush=True)
+
+    try:
+        resultado = generar(args.ruta, args.productos, args.usuarios, args.ventas, args.dias, args.hasta,
+                            args.semilla, args.zipf, args.password, args.iteraciones_hash, informar)
+    except FileExistsError as e:
+        print(f"❌ {e}")
+        return 1
+    segundos = resultado["segundos"]
+    print(f"✅ {args.ruta}: {resultado['productos']:,} productos, {resultado['usuarios']:,} usuarios, "
+          f"{resultado['tickets']:,} tickets, {resultado['ventas']:,} líneas de venta "
+          f"({resultado['desde']} a {resultado['hasta']}) en {sum(segundos.values()):.1f} s")
+    for etapa, duracion in segundos.items():
+        print(f"  {etapa:<20} {duracion:>8.1f} s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""Microbenchmarks de core.database, core.usuarios y core.auth sobre bases temporales.
+
+Uso: python -m benchmarks [--productos N] [--usuarios N] [--repeticiones N] [--solo TEXTO]
+                          [--json RESULTADOS.json] [--comparar BASE.json] [--umbral PORCENTAJE]
+
+Cada caso informa operaciones/s y latencias p50/p99. Con `--json` se guardan los
+resultados, y con `--comparar` se muestran las diferencias contra otra corrida
+(marcando las regresiones mayores que `--umbral`).
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from openpyxl import Workbook
+from werkzeug.security import generate_password_hash
+
+from benchmarks import crear_base
+from core import auth, conexion, database, usuarios
+from utils import config
+
+PASSWORD = "clave-de-prueba"
+
+### **🔹 Medición**
+def percentil(valores_ordenados, p):
+    return valores_ordenados[min(len(valores_ordenados) - 1, int(len(valores_ordenados) * p))]
+
+def medir(nombre, operacion, repeticiones, calentamiento=3):
+    """Ejecuta `operacion(i)` `repeticiones` veces y devuelve ops/s y latencias en microsegundos."""
+    # Los casos lentos (pocas repeticiones) se calientan menos para no duplicar su duración
+    for i in range(min(calentamiento, repeticiones // 5)):
+        operacion(-1 - i)
+    latencias = []
+    inicio = time.perf_counter()
+    for i in range(repeticiones):
+        t0 = time.perf_counter_ns()
+        operacion(i)
+        latencias.append((time.perf_counter_ns() - t0) / 1000)
+    total = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        "nombre": nombre,
+        "operaciones": repeticiones,
+        "ops_por_segundo": repeticiones / total,
+        "p50_us": percentil(latencias, 0.50),
+        "p99_us": percentil(latencias, 0.99),
+        "media_us": sum(latencias) / len(latencias),
+    }
+
+### **🔹 Datos de prueba**
+def crear_datos(directorio, productos, usuarios_cantidad):
+    """Crea la base temporal con productos y usuarios (estos con un hash barato para no demorar la carga)."""
+    crear_base(os.path.join(directorio, "bench.db"), productos, cantidad=lambda i: i % 100,
+               precio=lambda i: 1 + i % 500)
+    hash_barato = generate_password_hash(PASSWORD, method="pbkdf2:sha256:1000")
+    with database.conectar_db() as conn:
+        conn.executemany("INSERT INTO usuarios (nombre, password, email, dni, rol) VALUES (?, ?, ?, ?, ?)",
+                         ((f"usuario{i}", hash_barato, f"usuario{i}@ordico.test", f"{10_000_000 + i}", "cajero")
+                          for i in range(usuarios_cantidad)))
+    # Un usuario con el hash real que genera la aplicación, para medir el inicio de sesión
+    auth.registrar_usuario("cajero_bench", PASSWORD, "cajero_bench@ordico.test", "99999999")
+
+def crear_excel(ruta, filas):
+    """Escribe una lista de productos en Excel, con nombres que ya existen y nombres nuevos."""
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("Productos")
+    hoja.append(["Nombre", "Cantidad", "Precio"])
+    for i in range(filas):
+        hoja.append([f"Producto {i * 2}", 5, 10.5])
+    libro.save(ruta)
+
+### **🔹 Casos**
+def casos(args, directorio):
+    """Lista de `(nombre, operacion, repeticiones)`; las operaciones reciben el número de iteración."""
+    n = args.repeticiones
+    ids = [random.randint(1, args.productos) for _ in range(n)]
+    usuarios_al_azar = [random.randrange(args.usuarios) for _ in range(n)]
+    excel = os.path.join(directorio, "productos.xlsx")
+    crear_excel(excel, args.filas_excel)
+    lentas = max(1, args.repeticiones_lentas)
+
+    return [
+        ("database.obtener_productos", lambda i: database.obtener_productos(), max(1, n // 500)),
+        ("database.obtener_producto_por_id", lambda i: database.obtener_producto_por_id(ids[i]), n),
+        ("database.importar_desde_excel", lambda i: database.importar_desde_excel(excel), lentas),
+        ("usuarios.obtener_usuario_por_nombre",
+         lambda i: usuarios.obtener_usuario_por_nombre(f"usuario{usuarios_al_azar[i]}"), n),
+        ("usuarios.obtener_usuario_por_email",
+         lambda i: usuarios.obtener_usuario_por_email(f"usuario{usuarios_al_azar[i]}@ordico.test"), n),
+        ("usuarios.obtener_usuario_para_login",
+         lambda i: usuarios.obtener_usuario_para_login(f"usuario{usuarios_al_azar[i]}"), n),
+        ("usuarios.obtener_usuario_por_dni",
+         lambda i: usuarios.obtener_usuario_por_dni(f"{10_000_000 + usuarios_al_azar[i]}"), n),
+        ("auth.autenticar_usuario", lambda i: auth.autenticar_usuario("cajero_bench", PASSWORD), lentas),
+        ("auth.autenticar_usuario (clave incorrecta)",
+         lambda i: auth.autenticar_usuario("cajero_bench", "incorrecta"), lentas),
+        ("auth.registrar_usuario",
+         lambda i: auth.registrar_usuario(f"nuevo{i}", PASSWORD, f"nuevo{i}@ordico.test", f"8{i:07d}"), lentas),
+    ]
+
+### **🔹 Resultados**
+def imprimir(resultados, base=None, umbral=10.0):
+    """Muestra la tabla de resultados y, si hay `base`, el cambio de ops/s contra ella."""
+    anteriores = {r["nombre"]: r for r in base["resultados"]} if base else {}
+    ancho = max(len(r["nombre"]) for r in resultados)
+    encabezado = f"{'caso':<{ancho}} {'ops/s':>12} {'p50 (µs)':>11} {'p99 (µs)':>11}"
+    print(encabezado + (f" {'vs. base':>10}" if base else ""))
+    regresiones = []
+    for r in resultados:
+        linea = f"{r['nombre']:<{ancho}} {r['ops_por_segundo']:>12,.1f} {r['p50_us']:>11,.1f} {r['p99_us']:>11,.1f}"
+        anterior = anteriores.get(r["nombre"])
+        if anterior:
+            cambio = (r["ops_por_segundo"] / anterior["ops_por_segundo"] - 1) * 100
+            linea += f" {cambio:>+9.1f}%"
+            if cambio < -umbral:
+                linea += "  ⚠️"
+                regresiones.append(r["nombre"])
+        print(linea)
+    return regresiones
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("--productos", type=int, default=50_000)
+    parser.add_argument("--usuarios", type=int, default=1_000)
+    parser.add_argument("--repeticiones", type=int, default=5_000, help="iteraciones de los casos rápidos")
+    parser.add_argument("--repeticiones-lentas", type=int, default=5,
+                        help="iteraciones de los casos con hash de contraseñas o importación")
+    parser.add_argument("--filas-excel", type=int, default=10_000)
+    parser.add_argument("--solo", help="ejecutar solo los casos cuyo nombre contiene este texto")
+    parser.add_argument("--json", help="guardar los resultados en este archivo")
+    parser.add_argument("--comparar", help="resultados JSON de otra corrida para comparar")
+    parser.add_argument("--umbral", type=float, default=10.0, help="%% de caída de ops/s que cuenta como regresión")
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args(argv)
+    random.seed(args.semilla)
+
+    # Los registros por operación distorsionan la medición
+    logging.disable(logging.WARNING)
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        crear_datos(directorio, args.productos, args.usuarios)
+        for nombre, operacion, repeticiones in casos(args, directorio):
+            if args.solo and args.solo not in nombre:
+                continue
+            resultados.append(medir(nombre, operacion, repeticiones))
+        conexion.cerrar_conexiones()
+    logging.disable(logging.NOTSET)
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+    regresiones = imprimir(resultados, base, args.umbral)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "version": config.VERSION,
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "parametros": {k: v for k, v in vars(args).items() if k not in ("json", "comparar")},
+                "resultados": resultados,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en {args.json}")
+    if regresiones:
+        print(f"⚠️ Regresiones de más de {args.umbral:.0f}%: {', '.join(regresiones)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
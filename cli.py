@@ -0,0 +1,217 @@
+"""Línea de comandos de ORDICO para tareas por lotes, sin interfaz gráfica.
+
+Uso: python cli.py [--db RUTA] [--log NIVEL] COMANDO ...
+
+  import ARCHIVO                       productos desde Excel, CSV o Parquet
+  export {productos,ventas} ARCHIVO    productos o ventas a CSV o XLSX
+  migrate [--dry-run]                  aplica las migraciones pendientes
+  bench [NOMBRE] [ARGUMENTOS...]       benchmarks (suite, login, ventas, generador...)
+  users add-bulk ARCHIVO.csv           alta masiva de usuarios
+  vacuum [--analizar] [--reconstruir-resumenes]
+  serve [--host H] [--puerto N]        servidor JSON para las cajas (core.servidor)
+  sync [--central RUTA] [--completa]   sincroniza esta caja con la base central
+
+Cada comando escribe su resultado como una línea JSON en la salida estándar (salvo
+`serve`, que atiende pedidos hasta Ctrl+C y solo deja registros); los
+registros van a la salida de errores y al archivo de log. El código de salida es
+0 si el comando terminó bien (aunque haya filas rechazadas, que se informan en el
+JSON) y 1 si falló. No importa PyQt5, así que corre en servidores sin pantalla.
+"""
+import argparse
+import csv
+import importlib
+import json
+import logging
+import sqlite3
+import sys
+
+from core import conexion, exportacion, importacion
+from core.auth import registrar_usuarios
+from core.database import compactar_db, conectar_db, inicializar_db
+from core.migraciones import aplicar_migraciones, version_actual
+from core.reportes import reconstruir_resumenes
+from core.sincronizacion import podar_cambios_catalogo, sincronizar
+from utils import config
+from utils.registro import configurar_registro
+
+logger = logging.getLogger("cli")
+
+# Benchmarks que se pueden lanzar con `bench NOMBRE` (módulo de `benchmarks` con `main(argv)`)
+BENCHMARKS = {
+    "suite": "benchmarks.suite",
+    "api": "benchmarks.bench_api",
+    "generador": "benchmarks.generador",
+    "codigos": "benchmarks.bench_codigos",
+    "conexion": "benchmarks.bench_conexion",
+    "correo": "benchmarks.bench_correo",
+    "exportacion": "benchmarks.bench_exportacion",
+    "login": "benchmarks.bench_login",
+    "stock": "benchmarks.bench_stock",
+    "ventas": "benchmarks.bench_ventas",
+}
+
+def _salida(resultado):
+    """Escribe el resultado como una línea JSON y devuelve el código de salida."""
+    print(json.dumps(resultado, ensure_ascii=False, default=str))
+    return 0 if resultado.get("ok") else 1
+
+### **🔹 Comandos**
+def comando_import(args):
+    inicializar_db()
+    reporte = False if args.sin_reporte else (args.reporte or True)
+    resultado = importacion.importar_productos(args.archivo, reporte=reporte, tamano_lote=args.lote)
+    if not resultado:
+        return _salida({"ok": False, "comando": "import", "archivo": args.archivo})
+    # El detalle de cada rechazo queda en el reporte CSV; en la salida van los primeros
+    rechazos = resultado.pop("rechazos")
+    return _salida({"ok": True, "comando": "import", "archivo": args.archivo, **resultado,
+                    "primeros_rechazos": rechazos[:args.mostrar_rechazos]})
+
+def comando_export(args):
+    inicializar_db()
+    if args.que == "productos":
+        resultado = exportacion.exportar_productos(args.archivo, categoria=args.categoria, tamano_lote=args.lote)
+    else:
+        resultado = exportacion.exportar_ventas(args.archivo, desde=args.desde, hasta=args.hasta,
+                                                categoria=args.categoria, tamano_lote=args.lote)
+    if not resultado:
+        return _salida({"ok": False, "comando": "export", "que": args.que, "archivo": args.archivo})
+    return _salida({"ok": True, "comando": "export", "que": args.que, **resultado})
+
+def comando_migrate(args):
+    conn = conectar_db()
+    anterior = version_actual(conn)
+    try:
+        aplicadas = aplicar_migraciones(conn, dry_run=args.dry_run)
+    except sqlite3.Error as e:
+        return _salida({"ok": False, "comando": "migrate", "version": anterior, "error": str(e)})
+    return _salida({"ok": True, "comando": "migrate", "dry_run": args.dry_run, "version_anterior": anterior,
+                    "version": version_actual(conn), "migraciones": [dict(version=v, descripcion=d) for v, d in aplicadas]})
+
+def comando_bench(args):
+    modulo = importlib.import_module(BENCHMARKS[args.nombre])
+    # Los benchmarks imprimen su propio informe legible (y `suite --json` guarda el JSON)
+    return modulo.main(args.argumentos) or 0
+
+def comando_users_add_bulk(args):
+    inicializar_db()
+    archivo = sys.stdin if args.archivo == "-" else open(args.archivo, newline="", encoding="utf-8-sig")
+    with archivo:
+        usuarios = list(csv.DictReader(archivo))
+    resultado = registrar_usuarios(usuarios, rol=args.rol, hilos=args.hilos)
+    if resultado is None:
+        return _salida({"ok": False, "comando": "users add-bulk", "archivo": args.archivo})
+    # Los índices pasan a ser números de fila del CSV (la 1 es el encabezado)
+    rechazos = [(indice + 2, motivo) for indice, motivo in resultado["rechazados"]]
+    return _salida({"ok": True, "comando": "users add-bulk", "archivo": args.archivo, "leidos": len(usuarios),
+                    "registrados": resultado["registrados"], "rechazados": len(rechazos), "rechazos": rechazos})
+
+def comando_vacuum(args):
+    inicializar_db()
+    resultado = {"ok": True, "comando": "vacuum"}
+    if args.reconstruir_resumenes:
+        lineas = reconstruir_resumenes()
+        resultado["resumenes_reconstruidos"] = lineas
+        resultado["ok"] = lineas is not None
+    podados = podar_cambios_catalogo()
+    resultado["cambios_podados"] = podados
+    resultado["ok"] = resultado["ok"] and podados is not None
+    compactado = compactar_db(analizar=args.analizar)
+    if compactado:
+        resultado.update(compactado)
+    else:
+        resultado["ok"] = False
+    return _salida(resultado)
+
+def comando_serve(args):
+    from core.servidor import servir
+    inicializar_db()
+    servir(args.host, args.puerto, args.lectores, args.lote_escrituras)
+    return 0
+
+def comando_sync(args):
+    if not args.central:
+        raise ValueError("falta la base central: --central RUTA u ORDICO_SINC_CENTRAL")
+    inicializar_db()
+    resultado = sincronizar(args.central, lote=args.lote, completa=args.completa)
+    if resultado is None:
+        return _salida({"ok": False, "comando": "sync", "central": args.central})
+    return _salida({"ok": True, "comando": "sync", "central": args.central, **resultado})
+
+### **🔹 Argumentos**
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="ordico", description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help=f"base de datos (por defecto {config.DB_PATH})")
+    parser.add_argument("--log", default=config.LOG_NIVEL, help="nivel de registro (DEBUG, INFO, WARNING...)")
+    comandos = parser.add_subparsers(dest="comando", required=True, metavar="COMANDO")
+
+    p = comandos.add_parser("import", help="importa productos desde Excel, CSV o Parquet")
+    p.add_argument("archivo")
+    p.add_argument("--reporte", help="ruta del CSV de rechazos (por defecto junto al archivo)")
+    p.add_argument("--sin-reporte", action="store_true", help="no escribir el CSV de rechazos")
+    p.add_argument("--lote", type=int, default=importacion.TAMANO_LOTE, help="filas por lote")
+    p.add_argument("--mostrar-rechazos", type=int, default=20, help="rechazos a incluir en la salida JSON")
+    p.set_defaults(funcion=comando_import)
+
+    p = comandos.add_parser("export", help="exporta productos o ventas a CSV o XLSX")
+    p.add_argument("que", choices=["productos", "ventas"])
+    p.add_argument("archivo", help="destino; la extensión (.csv o .xlsx) elige el formato")
+    p.add_argument("--categoria")
+    p.add_argument("--desde", help="primer día de ventas (AAAA-MM-DD)")
+    p.add_argument("--hasta", help="último día de ventas (AAAA-MM-DD)")
+    p.add_argument("--lote", type=int, default=exportacion.TAMANO_LOTE, help="filas por lote")
+    p.set_defaults(funcion=comando_export)
+
+    p = comandos.add_parser("migrate", help="aplica las migraciones de esquema pendientes")
+    p.add_argument("--dry-run", action="store_true", help="solo comprobar que aplicarían sin errores")
+    p.set_defaults(funcion=comando_migrate)
+
+    p = comandos.add_parser("bench", help="ejecuta un benchmark (los argumentos siguientes se le pasan tal cual)")
+    p.add_argument("nombre", nargs="?", default="suite", choices=sorted(BENCHMARKS))
+    p.add_argument("argumentos", nargs=argparse.REMAINDER)
+    p.set_defaults(funcion=comando_bench, usa_db=False)  # Cada benchmark crea su propia base
+
+    p = comandos.add_parser("users", help="administración de usuarios")
+    usuarios = p.add_subparsers(dest="accion", required=True, metavar="ACCION")
+    p = usuarios.add_parser("add-bulk", help="alta masiva desde un CSV con columnas nombre,email,dni,password[,rol]")
+    p.add_argument("archivo", help="CSV de usuarios, o - para leerlo de la entrada estándar")
+    p.add_argument("--rol", default="cajero", help="rol de las filas sin columna rol")
+    p.add_argument("--hilos", type=int, default=config.HASH_HILOS, help="hilos para calcular los hashes")
+    p.set_defaults(funcion=comando_users_add_bulk)
+
+    p = comandos.add_parser("vacuum", help="compacta la base de datos y vacía el WAL")
+    p.add_argument("--analizar", action="store_true", help="recalcular también las estadísticas (ANALYZE)")
+    p.add_argument("--reconstruir-resumenes", action="store_true", help="recalcular los resúmenes de ventas")
+    p.set_defaults(funcion=comando_vacuum)
+
+    p = comandos.add_parser("serve", help="servidor HTTP/JSON para que varias cajas compartan la base")
+    p.add_argument("--host", default=config.SERVIDOR_HOST)
+    p.add_argument("--puerto", type=int, default=config.SERVIDOR_PUERTO)
+    p.add_argument("--lectores", type=int, default=config.SERVIDOR_LECTORES, help="hilos de lectura")
+    p.add_argument("--lote-escrituras", type=int, default=config.SERVIDOR_LOTE_ESCRITURAS,
+                   help="escrituras por transacción (1 = un commit por pedido)")
+    p.set_defaults(funcion=comando_serve)
+
+    p = comandos.add_parser("sync", help="sube las ventas de esta caja a la base central y trae el catálogo")
+    p.add_argument("--central", default=config.SINC_CENTRAL, help="ruta de la base central")
+    p.add_argument("--completa", action="store_true", help="copiar el catálogo y los usuarios completos")
+    p.add_argument("--lote", type=int, default=config.SINC_LOTE, help="tickets o cambios por transacción")
+    p.set_defaults(funcion=comando_sync)
+    return parser
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    configurar_registro(nivel=args.log.upper())
+    if args.db:
+        conexion.configurar_ruta_db(args.db)
+    if getattr(args, "usa_db", True) and conectar_db() is None:
+        return _salida({"ok": False, "comando": args.comando, "error": "no se pudo abrir la base de datos"})
+    try:
+        return args.funcion(args)
+    except (OSError, ValueError) as e:
+        logger.error("❌ %s", e)
+        return _salida({"ok": False, "comando": args.comando, "error": str(e)})
+
+if __name__ == "__main__":
+    sys.exit(main())
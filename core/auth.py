@@ -1,77 +1,170 @@
-from werkzeug.security import generate_password_hash, check_password_hash
-from core.usuarios import obtener_usuario_por_email, obtener_usuario_por_nombre, agregar_usuario, obtener_cantidad_usuarios
+from concurrent.futures import ThreadPoolExecutor
+from core.usuarios import (obtener_usuario_para_login, agregar_usuario, agregar_usuarios, obtener_cantidad_usuarios,
+                           reemplazar_hash_password)
+from utils import config
 import logging
+import threading
+import time
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+### **🔹 Hash de contraseñas**
+def metodo_hash():
+    """Método de werkzeug con el costo configurado, p. ej. `pbkdf2:sha256:1000000`."""
+    return f"pbkdf2:sha256:{config.HASH_ITERACIONES}"
+
+def hashear_password(password):
+    """Hash de `password` con el costo configurado en `config.HASH_ITERACIONES`."""
+    from werkzeug.security import generate_password_hash  # werkzeug se carga al primer hash, no al arrancar
+    return generate_password_hash(password, method=metodo_hash(), salt_length=config.HASH_LARGO_SAL)
+
+def necesita_rehash(hash_guardado):
+    """True si el hash no es PBKDF2-SHA256 o tiene menos iteraciones que las configuradas."""
+    partes = hash_guardado.split("$", 1)[0].split(":")
+    if partes[:2] != ["pbkdf2", "sha256"]:
+        return True
+    try:
+        # Sin iteraciones explícitas el hash usó el valor por defecto de una versión vieja de werkzeug
+        return len(partes) < 3 or int(partes[2]) < config.HASH_ITERACIONES
+    except ValueError:
+        return True
+
+_rehash = None
+_lock_rehash = threading.Lock()
+
+def _programar_rehash(usuario_id, hash_anterior, password):
+    """Recalcula el hash con el costo actual en un hilo aparte, para no demorar el inicio de sesión."""
+    global _rehash
+    with _lock_rehash:
+        if _rehash is None:
+            _rehash = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rehash")
+    return _rehash.submit(_rehashear, usuario_id, hash_anterior, password)
+
+def _rehashear(usuario_id, hash_anterior, password):
+    if reemplazar_hash_password(usuario_id, hash_anterior, hashear_password(password)):
+        logger.info("✅ Hash de la contraseña del usuario %s actualizado a %s.", usuario_id, metodo_hash())
+        return True
+    return False
+
+### **🔹 Caché de usuarios inexistentes**
+# Los intentos repetidos con un usuario que no existe (errores de tipeo, scripts)
+# se responden sin consultar la base durante `AUTH_TTL_INEXISTENTES` segundos.
+_inexistentes = {}  # entrada -> instante (monotonic) en que vence
+_lock_inexistentes = threading.Lock()
+
+def _es_inexistente(clave):
+    vence = _inexistentes.get(clave)
+    if vence is None:
+        return False
+    if vence > time.monotonic():
+        return True
+    with _lock_inexistentes:
+        _inexistentes.pop(clave, None)
+    return False
+
+def _anotar_inexistente(clave):
+    ahora = time.monotonic()
+    with _lock_inexistentes:
+        if len(_inexistentes) >= config.AUTH_INEXISTENTES_MAXIMO:
+            for vieja in [c for c, vence in _inexistentes.items() if vence <= ahora]:
+                del _inexistentes[vieja]
+            if len(_inexistentes) >= config.AUTH_INEXISTENTES_MAXIMO:
+                _inexistentes.clear()
+        _inexistentes[clave] = ahora + config.AUTH_TTL_INEXISTENTES
+
+def olvidar_inexistentes():
+    """Vacía la caché de usuarios inexistentes (p. ej. después de crear usuarios por otra vía)."""
+    with _lock_inexistentes:
+        _inexistentes.clear()
+
+### **🔹 Autenticación y registro**
+ROLES = ("admin", "cajero", "vendedor")
 
 def autenticar_usuario(entrada, password):
     """Verifica si las credenciales son correctas. Permite ingresar con nombre o email."""
-    usuario = obtener_usuario_por_email(entrada) or obtener_usuario_por_nombre(entrada)
-
-    if usuario:
-        hashed_password = usuario[2]  # La contraseña almacenada en la BD
-        print(f"🔍 Usuario encontrado: {usuario}")
-        print(f"🔍 Hash almacenado en BD: {hashed_password}")
-        print(f"🔍 Contraseña ingresada: {password}")
-
-        if check_password_hash(hashed_password, password):
-            print(f"✅ Inicio de sesión exitoso para: {entrada}")
-            return {
-                "username": usuario[1],
-                "email": usuario[3],
-                "dni": usuario[4],
-                "rol": usuario[5]
-            }
-        else:
-            print("❌ Contraseña incorrecta.")
-            return None
-    else:
-        print("❌ Usuario no encontrado.")
+    clave = entrada.strip() if entrada else ""
+    if not clave or _es_inexistente(clave):
+        logger.warning("❌ Usuario no encontrado: %s", entrada)
         return None
-    """Verifica si las credenciales son correctas. Permite ingresar con nombre o email."""
-    usuario = obtener_usuario_por_email(entrada) or obtener_usuario_por_nombre(entrada)  # Buscar por email o nombre
 
-    if usuario:
-        hashed_password = usuario[2]  # ✅ La contraseña almacenada en la BD está encriptada
+    usuario = obtener_usuario_para_login(clave)  # Una sola consulta por email o nombre
+    if not usuario:
+        _anotar_inexistente(clave)
+        logger.warning("❌ Usuario no encontrado: %s", entrada)
+        return None
 
-        logging.info(f"🔍 Usuario encontrado en la BD: {usuario[1]} ({usuario[3]})")  # Oculta la contraseña del log
+    hashed_password = usuario[2]  # La contraseña almacenada en la BD
+    logger.debug("🔍 Usuario encontrado: %s (%s)", usuario[1], usuario[3])
 
-        if check_password_hash(hashed_password, password):  # ✅ Comparación segura
-            logging.info(f"✅ Inicio de sesión exitoso para: {entrada}")
-            return {
-                "username": usuario[1], 
-                "email": usuario[3], 
-                "dni": usuario[4], 
-                "rol": usuario[5]
-            }
-        else:
-            logging.warning(f"❌ Intento de inicio de sesión fallido para: {entrada}")
-            return None
+    from werkzeug.security import check_password_hash
+    if check_password_hash(hashed_password, password):
+        logger.info("✅ Inicio de sesión exitoso para: %s", entrada)
+        if necesita_rehash(hashed_password):
+            _programar_rehash(usuario[0], hashed_password, password)
+        return {
+            "id": usuario[0],
+            "username": usuario[1],
+            "email": usuario[3],
+            "dni": usuario[4],
+            "rol": usuario[5]
+        }
     else:
-        logging.warning(f"❌ Usuario no encontrado con: {entrada}")
+        logger.warning("❌ Contraseña incorrecta para: %s", entrada)
         return None
 
 def registrar_usuario(username, password, email, dni, rol="cajero"):
     """Registra un nuevo usuario con validaciones de datos."""
     
     if not username or not password or not email or not dni:
-        logging.warning("⚠️ Error: Todos los campos son obligatorios.")
+        logger.warning("⚠️ Error: Todos los campos son obligatorios.")
         return "Todos los campos son obligatorios."
 
     cantidad_usuarios = obtener_cantidad_usuarios()
-    logging.info(f"🔍 Cantidad de usuarios en la BD: {cantidad_usuarios}")
+    logger.info("🔍 Cantidad de usuarios en la BD: %s", cantidad_usuarios)
 
     if cantidad_usuarios == 0:
         rol = "admin"
 
-    logging.info(f"🛠 Registrando usuario {username} con rol: {rol}")
+    logger.info("🛠 Registrando usuario %s con rol: %s", username, rol)
 
-    hashed_password = generate_password_hash(password, method='pbkdf2:sha256', salt_length=16)
+    hashed_password = hashear_password(password)
 
     if agregar_usuario(username, hashed_password, email, dni, rol):
-        logging.info(f"✅ Usuario registrado correctamente: {username} con rol {rol}")
+        olvidar_inexistentes()  # El nombre o el email pudieron quedar anotados como inexistentes
+        logger.info("✅ Usuario registrado correctamente: %s con rol %s", username, rol)
         return f"Usuario registrado exitosamente como {rol}."
     else:
-        logging.warning(f"⚠️ Error: Usuario '{username}', email '{email}' o DNI '{dni}' ya existen.")
+        logger.warning("⚠️ Error: Usuario '%s', email '%s' o DNI '%s' ya existen.", username, email, dni)
         return "El nombre de usuario, el email o el DNI ya existen."
+
+def registrar_usuarios(usuarios, rol="cajero", hilos=None):
+    """Registra muchos usuarios `{"nombre", "password", "email", "dni", "rol"}` de una vez.
+
+    Los hashes se calculan en paralelo en `hilos` hilos (por defecto
+    `config.HASH_HILOS`; PBKDF2 libera el GIL) y los usuarios se insertan en una
+    sola transacción. `rol` se usa para las filas sin rol. Devuelve
+    `{"registrados": n, "rechazados": [(indice, motivo), ...]}`, o None si falló la base.
+    """
+    rechazados, validos = [], []
+    for indice, usuario in enumerate(usuarios):
+        datos = {campo: (usuario.get(campo) or "").strip() for campo in ("nombre", "password", "email", "dni", "rol")}
+        datos["rol"] = datos["rol"] or rol
+        if not all(datos[campo] for campo in ("nombre", "password", "email", "dni")):
+            rechazados.append((indice, "Todos los campos son obligatorios."))
+        elif datos["rol"] not in ROLES:
+            rechazados.append((indice, f"Rol desconocido: {datos['rol']}"))
+        else:
+            validos.append((indice, datos))
+
+    with ThreadPoolExecutor(max_workers=hilos or config.HASH_HILOS, thread_name_prefix="hash") as ejecutor:
+        hashes = list(ejecutor.map(hashear_password, [datos["password"] for _, datos in validos]))
+    agregados, duplicados = agregar_usuarios(
+        [(d["nombre"], h, d["email"], d["dni"], d["rol"]) for (_, d), h in zip(validos, hashes)])
+    if duplicados is None:
+        return None
+    if agregados:
+        olvidar_inexistentes()
+    rechazados += [(validos[i][0], "El nombre de usuario, el email o el DNI ya existen.") for i in duplicados]
+    rechazados.sort()
+    logger.info("✅ Registro masivo: %s usuarios registrados, %s rechazados.", agregados, len(rechazados))
+    return {"registrados": agregados, "rechazados": rechazados}
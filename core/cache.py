@@ -0,0 +1,181 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from utils import config
+
+# NOCASE de SQLite solo iguala mayúsculas ASCII; las claves por nombre hacen lo mismo
+_MINUSCULAS_ASCII = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def clave_nombre(nombre):
+    """Normaliza un nombre igual que el índice `nombre COLLATE NOCASE` de productos."""
+    return nombre.strip().translate(_MINUSCULAS_ASCII)
+
+class CacheCatalogo:
+    """Caché LRU en memoria de filas de productos, por ID y por nombre.
+
+    Las funciones de escritura de `core.database` la actualizan o invalidan al
+    escribir. Para detectar escrituras de otros procesos, las lecturas comparan
+    `PRAGMA data_version` de la conexión del hilo con el último valor visto; si
+    cambió, se leen los productos tocados desde entonces en `cambios_productos`
+    (migración 10) y solo esos se quitan. La posición en ese registro es del
+    proceso, no de cada conexión: abrir una conexión nueva no vacía la caché, y
+    confirmar cambios en otras tablas (bandeja de correos, sincronización) tampoco.
+    La comparación se hace como mucho una vez cada `intervalo_verificacion`
+    segundos, porque cuesta casi lo mismo que la consulta que la caché evita.
+    """
+
+    CAMBIOS_SUELTOS = 1000  # Con más productos cambiados a la vez se vacía la caché entera
+
+    def __init__(self, capacidad=config.CACHE_CATALOGO_CAPACIDAD,
+                 intervalo_verificacion=config.CACHE_INTERVALO_VERIFICACION):
+        self.capacidad = capacidad
+        self.intervalo_verificacion = intervalo_verificacion
+        self._por_id = OrderedDict()  # id -> fila
+        self._id_por_nombre = {}  # clave_nombre -> id
+        self._lock = threading.RLock()
+        self._local = threading.local()  # última data_version vista por la conexión del hilo
+        self._secuencia = None  # último `cambios_productos.seq` ya reflejado en la caché
+        self.generacion = 0  # Aumenta con cada invalidación; evita guardar lecturas viejas
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones_externas = 0
+        self._oyentes = []
+
+    # --- Lectura ---
+
+    def obtener(self, conn, id_producto):
+        """Devuelve la fila cacheada del producto, o None si no está."""
+        self.verificar_cambios_externos(conn)
+        with self._lock:
+            fila = self._por_id.get(id_producto)
+            if fila is None:
+                self.fallos += 1
+                return None
+            self._por_id.move_to_end(id_producto)
+            self.aciertos += 1
+            return fila
+
+    def obtener_por_nombre(self, conn, nombre):
+        """Devuelve la fila cacheada del producto con ese nombre, o None si no está."""
+        self.verificar_cambios_externos(conn)
+        with self._lock:
+            id_producto = self._id_por_nombre.get(clave_nombre(nombre))
+            fila = self._por_id.get(id_producto) if id_producto is not None else None
+            if fila is None:
+                self.fallos += 1
+                return None
+            self._por_id.move_to_end(id_producto)
+            self.aciertos += 1
+            return fila
+
+    def verificar_cambios_externos(self, conn, forzar=False):
+        """Quita de la caché los productos que otra conexión cambió desde la última verificación."""
+        local = self._local
+        ahora = time.monotonic()
+        misma_conexion = getattr(local, "conn", None) is conn
+        if misma_conexion and not forzar and ahora - local.verificada < self.intervalo_verificacion:
+            return
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        local.verificada = ahora
+        if misma_conexion and local.version == version:
+            return
+        # Conexión nueva (sin valor de referencia) o alguien confirmó cambios: se consulta el registro
+        local.conn, local.version = conn, version
+        self._aplicar_cambios_externos(conn)
+
+    def _aplicar_cambios_externos(self, conn):
+        with self._lock:
+            try:
+                if self._secuencia is None:
+                    self._secuencia = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cambios_productos").fetchone()[0]
+                    if self._por_id:
+                        self.invalidar()  # Se llenó antes de conocer la posición: no se puede saber qué cambió
+                    return
+                cambios = conn.execute("SELECT seq, producto_id FROM cambios_productos WHERE seq > ? ORDER BY seq "
+                                       "LIMIT ?", (self._secuencia, self.CAMBIOS_SUELTOS + 1)).fetchall()
+            except sqlite3.OperationalError:
+                # Base sin registro de cambios: no hay forma de saber qué productos cambiaron
+                self.invalidar()
+                self.invalidaciones_externas += 1
+                return
+            if not cambios:
+                return  # Se confirmaron cambios, pero no en el catálogo
+            self.invalidaciones_externas += 1
+            # Si hay un hueco, el registro se podó más allá de lo visto y se perdieron cambios
+            if len(cambios) > self.CAMBIOS_SUELTOS or cambios[0][0] != self._secuencia + 1:
+                self.invalidar()
+                self._secuencia = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cambios_productos").fetchone()[0]
+                return
+            for id_producto in {id_producto for _, id_producto in cambios}:
+                self.invalidar(id_producto)
+            self._secuencia = cambios[-1][0]
+
+    # --- Escritura ---
+
+    def guardar(self, fila, generacion=None):
+        """Guarda una fila `(id, nombre, ...)`.
+
+        Si se pasa `generacion` (leída antes de consultar la base) y hubo una
+        invalidación mientras tanto, la fila se descarta porque podría estar vieja.
+        """
+        with self._lock:
+            if generacion is not None and generacion != self.generacion:
+                return
+            anterior = self._por_id.pop(fila[0], None)
+            if anterior is not None:
+                self._id_por_nombre.pop(clave_nombre(anterior[1]), None)
+            self._por_id[fila[0]] = fila
+            self._id_por_nombre[clave_nombre(fila[1])] = fila[0]
+            while len(self._por_id) > self.capacidad:
+                _, desalojada = self._por_id.popitem(last=False)
+                self._id_por_nombre.pop(clave_nombre(desalojada[1]), None)
+                self.desalojos += 1
+
+    def precargar(self, filas, generacion):
+        """Carga filas en bloque (por ejemplo, todo el catálogo al abrir la caja)."""
+        for fila in filas:
+            self.guardar(fila, generacion)
+
+    def invalidar(self, id_producto=None):
+        """Quita un producto de la caché, o todos si no se indica ID."""
+        with self._lock:
+            self.generacion += 1
+            if id_producto is None:
+                self._por_id.clear()
+                self._id_por_nombre.clear()
+            else:
+                fila = self._por_id.pop(id_producto, None)
+                if fila is not None:
+                    self._id_por_nombre.pop(clave_nombre(fila[1]), None)
+        for oyente in list(self._oyentes):
+            oyente(id_producto)
+
+    def al_invalidar(self, oyente):
+        """Registra `oyente(id_producto)`, llamado en cada invalidación (None = todo)."""
+        self._oyentes.append(oyente)
+
+    # --- Métricas ---
+
+    def estadisticas(self):
+        """Contadores de uso de la caché."""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._por_id),
+                "capacidad": self.capacidad,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "desalojos": self.desalojos,
+                "invalidaciones_externas": self.invalidaciones_externas,
+            }
+
+    def reiniciar_estadisticas(self):
+        """Pone en cero los contadores (útil para medir un período concreto)."""
+        with self._lock:
+            self.aciertos = self.fallos = self.desalojos = self.invalidaciones_externas = 0
+
+# Caché compartida por todo el proceso
+cache_catalogo = CacheCatalogo()
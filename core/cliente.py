@@ -0,0 +1,209 @@
+import http.client
+import json
+import logging
+import threading
+import uuid
+from urllib.parse import quote, urlencode, urlsplit
+from core.codigos import normalizar_codigo
+from core.database import COLUMNAS_PRODUCTO
+from core.ventas import StockInsuficiente
+from utils import config
+
+logger = logging.getLogger(__name__)
+
+class ErrorServidor(Exception):
+    """El servidor respondió con un error o no se pudo hablar con él."""
+
+    def __init__(self, mensaje, estado=None, datos=None):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.datos = datos or {}
+
+class ClienteAPI:
+    """Cliente del servidor de `core.servidor` con una conexión keep-alive por hilo."""
+
+    def __init__(self, url=config.SERVIDOR_URL, timeout=config.SERVIDOR_TIMEOUT_CLIENTE):
+        partes = urlsplit(url)
+        self.host = partes.hostname
+        self.puerto = partes.port or 80
+        self.timeout = timeout
+        self.token = None  # Lo fija `autenticar_usuario`
+        self._local = threading.local()
+
+    def _conexion(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = self._local.conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=self.timeout)
+        return conexion
+
+    def cerrar(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is not None:
+            conexion.close()
+            self._local.conexion = None
+
+    def solicitar(self, metodo, ruta, datos=None):
+        """Hace el pedido y devuelve el JSON de la respuesta; lanza `ErrorServidor` si no es 2xx."""
+        cuerpo = json.dumps(datos).encode("utf-8") if datos is not None else None
+        cabeceras = {"Content-Type": "application/json"}
+        if self.token:
+            cabeceras["Authorization"] = f"Bearer {self.token}"
+        for intento in range(2):
+            conexion = self._conexion()
+            reutilizada = conexion.sock is not None
+            try:
+                conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+                respuesta = conexion.getresponse()
+                estado, contenido = respuesta.status, respuesta.read()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                self.cerrar()
+                # El servidor cierra las conexiones ociosas: se reintenta una vez con una nueva. Una
+                # escritura solo si la conexión reutilizada ya estaba cerrada al enviarla (sin respuesta
+                # alguna); un timeout puede llegar cuando el servidor ya la aplicó
+                cerrada = reutilizada and isinstance(e, (http.client.RemoteDisconnected, BrokenPipeError))
+                if intento or not (metodo == "GET" or cerrada):
+                    raise ErrorServidor(f"No se pudo conectar con el servidor: {e}") from e
+        respuesta = json.loads(contenido) if contenido else {}
+        if estado >= 400:
+            raise ErrorServidor(respuesta.get("error", f"HTTP {estado}"), estado, respuesta)
+        return respuesta
+
+_cliente = None
+_lock_cliente = threading.Lock()
+
+def obtener_cliente():
+    """Devuelve el cliente del proceso, apuntando a `config.SERVIDOR_URL`."""
+    global _cliente
+    with _lock_cliente:
+        if _cliente is None:
+            _cliente = ClienteAPI()
+        return _cliente
+
+### **🔹 Funciones equivalentes a las de `core` para el modo cliente**
+def _producto(datos):
+    return tuple(datos[columna] for columna in COLUMNAS_PRODUCTO)
+
+def _consultar_producto(descripcion, ruta):
+    try:
+        return _producto(obtener_cliente().solicitar("GET", ruta))
+    except ErrorServidor as e:
+        if e.estado != 404:
+            logger.error("❌ Error al obtener producto por %s: %s", descripcion, e)
+        return None
+
+def autenticar_usuario(entrada, password):
+    """Como `core.auth.autenticar_usuario`; además guarda el token para cobrar."""
+    cliente = obtener_cliente()
+    try:
+        respuesta = cliente.solicitar("POST", "/sesiones", {"usuario": entrada, "password": password})
+    except ErrorServidor as e:
+        if e.estado != 401:
+            logger.error("❌ Error al iniciar sesión en el servidor: %s", e)
+        return None
+    cliente.token = respuesta["token"]
+    return respuesta["usuario"]
+
+def obtener_producto_por_id(id_producto):
+    return _consultar_producto(f"ID '{id_producto}'", f"/productos/{int(id_producto)}")
+
+def obtener_producto_por_nombre(nombre):
+    if not nombre or not nombre.strip():
+        return None
+    return _consultar_producto(f"nombre '{nombre}'", f"/productos?nombre={quote(nombre.strip())}")
+
+def obtener_producto_por_codigo(codigo):
+    codigo = normalizar_codigo(codigo)
+    if not codigo:
+        return None
+    return _consultar_producto(f"código '{codigo}'", f"/codigos/{quote(codigo, safe='')}")
+
+def buscar_productos(texto, limit=200):
+    try:
+        respuesta = obtener_cliente().solicitar("GET", f"/productos/buscar?texto={quote(texto)}&limit={int(limit)}")
+    except ErrorServidor as e:
+        logger.error("❌ Error al buscar productos '%s': %s", texto, e)
+        return []
+    return [_producto(p) for p in respuesta["productos"]]
+
+def obtener_productos_pagina(after_id=None, limit=200, orden="id", filtro=None, descendente=False, after_valor=None,
+                             nuevos_desde=None):
+    """Como `core.database.obtener_productos_pagina`; un `limit` negativo trae el resto en varias páginas."""
+    filas = []
+    while True:
+        parte = config.SERVIDOR_MAX_PAGINA if limit < 0 else min(limit - len(filas), config.SERVIDOR_MAX_PAGINA)
+        parametros = {"orden": orden, "limit": parte}
+        if descendente:
+            parametros["desc"] = 1
+        if filtro:
+            parametros["filtro"] = filtro
+        if after_id is not None:
+            parametros["after_id"] = after_id
+        if after_valor is not None:
+            parametros["after_valor"] = after_valor
+        if nuevos_desde is not None:
+            parametros["nuevos_desde"] = nuevos_desde
+        try:
+            pagina = obtener_cliente().solicitar("GET", f"/productos/pagina?{urlencode(parametros)}")["productos"]
+        except ErrorServidor as e:
+            logger.error("❌ Error al obtener página de productos: %s", e)
+            return filas
+        filas.extend(_producto(p) for p in pagina)
+        if len(pagina) < parte or len(filas) == limit:
+            return filas
+        after_id, after_valor = filas[-1][0], filas[-1][COLUMNAS_PRODUCTO.index(orden)]
+
+def obtener_productos_por_ids(ids, tamano_lote=500):
+    """Como `core.database.obtener_productos_por_ids`."""
+    ids = list(ids)
+    filas = []
+    for inicio in range(0, len(ids), tamano_lote):
+        parte = ",".join(str(int(i)) for i in ids[inicio:inicio + tamano_lote])
+        try:
+            respuesta = obtener_cliente().solicitar("GET", f"/productos?ids={parte}")
+        except ErrorServidor as e:
+            logger.error("❌ Error al obtener productos por ID: %s", e)
+            return []
+        filas.extend(_producto(p) for p in respuesta["productos"])
+    return filas
+
+def contar_productos(filtro=None):
+    try:
+        return obtener_cliente().solicitar("GET", f"/productos/contar?{urlencode({'filtro': filtro or ''})}")["total"]
+    except ErrorServidor as e:
+        logger.error("❌ Error al contar productos: %s", e)
+        return 0
+
+def precargar_catalogo():
+    """En modo cliente la caché del catálogo vive en el servidor."""
+    return 0
+
+def precargar_codigos():
+    return 0
+
+def cobrar_ticket(carrito, usuario_id):
+    """Como `core.ventas.cobrar_ticket`; el servidor toma el usuario de la sesión iniciada.
+
+    El ID del ticket se genera acá: si el pedido se reintenta, el servidor no lo cobra dos veces.
+    """
+    try:
+        lineas = [{"producto_id": l["producto_id"], "cantidad": l["cantidad"]} for l in carrito.lineas()]
+        return obtener_cliente().solicitar("POST", "/ventas", {"ticket_id": uuid.uuid4().hex, "lineas": lineas})
+    except ErrorServidor as e:
+        if e.estado == 409:
+            d = e.datos
+            raise StockInsuficiente(d["producto_id"], d["nombre"], d["solicitado"], d["disponible"]) from e
+        logger.error("❌ Error al registrar la venta en el servidor: %s", e)
+        return None
+
+def ajustar_stock(producto_id, diferencia):
+    """Suma `diferencia` al stock de un producto (requiere una sesión de admin). Devuelve el nuevo stock o None."""
+    try:
+        return obtener_cliente().solicitar("POST", f"/productos/{int(producto_id)}/stock",
+                                           {"diferencia": diferencia})["cantidad"]
+    except ErrorServidor as e:
+        if e.estado == 409:
+            d = e.datos
+            raise StockInsuficiente(d["producto_id"], d["nombre"], d["solicitado"], d["disponible"]) from e
+        logger.error("❌ Error al ajustar el stock del producto %s: %s", producto_id, e)
+        return None
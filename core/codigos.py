@@ -0,0 +1,152 @@
+import logging
+import sqlite3
+import threading
+from core.cache import cache_catalogo
+from core.database import conectar_db, obtener_producto_por_id
+
+logger = logging.getLogger(__name__)
+
+class IndiceCodigos:
+    """Mapa en memoria `código -> producto_id` para resolver el escáner sin consultar la base.
+
+    Se carga completo con `cargar()` al abrir la caja y las funciones de este
+    módulo lo mantienen al día. Cuando la caché del catálogo detecta escrituras de
+    otra conexión, se compara `codigos_version` (que mantienen los triggers de
+    `codigos_producto`) y el mapa solo se recarga si los códigos cambiaron. Un
+    código ausente del mapa se busca en la base antes de darlo por inexistente.
+    """
+
+    def __init__(self):
+        self._productos = {}  # código -> producto_id
+        self._lock = threading.Lock()
+        self._version = None  # codigos_version con la que se cargó el mapa
+        self._por_verificar = True
+        self._externas = None  # `cache_catalogo.invalidaciones_externas` al cargar o verificar el mapa
+        cache_catalogo.al_invalidar(self._al_invalidar_catalogo)
+
+    def _al_invalidar_catalogo(self, id_producto):
+        if id_producto is None:
+            self._por_verificar = True
+
+    @staticmethod
+    def _version_en_base(conn):
+        return conn.execute("SELECT version FROM codigos_version WHERE id = 1").fetchone()[0]
+
+    def cargar(self, conn):
+        """Lee todos los códigos de la base y reemplaza el mapa. Devuelve la cantidad."""
+        cache_catalogo.verificar_cambios_externos(conn, forzar=True)
+        self._por_verificar = False
+        self._externas = cache_catalogo.invalidaciones_externas
+        with self._lock:
+            version = self._version_en_base(conn)
+            self._productos = dict(conn.execute("SELECT codigo, producto_id FROM codigos_producto"))
+            self._version = version
+            return len(self._productos)
+
+    def obtener(self, conn, codigo):
+        """Devuelve el ID del producto con ese código, o None si no existe."""
+        cache_catalogo.verificar_cambios_externos(conn)
+        # Otra conexión cambió el catálogo: puede haber tocado códigos
+        if self._por_verificar or self._externas != cache_catalogo.invalidaciones_externas:
+            self._por_verificar = False
+            self._externas = cache_catalogo.invalidaciones_externas
+            if self._version_en_base(conn) != self._version:
+                self.cargar(conn)
+        producto_id = self._productos.get(codigo)
+        if producto_id is None:
+            fila = conn.execute("SELECT producto_id FROM codigos_producto WHERE codigo = ?", (codigo,)).fetchone()
+            if fila is not None:
+                producto_id = self._productos[codigo] = fila[0]
+        return producto_id
+
+    def registrar_cambio(self, conn, agregados=(), quitados=()):
+        """Aplica al mapa un cambio propio ya confirmado, sin recargarlo si nadie más tocó los códigos."""
+        with self._lock:
+            for codigo in quitados:
+                self._productos.pop(codigo, None)
+            self._productos.update(agregados)
+            version = self._version_en_base(conn)
+            if self._version is not None and version == self._version + len(agregados) + len(quitados):
+                self._version = version
+            else:
+                self._por_verificar = True
+
+    def __len__(self):
+        return len(self._productos)
+
+# Índice compartido por todo el proceso
+indice_codigos = IndiceCodigos()
+
+def normalizar_codigo(codigo):
+    """Quita espacios y saltos de línea que agregan algunos lectores de código de barras."""
+    return codigo.strip() if codigo else ""
+
+### **🔹 Funciones para manejar códigos**
+def agregar_codigo(producto_id, codigo):
+    """Asigna un código de barras o SKU a un producto. Falla si el código ya está en uso."""
+    codigo = normalizar_codigo(codigo)
+    if not codigo:
+        return False
+    try:
+        with conectar_db() as conn:
+            conn.execute("INSERT INTO codigos_producto (codigo, producto_id) VALUES (?, ?)", (codigo, producto_id))
+            conn.commit()
+            indice_codigos.registrar_cambio(conn, agregados={codigo: producto_id})
+            logger.info("✅ Código %s asignado al producto ID %s", codigo, producto_id)
+            return True
+    except sqlite3.IntegrityError:
+        logger.warning("⚠️ El código %s ya está asignado a otro producto.", codigo)
+        return False
+    except sqlite3.Error as e:
+        logger.error("❌ Error al asignar el código %s: %s", codigo, e)
+        return False
+
+def quitar_codigo(codigo):
+    """Quita un código de barras o SKU."""
+    codigo = normalizar_codigo(codigo)
+    try:
+        with conectar_db() as conn:
+            cursor = conn.execute("DELETE FROM codigos_producto WHERE codigo = ?", (codigo,))
+            conn.commit()
+            if cursor.rowcount:
+                indice_codigos.registrar_cambio(conn, quitados=(codigo,))
+            logger.info("✅ Código eliminado: %s", codigo)
+            return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error("❌ Error al eliminar el código %s: %s", codigo, e)
+        return False
+
+def obtener_codigos(producto_id):
+    """Devuelve los códigos asignados a un producto."""
+    try:
+        with conectar_db() as conn:
+            cursor = conn.execute("SELECT codigo FROM codigos_producto WHERE producto_id = ? ORDER BY codigo",
+                                  (producto_id,))
+            return [fila[0] for fila in cursor]
+    except sqlite3.Error as e:
+        logger.error("❌ Error al obtener los códigos del producto %s: %s", producto_id, e)
+        return []
+
+def obtener_producto_por_codigo(codigo):
+    """Obtiene el producto con ese código de barras o SKU (camino rápido del escáner)."""
+    codigo = normalizar_codigo(codigo)
+    if not codigo:
+        return None
+    try:
+        with conectar_db() as conn:
+            producto_id = indice_codigos.obtener(conn, codigo)
+    except sqlite3.Error as e:
+        logger.error("❌ Error al buscar el código %s: %s", codigo, e)
+        return None
+    return obtener_producto_por_id(producto_id) if producto_id is not None else None
+
+def precargar_codigos():
+    """Carga en memoria todos los códigos (se llama al abrir la caja)."""
+    try:
+        with conectar_db() as conn:
+            cantidad = indice_codigos.cargar(conn)
+        logger.info("✅ Códigos de productos precargados: %s", cantidad)
+        return cantidad
+    except sqlite3.Error as e:
+        logger.error("❌ Error al precargar los códigos de productos: %s", e)
+        return 0
@@ -0,0 +1,192 @@
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+from core.trazas import ConexionTrazada
+from utils import config
+
+logger = logging.getLogger(__name__)
+
+# PRAGMAs que se aplican una sola vez al abrir cada conexión
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+)
+
+def abrir_conexion(ruta, crear=True, wal=True):
+    """Abre una conexión nueva a `ruta` con los PRAGMAs del proyecto ya aplicados.
+
+    Con `config.TRAZAS_SQL_ACTIVO` la conexión es una `ConexionTrazada`, que mide
+    cada sentencia (ver `core.trazas`). Con `crear=False` falla si el archivo no
+    existe, en vez de crear una base vacía. Con `wal=False` se usa el journal
+    clásico (`DELETE`), que no necesita memoria compartida y sirve en una carpeta
+    de red; si otro proceso mantiene la base en WAL se lanza `sqlite3.OperationalError`.
+    """
+    fabrica = ConexionTrazada if config.TRAZAS_SQL_ACTIVO else sqlite3.Connection
+    if not crear:
+        destino, uri = f"file:{quote(os.path.abspath(ruta))}?mode=rw", True
+    else:
+        destino, uri = ruta, False
+    conn = sqlite3.connect(destino, check_same_thread=False, factory=fabrica, uri=uri)
+    try:
+        for pragma in PRAGMAS if wal else PRAGMAS[1:]:
+            conn.execute(pragma)
+        if not wal and conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+            # Salir de WAL requiere que nadie más tenga la base abierta
+            try:
+                conn.execute("PRAGMA journal_mode = DELETE")
+            except sqlite3.OperationalError:
+                raise sqlite3.OperationalError("la base está en modo WAL y otro proceso la tiene abierta; "
+                                               "una base compartida por red no puede usar WAL") from None
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+class GestorConexiones:
+    """Mantiene una conexión persistente por hilo hacia la base de datos.
+
+    Cada hilo reutiliza su propia conexión, de modo que las funciones de `core`
+    dejan de pagar el costo de abrir, configurar y cerrar SQLite en cada llamada.
+    Las conexiones de hilos que ya terminaron se cierran al crear nuevas.
+    """
+
+    def __init__(self, ruta, max_conexiones=config.DB_MAX_CONEXIONES,
+                 intervalo_verificacion=config.DB_INTERVALO_VERIFICACION):
+        self.ruta = ruta
+        self.max_conexiones = max_conexiones
+        self.intervalo_verificacion = intervalo_verificacion
+        self._local = threading.local()
+        self._conexiones = {}  # ident del hilo -> (hilo, conexión)
+        self._lock = threading.Lock()
+        self._cerrado = False
+
+    def obtener(self):
+        """Devuelve la conexión del hilo actual, creándola o reparándola si hace falta."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            ahora = time.monotonic()
+            if ahora - self._local.verificada < self.intervalo_verificacion:
+                return conn
+            if self._esta_sana(conn):
+                self._local.verificada = ahora
+                return conn
+            logger.warning("⚠️ Conexión a la base de datos inválida, se abrirá una nueva.")
+            self._descartar(threading.get_ident())
+
+        if self._cerrado:
+            raise sqlite3.ProgrammingError("El gestor de conexiones ya fue cerrado.")
+
+        conn = abrir_conexion(self.ruta)
+        hilo = threading.current_thread()
+        with self._lock:
+            self._podar_hilos_terminados()
+            self._conexiones[hilo.ident] = (hilo, conn)
+            if len(self._conexiones) > self.max_conexiones:
+                logger.warning("⚠️ Hay %s conexiones abiertas (máximo sugerido: %s).", len(self._conexiones), self.max_conexiones)
+        self._local.conn = conn
+        self._local.verificada = time.monotonic()
+        return conn
+
+    def liberar(self):
+        """Cierra la conexión del hilo actual, si la tiene (útil al terminar un hilo de trabajo)."""
+        if getattr(self._local, "conn", None) is not None:
+            ident = threading.get_ident()
+            with self._lock:
+                _, conn = self._conexiones.pop(ident, (None, None))
+            self._local.conn = None
+            if conn is not None:
+                self._cerrar_conexion(conn)
+
+    def cantidad_conexiones(self):
+        """Cantidad de conexiones abiertas actualmente."""
+        with self._lock:
+            return len(self._conexiones)
+
+    def cerrar(self):
+        """Cierra todas las conexiones abiertas. Es seguro llamarlo más de una vez."""
+        with self._lock:
+            conexiones = list(self._conexiones.values())
+            self._conexiones.clear()
+            self._cerrado = True
+        for _, conn in conexiones:
+            self._cerrar_conexion(conn)
+        self._local = threading.local()
+
+    @staticmethod
+    def _esta_sana(conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _cerrar_conexion(conn):
+        try:
+            conn.execute("PRAGMA optimize")
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Error al cerrar una conexión: %s", e)
+
+    def _descartar(self, ident):
+        with self._lock:
+            _, conn = self._conexiones.pop(ident, (None, None))
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass  # Ya estaba inutilizable
+        self._local.conn = None
+
+    def _podar_hilos_terminados(self):
+        """Cierra las conexiones de hilos que ya no existen. Requiere `self._lock`."""
+        for ident, (hilo, conn) in list(self._conexiones.items()):
+            if not hilo.is_alive():
+                del self._conexiones[ident]
+                self._cerrar_conexion(conn)
+
+_gestor = None
+_gestor_lock = threading.Lock()
+
+def obtener_gestor():
+    """Devuelve el gestor de conexiones global, creándolo con `config.DB_PATH` la primera vez."""
+    global _gestor
+    if _gestor is None:
+        with _gestor_lock:
+            if _gestor is None:
+                _gestor = GestorConexiones(config.DB_PATH)
+    return _gestor
+
+def obtener_conexion():
+    """Devuelve la conexión persistente del hilo actual."""
+    return obtener_gestor().obtener()
+
+def liberar_conexion():
+    """Cierra la conexión persistente del hilo actual."""
+    if _gestor is not None:
+        _gestor.liberar()
+
+def configurar_ruta_db(ruta):
+    """Cambia la base de datos activa cerrando las conexiones hacia la anterior."""
+    global _gestor
+    with _gestor_lock:
+        anterior, _gestor = _gestor, GestorConexiones(ruta)
+    if anterior is not None:
+        anterior.cerrar()
+
+def cerrar_conexiones():
+    """Cierra todas las conexiones persistentes (se ejecuta también al salir)."""
+    global _gestor
+    with _gestor_lock:
+        anterior, _gestor = _gestor, None
+    if anterior is not None:
+        anterior.cerrar()
+
+atexit.register(cerrar_conexiones)
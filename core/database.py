@@ -1,47 +1,54 @@
+import re
 import sqlite3
+import time
 import logging
-import pandas as pd
-from utils.config import DB_PATH  # ✅ Ruta centralizada de la BD
+from core.cache import cache_catalogo
+from core.conexion import obtener_conexion  # ✅ Conexiones persistentes por hilo
+from core.migraciones import aplicar_migraciones, version_actual
+from utils import config
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
 
 def conectar_db():
-    """Devuelve una conexión a la base de datos utilizando un gestor de contexto."""
+    """Devuelve la conexión persistente del hilo actual a la base de datos.
+
+    Se usa como gestor de contexto: `with conectar_db() as conn` confirma o revierte
+    la transacción al salir, pero no cierra la conexión, que se reutiliza.
+    """
     try:
-        return sqlite3.connect(DB_PATH)
+        return obtener_conexion()
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al conectar con la base de datos: {e}")
+        logger.error("❌ Error al conectar con la base de datos: %s", e)
         return None
 
 def inicializar_db():
-    """Crea las tablas necesarias en la base de datos si no existen."""
+    """Lleva el esquema de la base de datos a la última versión aplicando las migraciones pendientes.
+
+    En una caja que sincroniza con una central (`config.SINC_CENTRAL`) crea además
+    el registro de ventas por enviar, antes de que se pueda cobrar nada.
+    """
     with conectar_db() as conn:
-        cursor = conn.cursor()
-        # Tabla de usuarios
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                dni TEXT UNIQUE NOT NULL,
-                rol TEXT NOT NULL
-            )
-        ''')
-        # Tabla de productos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS productos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT UNIQUE NOT NULL,
-                cantidad INTEGER NOT NULL CHECK (cantidad >= 0),
-                precio REAL NOT NULL CHECK (precio >= 0)
-            )
-        ''')
-        conn.commit()
-        logging.info("✅ Base de datos inicializada correctamente.")
+        aplicadas = aplicar_migraciones(conn)
+        if config.SINC_CENTRAL:
+            from core.sincronizacion import preparar_replica  # Importa este módulo: se evita el ciclo
+            preparar_replica(conn)
+        logger.info("✅ Base de datos inicializada correctamente (versión %s, %s migraciones nuevas).", version_actual(conn), len(aplicadas))
 
 ### **🔹 Funciones para manejar productos**
+# Columnas de las filas de producto, en el orden en que las devuelven todas las consultas
+# de este módulo (búsquedas puntuales, páginas, búsqueda por texto) y las guarda la caché
+COLUMNAS_PRODUCTO = ("id", "nombre", "cantidad", "precio", "categoria")
+SQL_FILA_PRODUCTO = f"SELECT {', '.join(COLUMNAS_PRODUCTO)} FROM productos"
+
+def _refrescar_cache(cursor, id_producto):
+    """Relee un producto recién escrito, actualiza la caché (write-through) y devuelve la fila."""
+    fila = cursor.execute(f"{SQL_FILA_PRODUCTO} WHERE id = ?", (id_producto,)).fetchone()
+    if fila is None:
+        cache_catalogo.invalidar(id_producto)
+    else:
+        cache_catalogo.guardar(fila)
+    return fila
+
 def obtener_productos():
     """Obtiene la lista de productos desde la base de datos."""
     try:
@@ -50,35 +57,48 @@ def obtener_productos():
             cursor.execute("SELECT * FROM productos")
             return cursor.fetchall()
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al obtener productos: {e}")
+        logger.error("❌ Error al obtener productos: %s", e)
         return []
 
 def agregar_producto(nombre, categoria, cantidad, precio):
-    """Agrega un producto a la base de datos con la nueva columna de categoría."""
+    """Agrega un producto a la base de datos con la nueva columna de categoría.
+
+    Devuelve la fila `(id, nombre, cantidad, precio, categoria)` guardada, para que
+    quien la muestra la agregue sin recargar todo, o False si hubo un error.
+    """
     try:
         with conectar_db() as conn:
             cursor = conn.cursor()
             cursor.execute("INSERT INTO productos (nombre, categoria, cantidad, precio) VALUES (?, ?, ?, ?)",
                            (nombre, categoria, cantidad, precio))
             conn.commit()
-            logging.info(f"✅ Producto agregado: {nombre} - Categoría: {categoria} - Cantidad: {cantidad} - Precio: {precio}")
-            return True
+            fila = _refrescar_cache(cursor, cursor.lastrowid)
+            logger.info("✅ Producto agregado: %s - Categoría: %s - Cantidad: %s - Precio: %s", nombre, categoria, cantidad, precio)
+            return fila
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al agregar producto: {e}")
+        logger.error("❌ Error al agregar producto: %s", e)
         return False
 
-def actualizar_producto(id_producto, nombre, cantidad, precio):
-    """Actualiza un producto en la base de datos."""
+def actualizar_producto(id_producto, nombre, categoria, cantidad, precio):
+    """Actualiza un producto en la base de datos.
+
+    Devuelve la fila `(id, nombre, cantidad, precio, categoria)` como quedó, o False
+    si hubo un error o el producto ya no existe.
+    """
     try:
         with conectar_db() as conn:
             cursor = conn.cursor()
-            cursor.execute("UPDATE productos SET nombre = ?, cantidad = ?, precio = ? WHERE id = ?", 
-                           (nombre, cantidad, precio, id_producto))
+            cursor.execute("UPDATE productos SET nombre = ?, categoria = ?, cantidad = ?, precio = ? WHERE id = ?",
+                           (nombre, categoria, cantidad, precio, id_producto))
             conn.commit()
-            logging.info(f"✅ Producto actualizado - ID: {id_producto}, Nombre: {nombre}, Cantidad: {cantidad}, Precio: {precio}")
-            return True
+            fila = _refrescar_cache(cursor, id_producto)
+            if fila is None:
+                logger.warning("⚠️ No se encontró el producto con ID %s para actualizarlo.", id_producto)
+                return False
+            logger.info("✅ Producto actualizado - ID: %s, Nombre: %s, Categoría: %s, Cantidad: %s, Precio: %s", id_producto, nombre, categoria, cantidad, precio)
+            return fila
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al actualizar producto: {e}")
+        logger.error("❌ Error al actualizar producto: %s", e)
         return False
 
 def eliminar_producto(id_producto):
@@ -88,23 +108,67 @@ def eliminar_producto(id_producto):
             cursor = conn.cursor()
             cursor.execute("DELETE FROM productos WHERE id = ?", (id_producto,))
             conn.commit()
-            logging.info(f"✅ Producto eliminado - ID: {id_producto}")
+            cache_catalogo.invalidar(id_producto)
+            logger.info("✅ Producto eliminado - ID: %s", id_producto)
             return True
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al eliminar producto: {e}")
+        logger.error("❌ Error al eliminar producto: %s", e)
         return False
 
 def obtener_producto_por_id(id_producto):
-    """Obtiene un producto por su ID."""
+    """Obtiene un producto `(id, nombre, cantidad, precio, categoria)` por su ID, usando la caché."""
     try:
         with conectar_db() as conn:
+            producto = cache_catalogo.obtener(conn, id_producto)
+            if producto is not None:
+                return producto
+            generacion = cache_catalogo.generacion
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM productos WHERE id = ?", (id_producto,))
-            return cursor.fetchone()
+            cursor.execute(f"{SQL_FILA_PRODUCTO} WHERE id = ?", (id_producto,))
+            producto = cursor.fetchone()
+            if producto is not None:
+                cache_catalogo.guardar(producto, generacion)
+            return producto
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al obtener producto por ID '{id_producto}': {e}")
+        logger.error("❌ Error al obtener producto por ID '%s': %s", id_producto, e)
         return None
 
+def obtener_producto_por_nombre(nombre):
+    """Obtiene un producto por su nombre (sin distinguir mayúsculas), usando la caché."""
+    if not nombre or not nombre.strip():
+        return None
+    try:
+        with conectar_db() as conn:
+            producto = cache_catalogo.obtener_por_nombre(conn, nombre)
+            if producto is not None:
+                return producto
+            generacion = cache_catalogo.generacion
+            cursor = conn.cursor()
+            cursor.execute(f"{SQL_FILA_PRODUCTO} WHERE nombre = ? COLLATE NOCASE", (nombre.strip(),))
+            producto = cursor.fetchone()
+            if producto is not None:
+                cache_catalogo.guardar(producto, generacion)
+            return producto
+    except sqlite3.Error as e:
+        logger.error("❌ Error al obtener producto por nombre '%s': %s", nombre, e)
+        return None
+
+def precargar_catalogo():
+    """Carga en la caché todo el catálogo (hasta su capacidad) con una sola consulta."""
+    try:
+        with conectar_db() as conn:
+            cache_catalogo.verificar_cambios_externos(conn, forzar=True)
+            generacion = cache_catalogo.generacion
+            cursor = conn.cursor()
+            cursor.execute(f"{SQL_FILA_PRODUCTO} ORDER BY id LIMIT ?", (cache_catalogo.capacidad,))
+            cache_catalogo.precargar(cursor, generacion)
+            cantidad = cache_catalogo.estadisticas()["entradas"]
+        logger.info("✅ Catálogo precargado en caché: %s productos.", cantidad)
+        return cantidad
+    except sqlite3.Error as e:
+        logger.error("❌ Error al precargar el catálogo: %s", e)
+        return 0
+
 def obtener_cantidad_productos():
     """Obtiene la cantidad total de productos registrados."""
     try:
@@ -114,43 +178,195 @@ def obtener_cantidad_productos():
             cantidad = cursor.fetchone()[0]
             return cantidad
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al obtener cantidad de productos: {e}")
+        logger.error("❌ Error al obtener cantidad de productos: %s", e)
         return 0
 
-def importar_desde_excel(archivo):
-    """Importa productos desde un archivo Excel y los guarda en la base de datos."""
+### **🔹 Paginación de productos**
+# Se puede ordenar una página por cualquiera de `COLUMNAS_PRODUCTO`. La paginación
+# es por clave (keyset): cada página continúa después de la última fila de la
+# anterior, así que el costo no depende de cuántas páginas se hayan leído. Ordenar
+# por cantidad o precio funciona, pero no tiene índice y recorre la tabla en cada página.
+_EXPRESION_ORDEN = {"nombre": "nombre COLLATE NOCASE"}
+
+def _condicion_filtro(filtro):
+    if not filtro:
+        return "", []
+    patron = filtro.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return "nombre LIKE ? ESCAPE '\\'", [f"%{patron}%"]
+
+def obtener_productos_pagina(after_id=None, limit=200, orden="id", filtro=None, descendente=False, after_valor=None,
+                             nuevos_desde=None):
+    """Obtiene una página de productos ordenada por `orden`, a continuación del producto `after_id`.
+
+    Devuelve filas `(id, nombre, cantidad, precio, categoria)`. Para la primera página
+    se pasa `after_id=None`. Si se ordena por una columna distinta de `id`, conviene
+    pasar también `after_valor` (el valor de esa columna en la última fila recibida);
+    si no, se consulta. `filtro` busca el texto dentro del nombre y `nuevos_desde`
+    deja solo los productos con ID mayor (los agregados después de ese).
+    """
+    if orden not in COLUMNAS_PRODUCTO:
+        raise ValueError(f"No se puede ordenar productos por '{orden}'.")
+    expresion = _EXPRESION_ORDEN.get(orden, orden)
+    operador, sentido = ("<", "DESC") if descendente else (">", "ASC")
+    condiciones, parametros = [], []
+
+    try:
+        with conectar_db() as conn:
+            cursor = conn.cursor()
+            if after_id is not None:
+                if orden == "id":
+                    condiciones.append(f"id {operador} ?")
+                    parametros.append(after_id)
+                else:
+                    if after_valor is None:
+                        fila = cursor.execute(f"SELECT {orden} FROM productos WHERE id = ?", (after_id,)).fetchone()
+                        after_valor = fila[0] if fila else None
+                    # SQLite ordena los NULL primero en orden ascendente y al final en descendente
+                    if after_valor is not None:
+                        # La primera condición permite buscar en el índice; la segunda desempata por id
+                        condicion = f"{expresion} {operador}= ? AND ({expresion}, id) {operador} (?, ?)"
+                        parametros.extend([after_valor, after_valor, after_id])
+                        if descendente:
+                            condicion = f"({condicion}) OR {orden} IS NULL"
+                    else:
+                        condicion = f"({orden} IS NULL AND id {operador} ?)"
+                        parametros.append(after_id)
+                        if not descendente:
+                            condicion += f" OR {orden} IS NOT NULL"
+                    condiciones.append(f"({condicion})")
+
+            condicion, parametros_filtro = _condicion_filtro(filtro)
+            if condicion:
+                condiciones.append(condicion)
+                parametros.extend(parametros_filtro)
+            if nuevos_desde is not None:
+                condiciones.append("id > ?")
+                parametros.append(nuevos_desde)
+
+            where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+            orden_sql = "id" if orden == "id" else f"{expresion} {sentido}, id"
+            cursor.execute(f"""
+                {SQL_FILA_PRODUCTO}
+                {where}
+                ORDER BY {orden_sql} {sentido}
+                LIMIT ?
+            """, (*parametros, limit))
+            return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error("❌ Error al obtener página de productos: %s", e)
+        return []
+
+def obtener_productos_por_ids(ids, tamano_lote=500):
+    """Obtiene las filas `(id, nombre, cantidad, precio, categoria)` de los productos `ids` que existen.
+
+    Sirve para refrescar solo las filas que ya muestra una vista. El orden del
+    resultado no está definido.
+    """
+    ids = list(ids)
+    filas = []
     try:
-        df = pd.read_excel(archivo)
+        with conectar_db() as conn:
+            cursor = conn.cursor()
+            for inicio in range(0, len(ids), tamano_lote):
+                parte = ids[inicio:inicio + tamano_lote]
+                cursor.execute(f"{SQL_FILA_PRODUCTO} WHERE id IN ({', '.join('?' * len(parte))})", parte)
+                filas.extend(cursor.fetchall())
+            return filas
+    except sqlite3.Error as e:
+        logger.error("❌ Error al obtener productos por ID: %s", e)
+        return []
 
-        # Verificar que el archivo tenga las columnas esperadas
-        columnas_esperadas = {"Nombre", "Cantidad", "Precio"}
-        if not columnas_esperadas.issubset(df.columns):
-            logging.error("❌ El archivo Excel no tiene las columnas necesarias: 'Nombre', 'Cantidad', 'Precio'.")
-            return False
+def contar_productos(filtro=None):
+    """Cuenta los productos, opcionalmente solo los que contienen `filtro` en el nombre."""
+    condicion, parametros = _condicion_filtro(filtro)
+    try:
+        with conectar_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM productos {'WHERE ' + condicion if condicion else ''}", parametros)
+            return cursor.fetchone()[0]
+    except sqlite3.Error as e:
+        logger.error("❌ Error al contar productos: %s", e)
+        return 0
+
+### **🔹 Búsqueda de productos**
+def _consulta_fts(texto):
+    """Convierte el texto del usuario en una consulta FTS5 de prefijos: "azu pol" -> "azu"* "pol"*."""
+    palabras = re.findall(r"\w+", texto)
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
+
+def buscar_productos(texto, limit=200):
+    """Busca productos por nombre o categoría usando el índice de texto completo.
 
+    Coincide por prefijo de cada palabra y sin distinguir mayúsculas ni acentos
+    ("azucar" encuentra "Azúcar"). Devuelve filas `(id, nombre, cantidad, precio, categoria)`
+    ordenadas por relevancia. Si la base no tiene FTS5 busca el texto dentro del nombre.
+    """
+    consulta = _consulta_fts(texto)
+    if not consulta:
+        return []
+    try:
         with conectar_db() as conn:
             cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'productos_fts'")
+            if cursor.fetchone() is None:
+                return obtener_productos_pagina(limit=limit, orden="nombre", filtro=texto)
+            cursor.execute("""
+                SELECT p.id, p.nombre, p.cantidad, p.precio, p.categoria
+                FROM productos_fts
+                JOIN productos p ON p.id = productos_fts.rowid
+                WHERE productos_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?
+            """, (consulta, limit))
+            return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error("❌ Error al buscar productos '%s': %s", texto, e)
+        return []
+
+def importar_desde_excel(archivo):
+    """Importa productos desde un archivo Excel y los guarda en la base de datos.
 
-            for _, row in df.iterrows():
-                nombre = str(row["Nombre"]).title().strip()  # Normalizar nombre
-                cantidad = int(row["Cantidad"]) if pd.notna(row["Cantidad"]) else 0
-                precio = float(row["Precio"]) if pd.notna(row["Precio"]) else 0.0
+    Devuelve un diccionario con las cantidades insertadas, actualizadas y
+    rechazadas (ver `core.importacion.importar_productos`), o False si el
+    archivo no es válido.
+    """
+    from core.importacion import importar_productos  # Evita la importación circular
+    return importar_productos(archivo)
 
-                # Validaciones
-                if cantidad < 0 or precio < 0:
-                    logging.warning(f"⚠️ Datos inválidos para {nombre}: cantidad y precio deben ser positivos.")
-                    continue
+### **🔹 Mantenimiento**
+def _tamano_db(cursor):
+    cursor.execute("PRAGMA page_count")
+    paginas = cursor.fetchone()[0]
+    cursor.execute("PRAGMA page_size")
+    return paginas * cursor.fetchone()[0]
 
-                # Insertar o actualizar productos
-                cursor.execute("""
-                    INSERT INTO productos (nombre, cantidad, precio)
-                    VALUES (?, ?, ?)
-                    ON CONFLICT(nombre) DO UPDATE SET cantidad = cantidad + ?, precio = ?
-                """, (nombre, cantidad, precio, cantidad, precio))
+def compactar_db(analizar=False):
+    """Reconstruye el archivo de la base con VACUUM y vacía el WAL.
 
+    Recupera el espacio que dejan los borrados y desfragmenta tablas e índices.
+    Con `analizar` también recalcula las estadísticas del planificador (ANALYZE).
+    Necesita que ninguna otra terminal esté escribiendo. Devuelve un diccionario
+    con los bytes antes y después y los segundos que tomó, o False si hubo un error.
+    """
+    inicio = time.perf_counter()
+    try:
+        conn = conectar_db()
+        cursor = conn.cursor()
+        antes = _tamano_db(cursor)
+        cursor.execute("PRAGMA freelist_count")
+        libres = cursor.fetchone()[0]
+        conn.commit()  # VACUUM no puede correr dentro de una transacción
+        cursor.execute("VACUUM")
+        if analizar:
+            cursor.execute("ANALYZE")
             conn.commit()
-        logging.info("✅ Productos importados desde Excel correctamente.")
-        return True
-    except Exception as e:
-        logging.error(f"❌ Error al importar productos desde Excel: {e}")
+        # VACUUM escribe la base entera en el WAL: se vuelca y se trunca para devolver el espacio
+        cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        despues = _tamano_db(cursor)
+    except sqlite3.Error as e:
+        logger.error("❌ Error al compactar la base de datos: %s", e)
         return False
+    segundos = time.perf_counter() - inicio
+    logger.info("✅ Base compactada: %s → %s bytes en %.1f s.", antes, despues, segundos)
+    return {"bytes_antes": antes, "bytes_despues": despues, "paginas_libres": libres,
+            "analizada": analizar, "segundos": round(segundos, 3)}
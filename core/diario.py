@@ -0,0 +1,276 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import uuid
+import zlib
+from datetime import datetime
+from core.cache import cache_catalogo
+from core.conexion import liberar_conexion
+from core.database import conectar_db
+from core.reportes import actualizar_resumenes
+from core.ventas import StockInsuficiente, aplicar_tickets
+from utils import config
+
+logger = logging.getLogger(__name__)
+
+### **🔹 Formato del diario**
+# Cada registro es: largo del contenido (4 bytes), CRC32 del contenido (4 bytes)
+# y el ticket en JSON. Un corte de luz a mitad de una escritura deja un último
+# registro incompleto o con CRC incorrecto, que se descarta al recuperar.
+
+CABECERA = struct.Struct(">II")
+
+def codificar_registro(ticket):
+    """Serializa un ticket como registro del diario."""
+    contenido = json.dumps(ticket, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return CABECERA.pack(len(contenido), zlib.crc32(contenido)) + contenido
+
+def leer_registros(ruta):
+    """Lee los registros válidos del diario, en orden.
+
+    Devuelve `(tickets, bytes_validos)`; la lectura se detiene en el primer
+    registro incompleto o dañado.
+    """
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    tickets = []
+    posicion = 0
+    while posicion + CABECERA.size <= len(datos):
+        largo, crc = CABECERA.unpack_from(datos, posicion)
+        inicio = posicion + CABECERA.size
+        contenido = datos[inicio:inicio + largo]
+        if len(contenido) < largo or zlib.crc32(contenido) != crc:
+            break
+        tickets.append(json.loads(contenido))
+        posicion = inicio + largo
+    return tickets, posicion
+
+class DiarioVentas:
+    """Cobro con escritura diferida: el ticket se anota en el diario y se vuelca a la base por lotes.
+
+    `registrar()` controla el stock (lo que hay en la base menos lo anotado y aún
+    no volcado), agrega el registro al archivo con fsync y vuelve enseguida. Un
+    hilo volcador aplica los tickets pendientes en transacciones de hasta
+    `lote_maximo` tickets, de modo que muchos tickets comparten un solo commit.
+    Como `tickets.id` es único, volver a aplicar un registro no lo duplica: al
+    abrir, `recuperar()` reaplica todo lo que haya quedado en el archivo.
+    """
+
+    def __init__(self, ruta=config.DIARIO_VENTAS_RUTA, intervalo=config.DIARIO_INTERVALO_VOLCADO,
+                 lote_maximo=config.DIARIO_LOTE_MAXIMO, fsync=config.DIARIO_FSYNC,
+                 espera_maxima=config.DIARIO_ESPERA_MAXIMA):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.lote_maximo = lote_maximo
+        self.fsync = fsync
+        self.espera_maxima = espera_maxima
+        self._lock = threading.Lock()  # Archivo, pendientes y reservas
+        self._lock_volcado = threading.Lock()  # Un solo volcado a la vez
+        self._pendientes = []  # Tickets anotados y aún no volcados, en orden
+        self._reservado = {}  # producto_id -> unidades anotadas y aún no volcadas
+        self._hay_trabajo = threading.Event()
+        self._detener = threading.Event()
+        self._archivo = None
+        self._hilo = None
+        self.tickets_volcados = 0
+        self.lotes_volcados = 0
+        self.fallos = 0  # Volcados seguidos que terminaron en error; espacian el siguiente intento
+
+    # --- Ciclo de vida ---
+
+    def abrir(self):
+        """Recupera lo que haya quedado sin volcar y arranca el hilo volcador."""
+        self.recuperar()
+        self._archivo = open(self.ruta, "ab")
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._volcador, name="volcador-diario", daemon=True)
+        self._hilo.start()
+        return self
+
+    def recuperar(self):
+        """Aplica a la base los registros del diario (los ya aplicados se omiten) y lo vacía."""
+        if not os.path.exists(self.ruta) or not os.path.getsize(self.ruta):
+            return 0
+        tickets, validos = leer_registros(self.ruta)
+        descartados = os.path.getsize(self.ruta) - validos
+        if descartados:
+            logger.warning("⚠️ Diario de ventas con un registro incompleto al final: se descartan %s bytes.", descartados)
+        aplicados = 0
+        for inicio in range(0, len(tickets), self.lote_maximo):
+            aplicados += self._aplicar(tickets[inicio:inicio + self.lote_maximo])
+        os.truncate(self.ruta, 0)
+        logger.info("✅ Diario de ventas recuperado: %s registros, %s tickets nuevos aplicados.", len(tickets), aplicados)
+        return aplicados
+
+    def cerrar(self):
+        """Detiene el volcador, vuelca lo pendiente y cierra el archivo."""
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hay_trabajo.set()
+        self._hilo.join()
+        self._hilo = None
+        self.volcar()
+        self._archivo.close()
+
+    # --- Cobro ---
+
+    def registrar(self, carrito, usuario_id, ticket_id=None, fecha=None):
+        """Anota el ticket en el diario y devuelve el mismo diccionario que `registrar_venta`.
+
+        Lanza `StockInsuficiente` si alguna línea supera el stock disponible, o
+        devuelve None si no se pudo leer el stock.
+        """
+        lineas = [dict(linea) for linea in carrito.lineas()]
+        if not lineas:
+            raise ValueError("El carrito está vacío.")
+        ticket = {
+            "ticket_id": ticket_id or uuid.uuid4().hex,
+            "usuario_id": usuario_id,
+            "fecha": fecha or datetime.now().isoformat(sep=" ", timespec="seconds"),
+            "total": carrito.total(),
+            "lineas": lineas,
+        }
+        registro = codificar_registro(ticket)
+        with self._lock:
+            try:
+                self._verificar_stock(lineas)
+            except sqlite3.Error as e:
+                logger.error("❌ Error al controlar el stock del ticket %s: %s", ticket['ticket_id'], e)
+                return None
+            self._archivo.write(registro)
+            self._archivo.flush()
+            if self.fsync:
+                os.fsync(self._archivo.fileno())
+            self._pendientes.append(ticket)
+            for linea in lineas:
+                self._reservado[linea["producto_id"]] = self._reservado.get(linea["producto_id"], 0) + linea["cantidad"]
+        self._hay_trabajo.set()
+        return ticket
+
+    def _verificar_stock(self, lineas):
+        ids = [linea["producto_id"] for linea in lineas]
+        cursor = conectar_db().execute(
+            f"SELECT id, cantidad FROM productos WHERE id IN ({', '.join('?' * len(ids))})", ids)
+        stock = dict(cursor.fetchall())
+        for linea in lineas:
+            disponible = stock.get(linea["producto_id"], 0) - self._reservado.get(linea["producto_id"], 0)
+            if disponible < linea["cantidad"]:
+                error = StockInsuficiente(linea["producto_id"], linea["nombre"], linea["cantidad"], max(disponible, 0))
+                logger.warning("⚠️ Venta rechazada: %s", error)
+                raise error
+
+    def pendientes(self):
+        """Cantidad de tickets anotados que todavía no están en la base."""
+        with self._lock:
+            return len(self._pendientes)
+
+    # --- Volcado ---
+
+    def _volcador(self):
+        try:
+            while not self._detener.is_set():
+                self._hay_trabajo.wait()
+                # Esperar un poco junta más tickets en la misma transacción
+                if self._detener.wait(self.intervalo):
+                    break
+                try:
+                    volcado = self.volcar()
+                except Exception:
+                    # Un error inesperado (p. ej. al truncar el archivo) no debe matar el hilo:
+                    # los tickets anotados quedarían sin llegar a la base hasta reabrir la caja
+                    logger.exception("❌ Error inesperado al volcar el diario de ventas")
+                    self._hay_trabajo.set()
+                    volcado = False
+                if volcado:
+                    self.fallos = 0
+                else:
+                    # Base ocupada o con error: reintentar más tarde, cada vez más espaciado
+                    self.fallos += 1
+                    self._detener.wait(min(2 ** (self.fallos - 1), self.espera_maxima))
+        finally:
+            liberar_conexion()
+
+    def volcar(self):
+        """Aplica a la base los tickets pendientes. Devuelve False si hubo un error (quedan pendientes)."""
+        with self._lock_volcado:
+            while True:
+                self._hay_trabajo.clear()
+                with self._lock:
+                    lote = self._pendientes[:self.lote_maximo]
+                if not lote:
+                    return True
+                try:
+                    self._aplicar(lote)
+                except sqlite3.Error as e:
+                    logger.error("❌ Error al volcar el diario de ventas (%s tickets pendientes): %s", len(lote), e)
+                    self._hay_trabajo.set()
+                    return False
+                # Entre el commit y este punto el stock ya bajó y la reserva todavía no:
+                # por un instante `registrar()` ve menos stock del real, nunca más
+                with self._lock:
+                    del self._pendientes[:len(lote)]
+                    for ticket in lote:
+                        for linea in ticket["lineas"]:
+                            restante = self._reservado[linea["producto_id"]] - linea["cantidad"]
+                            if restante:
+                                self._reservado[linea["producto_id"]] = restante
+                            else:
+                                del self._reservado[linea["producto_id"]]
+                    if not self._pendientes:
+                        # Todo lo anotado ya está en la base: el diario vuelve a empezar
+                        self._archivo.flush()
+                        os.ftruncate(self._archivo.fileno(), 0)
+                self.tickets_volcados += len(lote)
+                self.lotes_volcados += 1
+
+    def _aplicar(self, tickets):
+        """Aplica los tickets en una sola transacción, omitiendo los que ya están en la base."""
+        conn = conectar_db()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            # Si otra terminal vendió el mismo stock después del control, el ticket se registra igual
+            aplicados, productos, _ = aplicar_tickets(cursor, tickets)
+            actualizar_resumenes(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        for id_producto in productos:
+            cache_catalogo.invalidar(id_producto)
+        return aplicados
+
+_diario = None
+_lock_diario = threading.Lock()
+
+def obtener_diario():
+    """Devuelve el diario de ventas del proceso, abriéndolo (y recuperándolo) la primera vez."""
+    global _diario
+    with _lock_diario:
+        if _diario is None:
+            _diario = DiarioVentas().abrir()
+            atexit.register(cerrar_diario)
+        return _diario
+
+def cerrar_diario():
+    """Vuelca lo pendiente y cierra el diario de ventas, si estaba abierto."""
+    global _diario
+    with _lock_diario:
+        if _diario is not None:
+            _diario.cerrar()
+            _diario = None
+
+def recuperar_diario(ruta=config.DIARIO_VENTAS_RUTA):
+    """Reaplica un diario que haya quedado con registros, aunque el modo diario esté desactivado."""
+    if not os.path.exists(ruta) or not os.path.getsize(ruta):
+        return 0
+    try:
+        return DiarioVentas(ruta).recuperar()
+    except sqlite3.Error as e:
+        logger.error("❌ Error al recuperar el diario de ventas '%s': %s", ruta, e)
+        return None
@@ -1,34 +1,330 @@
-import smtplib
+import atexit
+import sqlite3
+import threading
+import time
 import logging
-from email.mime.text import MIMEText
-from utils.config import SMTP_SERVER, SMTP_PORT, EMAIL_ADDRESS, EMAIL_PASSWORD  # ✅ Usa config.py
+from datetime import datetime
+from core.conexion import liberar_conexion
+from core.database import conectar_db
+from utils import config
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
 
-def enviar_correo(destinatario, asunto, mensaje):
-    """Envía un correo electrónico asegurando codificación UTF-8."""
+### **🔹 Mensajes**
+def construir_mensaje(destinatario, asunto, mensaje):
+    """Arma el correo asegurando codificación UTF-8."""
+    from email.mime.text import MIMEText  # El paquete email se carga recién al enviar el primer correo
+    # ✅ Especificar UTF-8 para evitar errores con caracteres especiales
+    msg = MIMEText(mensaje, "plain", "utf-8")
+    msg['Subject'] = asunto
+    msg['From'] = config.EMAIL_ADDRESS
+    msg['To'] = destinatario
+    return msg
+
+### **🔹 Bandeja de salida**
+def _ahora_texto():
+    return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+def encolar_correos(correos):
+    """Guarda en la bandeja de salida los `(destinatario, asunto, mensaje)` dados y avisa al enviador.
+
+    Devuelve cuántos se encolaron (0 si hubo un error). El envío ocurre después,
+    en el hilo de `EnviadorCorreos`.
+    """
+    creado = _ahora_texto()
     try:
-        # ✅ Especificar UTF-8 para evitar errores con caracteres especiales
-        msg = MIMEText(mensaje, "plain", "utf-8")  
-        msg['Subject'] = asunto
-        msg['From'] = EMAIL_ADDRESS
-        msg['To'] = destinatario
-
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()  # Habilita cifrado TLS
-            server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)  # Inicia sesión
-            server.sendmail(EMAIL_ADDRESS, destinatario, msg.as_string())
-
-        logging.info(f"✅ Correo enviado correctamente a {destinatario}")
+        with conectar_db() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT INTO correos_salientes (destinatario, asunto, mensaje, creado_en)
+                VALUES (?, ?, ?, ?)
+            """, ((destinatario, asunto, mensaje, creado) for destinatario, asunto, mensaje in correos))
+            cantidad = cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error("❌ Error al encolar correos: %s", e)
+        return 0
+    if _enviador is not None:
+        _enviador.avisar()
+    return cantidad
+
+def enviar_correo(destinatario, asunto, mensaje):
+    """Encola un correo para enviarlo en segundo plano. Devuelve True si quedó en la bandeja."""
+    if encolar_correos([(destinatario, asunto, mensaje)]):
+        logger.info("✅ Correo para %s encolado", destinatario)
         return True
+    return False
+
+def estado_bandeja():
+    """Cantidad de correos por estado (`pendiente`, `enviado`, `fallido`)."""
+    try:
+        with conectar_db() as conn:
+            filas = conn.execute("SELECT estado, COUNT(*) FROM correos_salientes GROUP BY estado").fetchall()
+            return {"pendiente": 0, "enviado": 0, "fallido": 0, **dict(filas)}
+    except sqlite3.Error as e:
+        logger.error("❌ Error al consultar la bandeja de salida: %s", e)
+        return None
+
+def reencolar_fallidos():
+    """Vuelve a poner en cola los correos fallidos, con los intentos en cero."""
+    try:
+        with conectar_db() as conn:
+            cursor = conn.execute("""
+                UPDATE correos_salientes SET estado = 'pendiente', intentos = 0, proximo_intento = 0
+                WHERE estado = 'fallido'
+            """)
+            cantidad = cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error("❌ Error al reencolar los correos fallidos: %s", e)
+        return 0
+    if cantidad and _enviador is not None:
+        _enviador.avisar()
+    return cantidad
+
+### **🔹 Envío en segundo plano**
+def _errores_del_correo():
+    """Respuestas del servidor a un correo concreto (las SMTPException también son OSError)."""
+    import smtplib
+    return smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused
+
+class ErrorConexionSMTP(Exception):
+    """No se pudo conectar, cifrar o iniciar sesión en el servidor SMTP."""
+
+class EnviadorCorreos:
+    """Hilo que vacía la bandeja de salida por una única conexión SMTP reutilizada.
+
+    Cada tanda toma hasta `lote` correos pendientes (dejándolos "arrendados" para
+    que otra terminal no los tome también), los envía por la conexión abierta y
+    guarda los resultados en una sola transacción. Los errores temporales se
+    reintentan con espera exponencial; los rechazos definitivos (códigos 5xx) y
+    los que agotan `max_intentos` quedan como `fallido`. La conexión se cierra
+    tras `inactividad` segundos sin envíos.
+    """
+
+    def __init__(self, lote=config.CORREO_LOTE, intervalo=config.CORREO_INTERVALO,
+                 max_intentos=config.CORREO_MAX_INTENTOS, espera_reintento=config.CORREO_ESPERA_REINTENTO,
+                 espera_maxima=config.CORREO_ESPERA_MAXIMA, inactividad=config.CORREO_INACTIVIDAD):
+        self.lote = lote
+        self.intervalo = intervalo
+        self.max_intentos = max_intentos
+        self.espera_reintento = espera_reintento
+        self.espera_maxima = espera_maxima
+        self.inactividad = inactividad
+        self._smtp = None
+        self._ultimo_uso = 0.0
+        self._aviso = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self.conexiones_abiertas = 0
+        self.enviados = 0
+        self.fallos = 0  # Tandas seguidas que terminaron en error; espacian la siguiente revisión
+
+    # --- Ciclo de vida ---
+
+    def iniciar(self):
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="enviador-correos", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        """Detiene el hilo al terminar la tanda en curso y cierra la conexión SMTP."""
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._aviso.set()
+        self._hilo.join()
+        self._hilo = None
+
+    def avisar(self):
+        """Despierta al hilo porque hay correos nuevos."""
+        self._aviso.set()
+
+    def _bucle(self):
+        try:
+            while not self._detener.is_set():
+                espera = self.intervalo
+                try:
+                    resultado = self.procesar_pendientes()
+                    self.fallos = 0
+                except Exception as e:
+                    # Un error inesperado no debe matar el hilo: los correos quedarían sin enviar para siempre
+                    if isinstance(e, sqlite3.Error):
+                        logger.error("❌ Error al leer la bandeja de salida: %s", e)
+                    else:
+                        logger.exception("❌ Error inesperado al procesar la bandeja de salida")
+                    self._cerrar_smtp()
+                    self.fallos += 1
+                    espera = min(self.intervalo * 2 ** self.fallos, self.espera_maxima)
+                    resultado = None
+                if resultado and sum(resultado.values()) >= self.lote:
+                    continue  # Quedan más en la bandeja
+                self._aviso.wait(espera)
+                self._aviso.clear()
+                if self._smtp is not None and time.monotonic() - self._ultimo_uso > self.inactividad:
+                    self._cerrar_smtp()
+        finally:
+            self._cerrar_smtp()
+            liberar_conexion()
+
+    # --- Bandeja ---
+
+    def procesar_pendientes(self):
+        """Envía una tanda de correos pendientes y devuelve cuántos se enviaron, se reintentarán o fallaron."""
+        correos = self._tomar_lote()
+        resultado = {"enviados": 0, "reintentos": 0, "fallidos": 0}
+        if not correos:
+            return resultado
+        # smtplib (y ssl) se importan recién cuando hay algo para enviar: no demoran el arranque
+        import smtplib
+        enviados, reintentos, fallidos = [], [], []
+        ahora = time.time()
+        for indice, (id_correo, destinatario, asunto, mensaje, intentos) in enumerate(correos):
+            try:
+                self._enviar(destinatario, asunto, mensaje)
+                enviados.append(id_correo)
+            except ErrorConexionSMTP as e:
+                # Sin servidor no tiene sentido seguir con la tanda: todo se reintenta más tarde
+                logger.error("❌ No se pudo conectar al servidor SMTP: %s", e)
+                for pendiente in correos[indice:]:
+                    self._anotar_error(pendiente, str(e), False, ahora, reintentos, fallidos)
+                break
+            except smtplib.SMTPException as e:
+                self._anotar_error(correos[indice], str(e), _es_rechazo_definitivo(e), ahora, reintentos, fallidos)
+            except Exception as e:
+                # Un correo que no se puede armar (p. ej. un destinatario con saltos de línea) se descarta:
+                # si cortara la tanda, los ya enviados no se marcarían y se repetirían en cada arriendo
+                logger.exception("❌ Error inesperado al enviar el correo %s", id_correo)
+                self._anotar_error(correos[indice], f"{type(e).__name__}: {e}", True, ahora, reintentos, fallidos)
+        self._guardar_resultados(enviados, reintentos, fallidos)
+        self.enviados += len(enviados)
+        resultado.update(enviados=len(enviados), reintentos=len(reintentos), fallidos=len(fallidos))
+        if reintentos or fallidos:
+            logger.warning("⚠️ Bandeja de salida: %s enviados, %s para reintentar, %s fallidos",
+                           len(enviados), len(reintentos), len(fallidos))
+        return resultado
+
+    def _tomar_lote(self):
+        """Toma los próximos correos pendientes y los arrienda para que nadie más los envíe a la vez."""
+        ahora = time.time()
+        conn = conectar_db()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            correos = conn.execute("""
+                SELECT id, destinatario, asunto, mensaje, intentos
+                FROM correos_salientes
+                WHERE estado = 'pendiente' AND proximo_intento <= ?
+                ORDER BY id
+                LIMIT ?
+            """, (ahora, self.lote)).fetchall()
+            # Si el proceso muere a mitad de la tanda, el arriendo vence y se vuelven a enviar
+            arriendo = ahora + config.SMTP_TIMEOUT * (len(correos) + 1)
+            conn.executemany("UPDATE correos_salientes SET proximo_intento = ? WHERE id = ?",
+                             [(arriendo, correo[0]) for correo in correos])
+            conn.commit()
+            return correos
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+    def _anotar_error(self, correo, error, definitivo, ahora, reintentos, fallidos):
+        id_correo, destinatario, _, _, intentos = correo
+        intentos += 1
+        if definitivo or intentos >= self.max_intentos:
+            logger.error("❌ Correo %s para %s descartado tras %s intentos: %s", id_correo, destinatario, intentos, error)
+            fallidos.append((intentos, error, id_correo))
+        else:
+            espera = min(self.espera_reintento * 2 ** (intentos - 1), self.espera_maxima)
+            reintentos.append((intentos, ahora + espera, error, id_correo))
+
+    def _guardar_resultados(self, enviados, reintentos, fallidos):
+        conn = conectar_db()
+        with conn:
+            conn.executemany("UPDATE correos_salientes SET estado = 'enviado', enviado_en = ?, ultimo_error = NULL "
+                             "WHERE id = ?", [(_ahora_texto(), id_correo) for id_correo in enviados])
+            conn.executemany("UPDATE correos_salientes SET intentos = ?, proximo_intento = ?, ultimo_error = ? "
+                             "WHERE id = ?", reintentos)
+            conn.executemany("UPDATE correos_salientes SET estado = 'fallido', intentos = ?, ultimo_error = ? "
+                             "WHERE id = ?", fallidos)
+
+    # --- SMTP ---
+
+    def _conectar(self):
+        import smtplib
+        try:
+            if config.SMTP_TLS == "ssl":
+                smtp = smtplib.SMTP_SSL(config.SMTP_SERVER, config.SMTP_PORT, timeout=config.SMTP_TIMEOUT)
+            else:
+                smtp = smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT, timeout=config.SMTP_TIMEOUT)
+                if config.SMTP_TLS == "starttls":
+                    smtp.starttls()  # Habilita cifrado TLS
+            if config.EMAIL_PASSWORD:
+                smtp.login(config.EMAIL_ADDRESS, config.EMAIL_PASSWORD)  # Inicia sesión
+        except smtplib.SMTPAuthenticationError as e:
+            raise ErrorConexionSMTP(f"autenticación SMTP fallida, verifica tu correo y contraseña ({e})") from e
+        except (OSError, smtplib.SMTPException) as e:
+            raise ErrorConexionSMTP(str(e) or type(e).__name__) from e
+        self.conexiones_abiertas += 1
+        return smtp
+
+    def _enviar(self, destinatario, asunto, mensaje):
+        import smtplib
+        errores_del_correo = _errores_del_correo()
+        texto = construir_mensaje(destinatario, asunto, mensaje).as_string()
+        reutilizada = self._smtp is not None
+        if not reutilizada:
+            self._smtp = self._conectar()
+        try:
+            self._smtp.sendmail(config.EMAIL_ADDRESS, destinatario, texto)
+        except errores_del_correo:
+            raise  # El servidor rechazó este correo: la conexión sigue sirviendo
+        except (smtplib.SMTPServerDisconnected, OSError) as e:
+            # El servidor pudo cerrar una conexión ociosa: se reconecta una vez y se reintenta
+            self._cerrar_smtp()
+            if not reutilizada:
+                raise ErrorConexionSMTP(str(e) or type(e).__name__) from e
+            self._smtp = self._conectar()
+            try:
+                self._smtp.sendmail(config.EMAIL_ADDRESS, destinatario, texto)
+            except errores_del_correo:
+                raise
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                self._cerrar_smtp()
+                raise ErrorConexionSMTP(str(e) or type(e).__name__) from e
+        self._ultimo_uso = time.monotonic()
+
+    def _cerrar_smtp(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            import smtplib
+            try:
+                smtp.quit()
+            except (OSError, smtplib.SMTPException):
+                smtp.close()
+
+def _es_rechazo_definitivo(error):
+    """True si el servidor rechazó el correo con un código 5xx (reintentar no cambiaría nada)."""
+    import smtplib
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(codigo >= 500 for codigo, _ in error.recipients.values())
+    codigo = getattr(error, "smtp_code", None)
+    return isinstance(codigo, int) and codigo >= 500
+
+_enviador = None
+_lock_enviador = threading.Lock()
+
+def obtener_enviador():
+    """Devuelve el enviador de correos del proceso, iniciándolo la primera vez."""
+    global _enviador
+    with _lock_enviador:
+        if _enviador is None:
+            _enviador = EnviadorCorreos().iniciar()
+            atexit.register(detener_enviador)
+        return _enviador
 
-    except smtplib.SMTPAuthenticationError:
-        logging.error("❌ Error: Autenticación SMTP fallida. Verifica tu correo y contraseña.")
-        return False
-    except smtplib.SMTPException as e:
-        logging.error(f"❌ Error SMTP al enviar correo: {e}")
-        return False
-    except Exception as e:
-        logging.error(f"❌ Error inesperado al enviar correo: {e}")
-        return False
+def detener_enviador():
+    """Detiene el enviador de correos, si estaba en marcha. Lo pendiente queda en la bandeja."""
+    global _enviador
+    with _lock_enviador:
+        if _enviador is not None:
+            _enviador.detener()
+            _enviador = None
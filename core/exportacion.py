@@ -0,0 +1,185 @@
+import csv
+import logging
+import os
+import sqlite3
+import time
+from core.database import conectar_db
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 10000
+FILAS_POR_HOJA_XLSX = 1_048_576  # Límite de Excel, encabezado incluido
+
+COLUMNAS_PRODUCTOS = ("ID", "Nombre", "Categoria", "Cantidad", "Precio")
+COLUMNAS_VENTAS = ("ID", "Ticket", "Fecha", "Usuario ID", "Producto ID", "Producto", "Categoria",
+                   "Cantidad", "Precio unitario", "Importe")
+
+class ExportacionCancelada(Exception):
+    """La exportación se canceló; el archivo parcial ya fue borrado."""
+
+### **🔹 Escritores**
+# Reciben lotes de tuplas y los vuelcan al archivo sin acumularlos en memoria.
+
+class EscritorCSV:
+    """Escribe un CSV en UTF-8 con BOM, que Excel abre con los acentos correctos."""
+
+    def __init__(self, archivo, columnas):
+        self._archivo = open(archivo, "w", newline="", encoding="utf-8-sig")
+        self._csv = csv.writer(self._archivo)
+        self._csv.writerow(columnas)
+
+    def escribir(self, filas):
+        self._csv.writerows(filas)
+
+    def cerrar(self):
+        self._archivo.close()
+
+class EscritorXLSX:
+    """Escribe un libro de Excel con openpyxl en modo `write_only` (memoria constante).
+
+    Al llegar al límite de filas de una hoja continúa en una hoja nueva con el mismo encabezado.
+    """
+
+    def __init__(self, archivo, columnas):
+        self._ruta = archivo
+        self._columnas = columnas
+        from openpyxl import Workbook  # Solo se carga si se exporta a Excel
+        self._libro = Workbook(write_only=True)
+        self._hoja = None
+        self._filas_en_hoja = FILAS_POR_HOJA_XLSX
+        self._hojas = 0
+
+    def _nueva_hoja(self):
+        self._hojas += 1
+        self._hoja = self._libro.create_sheet(f"Datos {self._hojas}" if self._hojas > 1 else "Datos")
+        self._hoja.append(self._columnas)
+        self._filas_en_hoja = 1
+
+    def escribir(self, filas):
+        for fila in filas:
+            if self._filas_en_hoja >= FILAS_POR_HOJA_XLSX:
+                self._nueva_hoja()
+            self._hoja.append(fila)
+            self._filas_en_hoja += 1
+
+    def cerrar(self):
+        if self._hoja is None:
+            self._nueva_hoja()
+        self._libro.save(self._ruta)
+
+ESCRITORES = {
+    ".csv": EscritorCSV,
+    ".xlsx": EscritorXLSX,
+}
+
+### **🔹 Consultas**
+def _consulta_productos(categoria=None):
+    sql = "SELECT id, nombre, categoria, cantidad, precio FROM productos"
+    parametros = []
+    if categoria:
+        sql += " WHERE categoria = ?"
+        parametros.append(categoria)
+    return sql + " ORDER BY id", parametros
+
+def _consulta_ventas(desde=None, hasta=None, categoria=None):
+    condiciones, parametros = [], []
+    if desde:
+        condiciones.append("v.fecha >= ?")
+        parametros.append(desde)
+    if hasta:
+        # 'AAAA-MM-DD hh:mm:ss' < 'AAAA-MM-DDZ': incluye todo el día `hasta`
+        condiciones.append("v.fecha < ? || 'Z'")
+        parametros.append(hasta)
+    if categoria:
+        # El `+` evita que SQLite recorra ventas por idx_ventas_producto y tenga que ordenar al final
+        condiciones.append("+v.producto_id IN (SELECT id FROM productos WHERE categoria = ?)")
+        parametros.append(categoria)
+    sql = '''
+        SELECT v.id, v.ticket_id, v.fecha, v.usuario_id, v.producto_id, p.nombre, p.categoria, v.cantidad,
+               COALESCE(v.precio_unitario, p.precio),
+               ROUND(v.cantidad * COALESCE(v.precio_unitario, p.precio), 2)
+        FROM ventas v LEFT JOIN productos p ON p.id = v.producto_id
+    '''
+    if condiciones:
+        sql += " WHERE " + " AND ".join(condiciones)
+    # Con rango de fechas se recorre idx_ventas_fecha en orden; así SQLite no tiene que ordenar en memoria
+    sql += " ORDER BY v.fecha, v.id" if desde or hasta else " ORDER BY v.id"
+    return sql, parametros
+
+### **🔹 Exportación**
+def exportar_consulta(archivo, sql, parametros, columnas, tamano_lote=TAMANO_LOTE, progreso=None, cancelado=None):
+    """Recorre la consulta con `fetchmany` y escribe cada lote en el archivo.
+
+    El formato sale de la extensión (ver `ESCRITORES`). `progreso(filas)` se llama
+    tras cada lote; si `cancelado()` devuelve True se borra el archivo parcial y se
+    lanza `ExportacionCancelada`. Devuelve un diccionario con `archivo`, `filas`,
+    `segundos` y `filas_por_segundo`.
+    """
+    extension = os.path.splitext(archivo)[1].lower()
+    escritor_clase = ESCRITORES.get(extension)
+    if escritor_clase is None:
+        raise ValueError(f"Formato de archivo no soportado: '{extension}'. Use {', '.join(ESCRITORES)}.")
+
+    inicio = time.perf_counter()
+    filas = 0
+    escritor = escritor_clase(archivo, columnas)
+    cursor = None
+    try:
+        cursor = conectar_db().cursor()
+        cursor.execute(sql, parametros)
+        while True:
+            if cancelado is not None and cancelado():
+                raise ExportacionCancelada()
+            lote = cursor.fetchmany(tamano_lote)
+            if not lote:
+                break
+            escritor.escribir(lote)
+            filas += len(lote)
+            if progreso is not None:
+                progreso(filas)
+    except BaseException:
+        escritor.cerrar()
+        os.remove(archivo)
+        raise
+    finally:
+        # Un cursor sin agotar mantiene abierta la lectura y frena los checkpoints del WAL
+        if cursor is not None:
+            cursor.close()
+    escritor.cerrar()
+
+    segundos = time.perf_counter() - inicio
+    return {"archivo": archivo, "filas": filas, "segundos": segundos,
+            "filas_por_segundo": filas / segundos if segundos else 0.0}
+
+def _exportar(descripcion, archivo, sql, parametros, columnas, **opciones):
+    try:
+        resultado = exportar_consulta(archivo, sql, parametros, columnas, **opciones)
+    except ExportacionCancelada:
+        logger.warning("⚠️ Exportación de %s a '%s' cancelada.", descripcion, archivo)
+        raise
+    except (ValueError, OSError, sqlite3.Error) as e:
+        logger.error("❌ Error al exportar %s a '%s': %s", descripcion, archivo, e)
+        return False
+    logger.info("✅ Exportación de %s a '%s': %s filas en %.1f s (%.0f filas/s).", descripcion, archivo,
+                resultado["filas"], resultado["segundos"], resultado["filas_por_segundo"])
+    return resultado
+
+def exportar_productos(archivo, categoria=None, tamano_lote=TAMANO_LOTE, progreso=None, cancelado=None):
+    """Exporta los productos (opcionalmente de una categoría) a CSV o XLSX.
+
+    Las columnas Nombre, Cantidad y Precio se llaman igual que en la importación.
+    Devuelve el resultado de `exportar_consulta`, o False si hubo un error.
+    """
+    sql, parametros = _consulta_productos(categoria)
+    return _exportar("productos", archivo, sql, parametros, COLUMNAS_PRODUCTOS,
+                     tamano_lote=tamano_lote, progreso=progreso, cancelado=cancelado)
+
+def exportar_ventas(archivo, desde=None, hasta=None, categoria=None, tamano_lote=TAMANO_LOTE,
+                    progreso=None, cancelado=None):
+    """Exporta las líneas de venta entre `desde` y `hasta` ('AAAA-MM-DD', inclusivos) a CSV o XLSX.
+
+    Devuelve el resultado de `exportar_consulta`, o False si hubo un error.
+    """
+    sql, parametros = _consulta_ventas(desde, hasta, categoria)
+    return _exportar("ventas", archivo, sql, parametros, COLUMNAS_VENTAS,
+                     tamano_lote=tamano_lote, progreso=progreso, cancelado=cancelado)
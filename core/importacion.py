@@ -0,0 +1,275 @@
+import csv
+import logging
+import os
+from core.cache import cache_catalogo
+from core.database import conectar_db
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS_REQUERIDAS = ("Nombre", "Cantidad", "Precio")
+TAMANO_LOTE = 5000
+
+SQL_UPSERT_PRODUCTO = """
+    INSERT INTO productos (nombre, cantidad, precio)
+    VALUES (?, ?, ?)
+    ON CONFLICT(nombre) DO UPDATE SET cantidad = cantidad + excluded.cantidad, precio = excluded.precio
+"""
+
+class ErrorImportacion(Exception):
+    """El archivo no se puede importar (formato o columnas incorrectas)."""
+
+class ImportacionCancelada(Exception):
+    """La importación se canceló; la transacción ya fue revertida."""
+
+def _verificar_columnas(columnas):
+    faltantes = [c for c in COLUMNAS_REQUERIDAS if c not in columnas]
+    if faltantes:
+        raise ErrorImportacion(f"Faltan las columnas: {', '.join(faltantes)}.")
+
+### **🔹 Lectores por lotes**
+# Todos entregan DataFrames con exactamente las columnas de COLUMNAS_REQUERIDAS
+# y, como índice, el número de fila que el usuario ve en su archivo.
+
+def leer_excel_por_lotes(archivo, tamano_lote=TAMANO_LOTE):
+    """Lee la primera hoja de un Excel en modo solo lectura y la entrega en DataFrames de `tamano_lote` filas.
+
+    El índice de cada DataFrame es el número de fila en la hoja, para poder
+    informar rechazos con la misma numeración que ve el usuario en Excel.
+    """
+    import pandas as pd  # pandas y openpyxl tardan en cargarse: solo cuando se importa un archivo
+    from openpyxl import load_workbook
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            raise ErrorImportacion("El archivo Excel está vacío.")
+        columnas = [str(c).strip() if c is not None else "" for c in encabezado]
+        _verificar_columnas(columnas)
+
+        posiciones = [columnas.index(c) for c in COLUMNAS_REQUERIDAS]
+        lote, primera_fila = [], 2
+        for fila in filas:
+            lote.append([fila[i] if i < len(fila) else None for i in posiciones])
+            if len(lote) == tamano_lote:
+                yield pd.DataFrame(lote, columns=COLUMNAS_REQUERIDAS,
+                                   index=pd.RangeIndex(primera_fila, primera_fila + len(lote)))
+                primera_fila += len(lote)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote, columns=COLUMNAS_REQUERIDAS,
+                               index=pd.RangeIndex(primera_fila, primera_fila + len(lote)))
+    finally:
+        libro.close()
+
+def leer_csv_por_lotes(archivo, tamano_lote=TAMANO_LOTE, encoding="utf-8-sig"):
+    """Lee un CSV por lotes con el lector en C de pandas.
+
+    El separador se detecta a partir del encabezado; con `;` se asume coma decimal,
+    como en las listas de precios exportadas con configuración regional en español.
+    """
+    import pandas as pd
+    with open(archivo, newline="", encoding=encoding) as f:
+        encabezado = f.readline()
+    if not encabezado.strip():
+        raise ErrorImportacion("El archivo CSV está vacío.")
+    try:
+        separador = csv.Sniffer().sniff(encabezado, delimiters=",;\t|").delimiter
+    except csv.Error:
+        separador = ","
+    columnas = {c.strip(): c for c in next(csv.reader([encabezado], delimiter=separador))}
+    _verificar_columnas(columnas)
+
+    coma_decimal = separador == ";"
+    lector = pd.read_csv(archivo, sep=separador, encoding=encoding, chunksize=tamano_lote,
+                         usecols=[columnas[c] for c in COLUMNAS_REQUERIDAS],
+                         decimal="," if coma_decimal else ".")
+    primera_fila = 2
+    with lector:
+        for lote in lector:
+            lote.columns = [c.strip() for c in lote.columns]
+            if coma_decimal:
+                # pandas solo aplica `decimal` a columnas totalmente numéricas
+                for columna in ("Cantidad", "Precio"):
+                    if not pd.api.types.is_numeric_dtype(lote[columna]):
+                        lote[columna] = lote[columna].str.replace(",", ".", regex=False)
+            lote.index = pd.RangeIndex(primera_fila, primera_fila + len(lote))
+            primera_fila += len(lote)
+            yield lote[list(COLUMNAS_REQUERIDAS)]
+
+def leer_parquet_por_lotes(archivo, tamano_lote=TAMANO_LOTE):
+    """Lee un Parquet por grupos de filas (requiere pyarrow)."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ErrorImportacion("Se necesita el paquete 'pyarrow' para importar archivos Parquet.")
+    import pandas as pd
+    parquet = pq.ParquetFile(archivo)
+    _verificar_columnas(parquet.schema_arrow.names)
+    primera_fila = 1
+    for lote in parquet.iter_batches(batch_size=tamano_lote, columns=list(COLUMNAS_REQUERIDAS)):
+        df = lote.to_pandas()
+        df.index = pd.RangeIndex(primera_fila, primera_fila + len(df))
+        primera_fila += len(df)
+        yield df
+
+LECTORES = {
+    ".xlsx": leer_excel_por_lotes,
+    ".xlsm": leer_excel_por_lotes,
+    ".csv": leer_csv_por_lotes,
+    ".parquet": leer_parquet_por_lotes,
+}
+
+### **🔹 Validación e importación**
+
+def validar_lote(df):
+    """Normaliza y valida un lote de forma vectorizada.
+
+    Devuelve `(validos, rechazos)`: un DataFrame con columnas nombre, cantidad y
+    precio listo para insertar, y una Serie con el motivo de rechazo por fila.
+    """
+    import pandas as pd
+    nombres = df["Nombre"].astype("string").str.strip().str.title()
+    cantidades = pd.to_numeric(df["Cantidad"], errors="coerce")
+    precios = pd.to_numeric(df["Precio"], errors="coerce")
+
+    motivos = pd.Series(pd.NA, index=df.index, dtype="string")
+    # Las reglas posteriores no pisan a las anteriores: se informa el primer problema
+    reglas = (
+        (nombres.isna() | (nombres == ""), "Nombre vacío"),
+        (df["Cantidad"].notna() & cantidades.isna(), "Cantidad no numérica"),
+        (df["Precio"].notna() & precios.isna(), "Precio no numérico"),
+        (cantidades < 0, "Cantidad negativa"),
+        (precios < 0, "Precio negativo"),
+    )
+    for mascara, motivo in reglas:
+        motivos = motivos.mask(mascara.fillna(False) & motivos.isna(), motivo)
+
+    aceptadas = motivos.isna()
+    validos = pd.DataFrame({
+        "nombre": nombres[aceptadas].astype(object),
+        "cantidad": cantidades[aceptadas].fillna(0).astype("int64"),
+        "precio": precios[aceptadas].fillna(0.0).astype("float64"),
+    })
+    return validos, motivos[~aceptadas]
+
+def _escribir_reporte(ruta, lote, rechazos, primera_vez):
+    filas = lote.loc[rechazos.index].assign(Motivo=rechazos)
+    filas.to_csv(ruta, mode="w" if primera_vez else "a", header=primera_vez, index_label="Fila")
+
+def importar_lotes(lotes, reporte=None, progreso=None, cancelado=None):
+    """Valida e inserta/actualiza los lotes dentro de una única transacción.
+
+    Si se indica `reporte`, las filas rechazadas se escriben en ese CSV con su motivo
+    (el archivo solo se crea si hay rechazos; si no los hay, se borra el que haya
+    dejado una importación anterior). `progreso(filas)` se llama después de
+    cada lote con el total de filas procesadas; si `cancelado()` devuelve True antes
+    de un lote, se revierte todo y se lanza `ImportacionCancelada`.
+
+    Devuelve un diccionario con las claves `insertados`, `actualizados`, `rechazados`,
+    `rechazos` (lista de `(fila, motivo)`), `reporte` (ruta del reporte o None) y
+    `ultimo_id_anterior` (los productos nuevos tienen IDs mayores).
+    """
+    resultado = {"insertados": 0, "actualizados": 0, "rechazados": 0, "rechazos": [], "reporte": None,
+                 "ultimo_id_anterior": 0}
+    aceptados = procesadas = 0
+
+    with conectar_db() as conn:
+        cursor = conn.cursor()
+        antes, resultado["ultimo_id_anterior"] = cursor.execute(
+            "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM productos").fetchone()
+        for lote in lotes:
+            if cancelado is not None and cancelado():
+                if resultado["reporte"]:
+                    os.remove(resultado["reporte"])
+                raise ImportacionCancelada()
+            validos, rechazos = validar_lote(lote)
+            if len(rechazos):
+                resultado["rechazos"].extend(zip(rechazos.index.tolist(), rechazos.tolist()))
+                if reporte:
+                    _escribir_reporte(reporte, lote, rechazos, resultado["reporte"] is None)
+                    resultado["reporte"] = reporte
+            cursor.executemany(SQL_UPSERT_PRODUCTO, validos.itertuples(index=False, name=None))
+            aceptados += len(validos)
+            procesadas += len(lote)
+            if progreso is not None:
+                progreso(procesadas)
+        despues = cursor.execute("SELECT COUNT(*) FROM productos").fetchone()[0]
+    # Un import toca cantidades y precios de muchos productos: se vacía la caché entera
+    cache_catalogo.invalidar()
+    if reporte and resultado["reporte"] is None and os.path.exists(reporte):
+        # Los rechazos de la importación anterior ya no corresponden al archivo
+        os.remove(reporte)
+
+    resultado["insertados"] = despues - antes
+    resultado["actualizados"] = aceptados - resultado["insertados"]
+    resultado["rechazados"] = len(resultado["rechazos"])
+    return resultado
+
+def ruta_reporte_rechazos(archivo):
+    """Ruta por defecto del reporte de rechazos: junto al archivo importado."""
+    base, _ = os.path.splitext(archivo)
+    return f"{base}_rechazos.csv"
+
+def estimar_filas(archivo):
+    """Estima la cantidad de filas de datos de un archivo importable, o None si no se puede.
+
+    Sirve para mostrar progreso: es exacto para Parquet y Excel (si el archivo guarda
+    sus dimensiones) y aproximado para CSV, a partir del largo medio de las primeras líneas.
+    """
+    extension = os.path.splitext(archivo)[1].lower()
+    try:
+        if extension in (".xlsx", ".xlsm"):
+            from openpyxl import load_workbook
+            libro = load_workbook(archivo, read_only=True)
+            try:
+                maximo = libro.worksheets[0].max_row
+            finally:
+                libro.close()
+            return maximo - 1 if maximo else None
+        if extension == ".csv":
+            with open(archivo, "rb") as f:
+                muestra = f.read(1 << 16)
+            lineas = muestra.count(b"\n")
+            if not lineas:
+                return None
+            return max(int(os.path.getsize(archivo) / (len(muestra) / lineas)) - 1, 0)
+        if extension == ".parquet":
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(archivo).metadata.num_rows
+    except Exception as e:
+        logger.warning("⚠️ No se pudo estimar el tamaño de '%s': %s", archivo, e)
+    return None
+
+def importar_productos(archivo, reporte=True, tamano_lote=TAMANO_LOTE, progreso=None, cancelado=None):
+    """Importa productos desde Excel, CSV o Parquet según la extensión del archivo.
+
+    `reporte` puede ser True (reporte de rechazos junto al archivo), False (sin
+    reporte) o la ruta donde escribirlo; `progreso` y `cancelado` se pasan a
+    `importar_lotes`. Devuelve el resultado de `importar_lotes`, o False si el
+    archivo no se pudo importar. Si se cancela, lanza `ImportacionCancelada`.
+    """
+    extension = os.path.splitext(archivo)[1].lower()
+    lector = LECTORES.get(extension)
+    if lector is None:
+        logger.error("❌ Formato de archivo no soportado: '%s'. Use %s.", extension, ', '.join(LECTORES))
+        return False
+    if reporte is True:
+        reporte = ruta_reporte_rechazos(archivo)
+
+    try:
+        resultado = importar_lotes(lector(archivo, tamano_lote), reporte or None, progreso, cancelado)
+    except ImportacionCancelada:
+        logger.warning("⚠️ Importación de '%s' cancelada; no se guardaron cambios.", archivo)
+        raise
+    except ErrorImportacion as e:
+        logger.error("❌ No se pudo importar '%s': %s", archivo, e)
+        return False
+    except Exception as e:
+        logger.error("❌ Error al importar productos desde '%s': %s", archivo, e)
+        return False
+
+    logger.info("✅ Importación de '%s': %s insertados, %s actualizados, %s rechazados.", archivo, resultado['insertados'], resultado['actualizados'], resultado['rechazados'])
+    if resultado["reporte"]:
+        logger.warning("⚠️ Filas rechazadas guardadas en: %s", resultado['reporte'])
+    return resultado
@@ -0,0 +1,339 @@
+import logging
+import sqlite3
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+### **🔹 Pasos de migración**
+# Cada paso recibe un cursor dentro de una transacción abierta y debe ser
+# seguro sobre bases creadas por versiones anteriores de `inicializar_db()`.
+
+def _columnas(cursor, tabla):
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    return {fila[1] for fila in cursor.fetchall()}
+
+def _migracion_esquema_base(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            dni TEXT UNIQUE NOT NULL,
+            rol TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS productos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            cantidad INTEGER NOT NULL CHECK (cantidad >= 0),
+            precio REAL NOT NULL CHECK (precio >= 0),
+            categoria TEXT DEFAULT 'Otros'
+        )
+    ''')
+    if "categoria" not in _columnas(cursor, "productos"):
+        cursor.execute("ALTER TABLE productos ADD COLUMN categoria TEXT DEFAULT 'Otros'")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ventas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER,
+            producto_id INTEGER,
+            cantidad INTEGER,
+            fecha TEXT,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE,
+            FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE
+        )
+    ''')
+
+def _migracion_nombre_unico(cursor):
+    """Normaliza los nombres, fusiona duplicados y crea el índice único sin distinguir mayúsculas."""
+    cursor.execute("UPDATE productos SET nombre = trim(nombre) WHERE nombre <> trim(nombre)")
+    cursor.execute('''
+        SELECT nombre COLLATE NOCASE, min(id), sum(cantidad), max(id)
+        FROM productos
+        GROUP BY nombre COLLATE NOCASE
+        HAVING count(*) > 1
+    ''')
+    for nombre, id_conservado, cantidad_total, id_mas_reciente in cursor.fetchall():
+        # Se conserva el registro más antiguo con el stock total y el precio más reciente
+        cursor.execute('''
+            UPDATE productos
+            SET cantidad = ?, precio = (SELECT precio FROM productos WHERE id = ?)
+            WHERE id = ?
+        ''', (cantidad_total, id_mas_reciente, id_conservado))
+        cursor.execute('''
+            UPDATE ventas SET producto_id = ?
+            WHERE producto_id IN (SELECT id FROM productos WHERE nombre = ? COLLATE NOCASE AND id <> ?)
+        ''', (id_conservado, nombre, id_conservado))
+        cursor.execute("DELETE FROM productos WHERE nombre = ? COLLATE NOCASE AND id <> ?", (nombre, id_conservado))
+        logger.info("🔧 Productos duplicados fusionados en ID %s: %s", id_conservado, nombre)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_productos_nombre ON productos(nombre COLLATE NOCASE)")
+
+def _migracion_indices_ventas(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas(fecha)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ventas_producto ON ventas(producto_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ventas_usuario ON ventas(usuario_id)")
+
+def _migracion_indice_categoria(cursor):
+    cursor.execute("UPDATE productos SET categoria = 'Otros' WHERE categoria IS NULL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_productos_categoria ON productos(categoria)")
+
+def fts5_disponible(cursor):
+    """Indica si la versión de SQLite incluye el módulo FTS5."""
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    return bool(cursor.fetchone()[0])
+
+def _migracion_busqueda_fts(cursor):
+    """Índice de texto completo sobre nombre y categoría, sin distinguir acentos."""
+    if not fts5_disponible(cursor):
+        logger.warning("⚠️ SQLite no incluye FTS5: la búsqueda de productos usará LIKE.")
+        return
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+            nombre, categoria,
+            content='productos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN
+            INSERT INTO productos_fts(rowid, nombre, categoria) VALUES (new.id, new.nombre, new.categoria);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN
+            INSERT INTO productos_fts(productos_fts, rowid, nombre, categoria)
+            VALUES ('delete', old.id, old.nombre, old.categoria);
+        END
+    ''')
+    # Solo cambios de nombre o categoría: los movimientos de stock no tocan el índice
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE OF nombre, categoria ON productos BEGIN
+            INSERT INTO productos_fts(productos_fts, rowid, nombre, categoria)
+            VALUES ('delete', old.id, old.nombre, old.categoria);
+            INSERT INTO productos_fts(rowid, nombre, categoria) VALUES (new.id, new.nombre, new.categoria);
+        END
+    ''')
+    cursor.execute("INSERT INTO productos_fts(productos_fts) VALUES ('rebuild')")
+
+def _migracion_tickets(cursor):
+    """Agrupa las líneas de venta en tickets con ID propio y guarda el precio cobrado."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tickets (
+            id TEXT PRIMARY KEY,
+            usuario_id INTEGER,
+            fecha TEXT NOT NULL,
+            total REAL NOT NULL,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+        )
+    ''')
+    columnas = _columnas(cursor, "ventas")
+    if "ticket_id" not in columnas:
+        cursor.execute("ALTER TABLE ventas ADD COLUMN ticket_id TEXT REFERENCES tickets(id)")
+    if "precio_unitario" not in columnas:
+        cursor.execute("ALTER TABLE ventas ADD COLUMN precio_unitario REAL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ventas_ticket ON ventas(ticket_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_fecha ON tickets(fecha)")
+
+def _migracion_codigos_producto(cursor):
+    """Códigos de barras o SKU: varios por producto, cada código de un solo producto."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS codigos_producto (
+            codigo TEXT PRIMARY KEY,
+            producto_id INTEGER NOT NULL REFERENCES productos(id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_codigos_producto ON codigos_producto(producto_id)")
+    # Las conexiones no activan foreign_keys: el borrado en cascada lo hace un trigger
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS productos_codigos_ad AFTER DELETE ON productos BEGIN
+            DELETE FROM codigos_producto WHERE producto_id = old.id;
+        END
+    ''')
+    # Contador de cambios: permite saber si el mapa en memoria de `core.codigos` sigue vigente
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS codigos_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO codigos_version (id, version) VALUES (1, 0)")
+    for evento in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS codigos_producto_{evento.lower()} AFTER {evento} ON codigos_producto BEGIN
+                UPDATE codigos_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+def _migracion_resumenes_ventas(cursor):
+    """Tablas de resumen de ventas por día y producto, día y usuario, y por hora."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resumen_ventas_producto (
+            dia TEXT NOT NULL,
+            producto_id INTEGER NOT NULL,
+            cantidad INTEGER NOT NULL,
+            importe REAL NOT NULL,
+            lineas INTEGER NOT NULL,
+            PRIMARY KEY (dia, producto_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resumen_ventas_usuario (
+            dia TEXT NOT NULL,
+            usuario_id INTEGER NOT NULL,
+            tickets INTEGER NOT NULL,
+            cantidad INTEGER NOT NULL,
+            importe REAL NOT NULL,
+            PRIMARY KEY (dia, usuario_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resumen_ventas_hora (
+            hora TEXT PRIMARY KEY,
+            tickets INTEGER NOT NULL,
+            cantidad INTEGER NOT NULL,
+            importe REAL NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    # Marca de agua: último ventas.id ya volcado en los resúmenes
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resumen_estado (
+            nombre TEXT PRIMARY KEY,
+            ultimo_id INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO resumen_estado (nombre, ultimo_id) VALUES ('ventas', 0)")
+    from core.reportes import actualizar_resumenes
+    actualizar_resumenes(cursor)
+
+def _migracion_bandeja_correo(cursor):
+    """Bandeja de salida de correos: se encolan al instante y un hilo los envía."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS correos_salientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            destinatario TEXT NOT NULL,
+            asunto TEXT NOT NULL,
+            mensaje TEXT NOT NULL,
+            estado TEXT NOT NULL DEFAULT 'pendiente',  -- pendiente, enviado o fallido
+            intentos INTEGER NOT NULL DEFAULT 0,
+            proximo_intento REAL NOT NULL DEFAULT 0,  -- segundos Unix
+            ultimo_error TEXT,
+            creado_en TEXT NOT NULL,
+            enviado_en TEXT
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_correos_pendientes ON correos_salientes (estado, proximo_intento)")
+
+def _migracion_cambios_productos(cursor):
+    """Registro de cambios del catálogo con número de secuencia, para sincronizar cajas por diferencias."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cambios_productos (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            producto_id INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS productos_cambios_ai AFTER INSERT ON productos BEGIN
+            INSERT INTO cambios_productos (producto_id) VALUES (new.id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS productos_cambios_ad AFTER DELETE ON productos BEGIN
+            INSERT INTO cambios_productos (producto_id) VALUES (old.id);
+        END
+    ''')
+    # Un UPDATE que no cambia nada (p. ej. un UPSERT con los mismos datos) no genera cambio
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS productos_cambios_au AFTER UPDATE ON productos
+        WHEN old.nombre IS NOT new.nombre OR old.cantidad IS NOT new.cantidad
+          OR old.precio IS NOT new.precio OR old.categoria IS NOT new.categoria BEGIN
+            INSERT INTO cambios_productos (producto_id) VALUES (new.id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS codigos_cambios_ai AFTER INSERT ON codigos_producto BEGIN
+            INSERT INTO cambios_productos (producto_id) VALUES (new.producto_id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS codigos_cambios_ad AFTER DELETE ON codigos_producto BEGIN
+            INSERT INTO cambios_productos (producto_id) VALUES (old.producto_id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS codigos_cambios_au AFTER UPDATE ON codigos_producto BEGIN
+            INSERT INTO cambios_productos (producto_id) VALUES (old.producto_id);
+            INSERT INTO cambios_productos (producto_id) SELECT new.producto_id WHERE new.producto_id <> old.producto_id;
+        END
+    ''')
+
+# Lista ordenada de migraciones: (versión, descripción, función)
+MIGRACIONES = [
+    (1, "Esquema base de usuarios, productos y ventas", _migracion_esquema_base),
+    (2, "Índice único sin distinguir mayúsculas en productos.nombre", _migracion_nombre_unico),
+    (3, "Índices de ventas por fecha, producto y usuario", _migracion_indices_ventas),
+    (4, "Índice de productos por categoría para la paginación", _migracion_indice_categoria),
+    (5, "Búsqueda de texto completo (FTS5) sobre productos", _migracion_busqueda_fts),
+    (6, "Tickets de venta y precio unitario por línea", _migracion_tickets),
+    (7, "Códigos de barras / SKU de productos", _migracion_codigos_producto),
+    (8, "Resúmenes incrementales de ventas", _migracion_resumenes_ventas),
+    (9, "Bandeja de salida de correos", _migracion_bandeja_correo),
+    (10, "Registro de cambios del catálogo para sincronizar cajas", _migracion_cambios_productos),
+]
+
+### **🔹 Motor de migraciones**
+def _asegurar_tabla_version(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            descripcion TEXT NOT NULL,
+            aplicada_en TEXT NOT NULL
+        )
+    ''')
+    conn.commit()
+
+def version_actual(conn):
+    """Devuelve la versión de esquema aplicada en la base (0 si no hay ninguna)."""
+    _asegurar_tabla_version(conn)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def migraciones_pendientes(conn):
+    """Devuelve las migraciones que aún no se aplicaron, en orden."""
+    actual = version_actual(conn)
+    return [m for m in MIGRACIONES if m[0] > actual]
+
+def aplicar_migraciones(conn, dry_run=False):
+    """Aplica en orden las migraciones pendientes, cada una en su propia transacción.
+
+    Con `dry_run=True` todas las pendientes se ejecutan dentro de una única
+    transacción que luego se revierte, para comprobar que aplicarían sin errores.
+    Devuelve la lista de `(versión, descripción)` aplicadas (o que se aplicarían).
+    """
+    pendientes = migraciones_pendientes(conn)
+    if not pendientes:
+        return []
+
+    aplicadas = []
+    cursor = conn.cursor()
+    if dry_run:
+        cursor.execute("BEGIN IMMEDIATE")
+    try:
+        for version, descripcion, migracion in pendientes:
+            if not dry_run:
+                cursor.execute("BEGIN IMMEDIATE")
+            migracion(cursor)
+            cursor.execute("INSERT INTO schema_version (version, descripcion, aplicada_en) VALUES (?, ?, ?)",
+                           (version, descripcion, datetime.now().isoformat(timespec="seconds")))
+            if not dry_run:
+                conn.commit()
+                logger.info("✅ Migración %s aplicada: %s", version, descripcion)
+            aplicadas.append((version, descripcion))
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.error("❌ Error al aplicar la migración %s: %s", version, e)
+        raise
+    if dry_run:
+        conn.rollback()
+        logger.info("🔍 Simulación: %s migraciones pendientes aplicarían sin errores.", len(aplicadas))
+    return aplicadas
@@ -0,0 +1,192 @@
+import argparse
+import logging
+import sqlite3
+from datetime import date
+from core.database import conectar_db
+from utils.registro import configurar_registro
+
+logger = logging.getLogger(__name__)
+
+### **🔹 Mantenimiento de los resúmenes**
+# Las tablas resumen_ventas_* acumulan las líneas de `ventas` con id mayor que la
+# marca de agua de `resumen_estado`. `registrar_venta` las actualiza dentro de la
+# misma transacción del ticket; cualquier otra escritura en ventas se vuelca en la
+# siguiente llamada a `ponerse_al_dia()`.
+
+# Líneas nuevas normalizadas: las ventas viejas no tienen ticket ni precio cobrado
+_LINEAS_NUEVAS = '''
+    WITH lineas AS (
+        SELECT COALESCE(substr(v.fecha, 1, 10), '') AS dia,
+               COALESCE(substr(v.fecha, 1, 13), '') AS hora,
+               COALESCE(v.producto_id, 0) AS producto_id,
+               COALESCE(v.usuario_id, 0) AS usuario_id,
+               COALESCE(v.ticket_id, 'venta-' || v.id) AS ticket,
+               COALESCE(v.cantidad, 0) AS cantidad,
+               COALESCE(v.cantidad, 0) * COALESCE(v.precio_unitario, p.precio, 0) AS importe
+        FROM ventas v LEFT JOIN productos p ON p.id = v.producto_id
+        WHERE v.id > :desde AND v.id <= :hasta
+    )
+'''
+
+SQL_RESUMEN_PRODUCTO = _LINEAS_NUEVAS + '''
+    INSERT INTO resumen_ventas_producto (dia, producto_id, cantidad, importe, lineas)
+    SELECT dia, producto_id, SUM(cantidad), SUM(importe), COUNT(*) FROM lineas GROUP BY dia, producto_id
+    ON CONFLICT (dia, producto_id) DO UPDATE SET
+        cantidad = cantidad + excluded.cantidad,
+        importe = importe + excluded.importe,
+        lineas = lineas + excluded.lineas
+'''
+
+SQL_RESUMEN_USUARIO = _LINEAS_NUEVAS + '''
+    INSERT INTO resumen_ventas_usuario (dia, usuario_id, tickets, cantidad, importe)
+    SELECT dia, usuario_id, COUNT(DISTINCT ticket), SUM(cantidad), SUM(importe) FROM lineas GROUP BY dia, usuario_id
+    ON CONFLICT (dia, usuario_id) DO UPDATE SET
+        tickets = tickets + excluded.tickets,
+        cantidad = cantidad + excluded.cantidad,
+        importe = importe + excluded.importe
+'''
+
+SQL_RESUMEN_HORA = _LINEAS_NUEVAS + '''
+    INSERT INTO resumen_ventas_hora (hora, tickets, cantidad, importe)
+    SELECT hora, COUNT(DISTINCT ticket), SUM(cantidad), SUM(importe) FROM lineas GROUP BY hora
+    ON CONFLICT (hora) DO UPDATE SET
+        tickets = tickets + excluded.tickets,
+        cantidad = cantidad + excluded.cantidad,
+        importe = importe + excluded.importe
+'''
+
+TABLAS_RESUMEN = ("resumen_ventas_producto", "resumen_ventas_usuario", "resumen_ventas_hora")
+
+def actualizar_resumenes(cursor):
+    """Vuelca en los resúmenes las ventas posteriores a la marca de agua.
+
+    Debe llamarse dentro de una transacción de escritura ya abierta (por ejemplo,
+    la del ticket) para que resúmenes y marca avancen juntos. Devuelve la cantidad
+    de líneas de venta procesadas.
+    """
+    desde = cursor.execute("SELECT ultimo_id FROM resumen_estado WHERE nombre = 'ventas'").fetchone()[0]
+    hasta = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM ventas").fetchone()[0]
+    if hasta <= desde:
+        return 0
+    parametros = {"desde": desde, "hasta": hasta}
+    for sql in (SQL_RESUMEN_PRODUCTO, SQL_RESUMEN_USUARIO, SQL_RESUMEN_HORA):
+        cursor.execute(sql, parametros)
+    cursor.execute("UPDATE resumen_estado SET ultimo_id = ? WHERE nombre = 'ventas'", (hasta,))
+    return hasta - desde
+
+def ponerse_al_dia():
+    """Vuelca las ventas pendientes, si las hay. Devuelve la cantidad de líneas procesadas."""
+    try:
+        conn = conectar_db()
+        pendientes = conn.execute('''
+            SELECT (SELECT COALESCE(MAX(id), 0) FROM ventas) > ultimo_id
+            FROM resumen_estado WHERE nombre = 'ventas'
+        ''').fetchone()[0]
+        if not pendientes:
+            return 0
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            procesadas = actualizar_resumenes(cursor)
+        logger.info("✅ Resúmenes de ventas al día: %s líneas nuevas.", procesadas)
+        return procesadas
+    except sqlite3.Error as e:
+        logger.error("❌ Error al actualizar los resúmenes de ventas: %s", e)
+        return 0
+
+def reconstruir_resumenes():
+    """Vacía los resúmenes y los recalcula desde cero a partir de `ventas`."""
+    try:
+        with conectar_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            for tabla in TABLAS_RESUMEN:
+                cursor.execute(f"DELETE FROM {tabla}")
+            cursor.execute("UPDATE resumen_estado SET ultimo_id = 0 WHERE nombre = 'ventas'")
+            procesadas = actualizar_resumenes(cursor)
+        logger.info("✅ Resúmenes de ventas reconstruidos: %s líneas.", procesadas)
+        return procesadas
+    except sqlite3.Error as e:
+        logger.error("❌ Error al reconstruir los resúmenes de ventas: %s", e)
+        return None
+
+### **🔹 Consultas de reportes**
+# Los rangos de días son inclusivos y en formato 'AAAA-MM-DD'. Todas las consultas
+# leen solo los resúmenes, así que su costo depende del rango pedido y no del
+# tamaño de `ventas`.
+
+def _consultar(descripcion, sql, parametros):
+    ponerse_al_dia()
+    try:
+        with conectar_db() as conn:
+            return conn.execute(sql, parametros).fetchall()
+    except sqlite3.Error as e:
+        logger.error("❌ Error al obtener %s: %s", descripcion, e)
+        return []
+
+def ventas_por_dia(desde, hasta):
+    """Lista de `(dia, tickets, cantidad, importe)`."""
+    # 'AAAA-MM-DD HH' < 'AAAA-MM-DDZ': el límite superior incluye todas las horas de `hasta`
+    return _consultar("las ventas por día", '''
+        SELECT substr(hora, 1, 10) AS dia, SUM(tickets), SUM(cantidad), ROUND(SUM(importe), 2)
+        FROM resumen_ventas_hora
+        WHERE hora >= ? AND hora < ? || 'Z'
+        GROUP BY dia ORDER BY dia
+    ''', (desde, hasta))
+
+def ventas_por_hora(dia):
+    """Lista de `(hora, tickets, cantidad, importe)` de un día."""
+    return _consultar("las ventas por hora", '''
+        SELECT hora, tickets, cantidad, ROUND(importe, 2)
+        FROM resumen_ventas_hora
+        WHERE hora >= ? AND hora < ? || 'Z'
+        ORDER BY hora
+    ''', (dia, dia))
+
+def ventas_por_producto(desde, hasta, limite=50):
+    """Lista de `(producto_id, nombre, cantidad, importe)`, de mayor a menor importe."""
+    return _consultar("las ventas por producto", '''
+        SELECT r.producto_id, p.nombre, SUM(r.cantidad), ROUND(SUM(r.importe), 2) AS total
+        FROM resumen_ventas_producto r LEFT JOIN productos p ON p.id = r.producto_id
+        WHERE r.dia BETWEEN ? AND ?
+        GROUP BY r.producto_id ORDER BY total DESC LIMIT ?
+    ''', (desde, hasta, limite))
+
+def ventas_por_categoria(desde, hasta):
+    """Lista de `(categoria, cantidad, importe)`, de mayor a menor importe."""
+    return _consultar("las ventas por categoría", '''
+        SELECT COALESCE(p.categoria, 'Otros') AS categoria, SUM(r.cantidad), ROUND(SUM(r.importe), 2) AS total
+        FROM resumen_ventas_producto r LEFT JOIN productos p ON p.id = r.producto_id
+        WHERE r.dia BETWEEN ? AND ?
+        GROUP BY categoria ORDER BY total DESC
+    ''', (desde, hasta))
+
+def ventas_por_usuario(desde, hasta):
+    """Lista de `(usuario_id, nombre, tickets, cantidad, importe)`, de mayor a menor importe."""
+    return _consultar("las ventas por usuario", '''
+        SELECT r.usuario_id, u.nombre, SUM(r.tickets), SUM(r.cantidad), ROUND(SUM(r.importe), 2) AS total
+        FROM resumen_ventas_usuario r LEFT JOIN usuarios u ON u.id = r.usuario_id
+        WHERE r.dia BETWEEN ? AND ?
+        GROUP BY r.usuario_id ORDER BY total DESC
+    ''', (desde, hasta))
+
+def resumen_mes(dia=None):
+    """Totales del mes hasta `dia` (hoy por defecto): tickets, cantidad e importe."""
+    dia = dia or date.today().isoformat()
+    desde = dia[:8] + "01"
+    filas = _consultar("el resumen del mes", '''
+        SELECT COALESCE(SUM(tickets), 0), COALESCE(SUM(cantidad), 0), ROUND(COALESCE(SUM(importe), 0), 2)
+        FROM resumen_ventas_hora
+        WHERE hora >= ? AND hora < ? || 'Z'
+    ''', (desde, dia))
+    tickets, cantidad, importe = filas[0] if filas else (0, 0, 0.0)
+    return {"desde": desde, "hasta": dia, "tickets": tickets, "cantidad": cantidad, "importe": importe}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resúmenes de ventas de ORDICO.")
+    parser.add_argument("--reconstruir", action="store_true", help="recalcula los resúmenes desde cero")
+    args = parser.parse_args()
+    configurar_registro(archivo=None)
+    if args.reconstruir:
+        reconstruir_resumenes()
+    print(resumen_mes())
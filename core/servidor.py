@@ -0,0 +1,466 @@
+import asyncio
+import json
+import logging
+import re
+import secrets
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+from core.auth import autenticar_usuario
+from core.cache import cache_catalogo
+from core.codigos import obtener_producto_por_codigo, precargar_codigos
+from core.conexion import liberar_conexion
+from core.database import (COLUMNAS_PRODUCTO, buscar_productos, conectar_db, contar_productos,
+                           obtener_producto_por_id, obtener_producto_por_nombre, obtener_productos_pagina,
+                           precargar_catalogo)
+from core.reportes import actualizar_resumenes
+from core.ventas import SQL_DESCONTAR_STOCK, Carrito, StockInsuficiente, _faltante, _insertar_ticket, sumar_stock
+from utils import config
+
+logger = logging.getLogger(__name__)
+
+ENTERO_MAXIMO = 2 ** 63 - 1  # Mayor entero que guarda SQLite
+
+class ErrorHTTP(Exception):
+    """Respuesta de error con su código HTTP y un mensaje para la caja."""
+
+    def __init__(self, estado, mensaje, **datos):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.datos = datos
+
+def _entero(valor, campo, minimo=1):
+    """Valida un entero del cuerpo JSON (rechaza NaN, infinitos, decimales, booleanos y lo que no entra en SQLite)."""
+    if isinstance(valor, bool) or (isinstance(valor, float) and not valor.is_integer()):
+        raise ValueError(f"'{campo}' debe ser un número entero.")
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"'{campo}' debe ser un número entero.") from None
+    if minimo is not None and numero < minimo:
+        raise ValueError(f"'{campo}' debe ser al menos {minimo}.")
+    if not -ENTERO_MAXIMO - 1 <= numero <= ENTERO_MAXIMO:
+        raise ValueError(f"'{campo}' está fuera de rango.")
+    return numero
+
+### **🔹 Escrituras agrupadas**
+def _ticket_registrado(cursor, ticket_id, usuario_id):
+    """El ticket `ticket_id` tal como se registró, o None si todavía no existe."""
+    fila = cursor.execute("SELECT usuario_id, fecha, total FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+    if fila is None:
+        return None
+    if fila[0] != usuario_id:
+        raise ValueError(f"El ticket {ticket_id} ya existe.")
+    cursor.execute("""
+        SELECT v.producto_id, p.nombre, v.cantidad, v.precio_unitario
+        FROM ventas v LEFT JOIN productos p ON p.id = v.producto_id
+        WHERE v.ticket_id = ? ORDER BY v.id
+    """, (ticket_id,))
+    lineas = [dict(zip(("producto_id", "nombre", "cantidad", "precio"), f)) for f in cursor.fetchall()]
+    return {"ticket_id": ticket_id, "fecha": fila[1], "total": fila[2], "lineas": lineas}
+
+def _cobrar(cursor, pedido, usuario_id, ticket_id=None):
+    """Registra un ticket como `registrar_venta`, pero dentro de la transacción del lote.
+
+    `pedido` son pares `(producto_id, cantidad)`: nombre y precio se leen de la
+    base en la misma transacción, nunca se toman de lo que manda la caja. Si la
+    caja manda su `ticket_id` y ese ticket ya se registró (un reintento tras un
+    corte), se devuelve el registrado sin volver a cobrar.
+    """
+    if ticket_id is not None:
+        registrado = _ticket_registrado(cursor, ticket_id, usuario_id)
+        if registrado is not None:
+            return registrado, []
+    ids = list({producto_id for producto_id, _ in pedido})
+    cursor.execute(f"SELECT id, nombre, cantidad, precio FROM productos WHERE id IN ({', '.join('?' * len(ids))})", ids)
+    productos = {fila[0]: fila for fila in cursor.fetchall()}
+    carrito = Carrito()
+    for producto_id, cantidad in pedido:
+        if producto_id not in productos:
+            raise ValueError(f"No existe el producto {producto_id}.")
+        carrito.agregar(productos[producto_id], cantidad)
+    lineas = carrito.lineas()
+    cursor.executemany(SQL_DESCONTAR_STOCK, [(l["cantidad"], l["producto_id"], l["cantidad"]) for l in lineas])
+    if cursor.rowcount != len(lineas):
+        raise _faltante(cursor, lineas)
+    ticket = {"ticket_id": ticket_id or uuid.uuid4().hex, "fecha": datetime.now().isoformat(sep=" ", timespec="seconds"),
+              "total": carrito.total(), "lineas": lineas}
+    _insertar_ticket(cursor, ticket["ticket_id"], usuario_id, ticket["fecha"], ticket["total"], lineas)
+    return ticket, [l["producto_id"] for l in lineas]
+
+def _ajustar_stock(cursor, producto_id, diferencia):
+    return {"id": producto_id, "cantidad": sumar_stock(cursor, producto_id, diferencia)}, [producto_id]
+
+class EscritorAgrupado:
+    """Única conexión de escritura del servidor: aplica las escrituras por lotes.
+
+    Cada escritura es una función `operacion(cursor, *args)` que devuelve
+    `(resultado, productos_tocados)`. Mientras el hilo escritor confirma un lote,
+    las que llegan se acumulan y entran juntas en la próxima transacción, con un
+    SAVEPOINT por operación: si una falla (p. ej. `StockInsuficiente`, o cualquier
+    error inesperado) se deshace solo esa y el resto del lote se confirma con un
+    único commit.
+    """
+
+    def __init__(self, lote=config.SERVIDOR_LOTE_ESCRITURAS):
+        self.lote = lote
+        self._cola = asyncio.Queue()
+        self._hilo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="escritor")
+        self._tarea = None
+        self.escrituras = 0
+        self.lotes = 0
+
+    def iniciar(self):
+        self._tarea = asyncio.create_task(self._bucle())
+        return self
+
+    async def detener(self):
+        """Termina de aplicar lo encolado y libera la conexión de escritura."""
+        await self._cola.join()
+        self._tarea.cancel()
+        await asyncio.get_running_loop().run_in_executor(self._hilo, liberar_conexion)
+        self._hilo.shutdown()
+
+    async def escribir(self, operacion, *args):
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put((operacion, args, futuro))
+        return await futuro
+
+    async def _bucle(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await self._cola.get()]
+            while len(lote) < self.lote and not self._cola.empty():
+                lote.append(self._cola.get_nowait())
+            try:
+                resultados = await loop.run_in_executor(self._hilo, self._aplicar, lote)
+            except Exception as e:
+                # El lote ya se revirtió: fallan sus pedidos, pero el escritor sigue atendiendo
+                if isinstance(e, sqlite3.Error):
+                    logger.error("❌ Error al aplicar un lote de %s escrituras: %s", len(lote), e)
+                else:
+                    logger.exception("❌ Error inesperado al aplicar un lote de %s escrituras", len(lote))
+                resultados = [(False, e)] * len(lote)
+            for (_, _, futuro), (correcto, valor) in zip(lote, resultados):
+                if futuro.done():
+                    continue  # El cliente se desconectó
+                if correcto:
+                    futuro.set_result(valor)
+                else:
+                    futuro.set_exception(valor)
+            self.escrituras += len(lote)
+            self.lotes += 1
+            for _ in lote:
+                self._cola.task_done()
+
+    def _aplicar(self, lote):
+        conn = conectar_db()
+        cursor = conn.cursor()
+        resultados, productos = [], set()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for operacion, args, _ in lote:
+                cursor.execute("SAVEPOINT operacion")
+                try:
+                    resultado, tocados = operacion(cursor, *args)
+                except Exception as e:
+                    if not isinstance(e, (StockInsuficiente, LookupError, ValueError, sqlite3.IntegrityError)):
+                        logger.exception("❌ Error inesperado en la escritura %s", operacion.__name__)
+                    cursor.execute("ROLLBACK TO operacion")
+                    resultados.append((False, e))
+                else:
+                    resultados.append((True, resultado))
+                    productos.update(tocados)
+                cursor.execute("RELEASE operacion")
+            actualizar_resumenes(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()  # Nunca queda abierto el BEGIN IMMEDIATE: retendría el bloqueo de escritura
+            raise
+        for id_producto in productos:
+            cache_catalogo.invalidar(id_producto)
+        return resultados
+
+### **🔹 Servidor HTTP/JSON**
+def _producto(fila):
+    if fila is None:
+        return None
+    return dict(zip(COLUMNAS_PRODUCTO, fila))
+
+class ServidorAPI:
+    """Servicio HTTP/JSON (asyncio) que comparte un catálogo y una base entre varias cajas.
+
+    Las lecturas corren en `lectores` hilos, cada uno con su conexión persistente,
+    sobre la caché del catálogo; las escrituras (cobros y ajustes de stock) pasan
+    por un `EscritorAgrupado`. Cobrar y ajustar stock requieren el token que
+    devuelve `POST /sesiones`.
+
+        GET  /estado
+        GET  /productos/{id}              GET /productos?ids=1,2,3   GET /productos?nombre=...
+        GET  /productos/buscar?texto=...&limit=N
+        GET  /productos/pagina?orden=...&desc=1&filtro=...&after_id=N&after_valor=...&nuevos_desde=N&limit=N
+        GET  /productos/contar?filtro=...
+        GET  /codigos/{codigo}
+        POST /sesiones                    {"usuario": ..., "password": ...}
+        POST /ventas                      {"ticket_id", "lineas": [{"producto_id", "cantidad"}]}  (precios de la base;
+                                          reenviar el mismo ticket_id no lo cobra dos veces)
+        POST /productos/{id}/stock        {"diferencia": N}  (solo admin)
+    """
+
+    def __init__(self, host=config.SERVIDOR_HOST, puerto=config.SERVIDOR_PUERTO, lectores=config.SERVIDOR_LECTORES,
+                 lote_escrituras=config.SERVIDOR_LOTE_ESCRITURAS):
+        self.host = host
+        self.puerto = puerto
+        self._lectores = ThreadPoolExecutor(max_workers=lectores, thread_name_prefix="lector")
+        self._hash = ThreadPoolExecutor(max_workers=config.SERVIDOR_HILOS_HASH, thread_name_prefix="hash")
+        self._lote_escrituras = lote_escrituras
+        self._escritor = None
+        self._servidor = None
+        self._sesiones = {}  # token -> (usuario, vence)
+        self.solicitudes = 0
+        self.inicio = None
+        self._rutas = [
+            ("GET", re.compile(r"/estado"), self.estado),
+            ("GET", re.compile(r"/productos/buscar"), self.buscar),
+            ("GET", re.compile(r"/productos/pagina"), self.pagina),
+            ("GET", re.compile(r"/productos/contar"), self.contar),
+            ("GET", re.compile(r"/productos/(\d+)"), self.producto),
+            ("GET", re.compile(r"/productos"), self.productos),
+            ("GET", re.compile(r"/codigos/([^/]+)"), self.codigo),
+            ("POST", re.compile(r"/sesiones"), self.iniciar_sesion),
+            ("POST", re.compile(r"/ventas"), self.cobrar),
+            ("POST", re.compile(r"/productos/(\d+)/stock"), self.ajustar_stock),
+        ]
+
+    # --- Ciclo de vida ---
+
+    async def iniciar(self):
+        loop = asyncio.get_running_loop()
+        # La caché y el índice de códigos son del proceso: los comparten todos los lectores
+        await loop.run_in_executor(self._lectores, precargar_catalogo)
+        await loop.run_in_executor(self._lectores, precargar_codigos)
+        self._escritor = EscritorAgrupado(self._lote_escrituras).iniciar()
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        self.inicio = time.monotonic()
+        logger.info("✅ Servidor escuchando en http://%s:%s (%s lectores).", self.host, self.puerto,
+                    self._lectores._max_workers)
+        return self
+
+    async def detener(self):
+        self._servidor.close()
+        await self._servidor.wait_closed()
+        await self._escritor.detener()
+        for ejecutor in (self._lectores, self._hash):
+            ejecutor.shutdown()
+        logger.info("✅ Servidor detenido tras %s pedidos.", self.solicitudes)
+
+    async def servir(self):
+        """Atiende pedidos hasta que se cancele la tarea (Ctrl+C)."""
+        await self.iniciar()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.detener()
+
+    # --- HTTP ---
+
+    async def _atender(self, lector, escritor):
+        try:
+            while True:
+                linea = await asyncio.wait_for(lector.readline(), config.SERVIDOR_INACTIVIDAD)
+                if not linea:
+                    break
+                metodo, destino, version = linea.decode("latin-1").split()
+                cabeceras = {}
+                while (linea := await lector.readline()) not in (b"\r\n", b"\n", b""):
+                    nombre, _, valor = linea.decode("latin-1").partition(":")
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+                largo = int(cabeceras.get("content-length", 0))
+                if largo > config.SERVIDOR_MAX_CUERPO:
+                    await self._responder(escritor, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                          {"error": "Pedido demasiado grande."}, False)
+                    break
+                cuerpo = await lector.readexactly(largo) if largo else b""
+                estado, datos = await self._despachar(metodo, destino, cabeceras, cuerpo)
+                mantener = version == "HTTP/1.1" and cabeceras.get("connection", "").lower() != "close"
+                await self._responder(escritor, estado, datos, mantener)
+                if not mantener:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # Conexión ociosa, cortada o con un pedido mal formado: se cierra
+        finally:
+            escritor.close()
+
+    @staticmethod
+    async def _responder(escritor, estado, datos, mantener):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        escritor.write(
+            f"HTTP/1.1 {estado.value} {estado.phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(cuerpo)}\r\n"
+            f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n".encode("latin-1") + cuerpo)
+        await escritor.drain()
+
+    async def _despachar(self, metodo, destino, cabeceras, cuerpo):
+        self.solicitudes += 1
+        partes = urlsplit(destino)
+        consulta = {clave: valores[-1] for clave, valores in parse_qs(partes.query).items()}
+        try:
+            for metodo_ruta, patron, manejador in self._rutas:
+                coincidencia = patron.fullmatch(partes.path)
+                if coincidencia is None:
+                    continue
+                if metodo != metodo_ruta:
+                    raise ErrorHTTP(HTTPStatus.METHOD_NOT_ALLOWED, "Método no permitido.")
+                datos = json.loads(cuerpo) if cuerpo else {}
+                if not isinstance(datos, dict):
+                    raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "Se esperaba un objeto JSON.")
+                peticion = {"consulta": consulta, "cabeceras": cabeceras, "datos": datos}
+                return await manejador(peticion, *(unquote(g) for g in coincidencia.groups()))
+            raise ErrorHTTP(HTTPStatus.NOT_FOUND, "Ruta desconocida.")
+        except ErrorHTTP as e:
+            return e.estado, {"error": str(e), **e.datos}
+        except json.JSONDecodeError:
+            return HTTPStatus.BAD_REQUEST, {"error": "JSON inválido."}
+        except StockInsuficiente as e:
+            return HTTPStatus.CONFLICT, {"error": str(e), "producto_id": e.producto_id, "nombre": e.nombre,
+                                        "solicitado": e.solicitado, "disponible": e.disponible}
+        except KeyError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": f"Falta el campo {e}."}
+        except LookupError as e:
+            return HTTPStatus.NOT_FOUND, {"error": str(e)}
+        except (ValueError, TypeError, sqlite3.IntegrityError) as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except sqlite3.Error as e:
+            logger.error("❌ Error de base de datos en %s %s: %s", metodo, destino, e)
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Error de base de datos."}
+        except Exception:
+            logger.exception("❌ Error inesperado en %s %s", metodo, destino)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Error interno."}
+
+    def _leer(self, funcion, *args):
+        return asyncio.get_running_loop().run_in_executor(self._lectores, funcion, *args)
+
+    def _usuario(self, peticion, rol=None):
+        """Usuario dueño del token `Authorization: Bearer ...`; lanza 401/403 si no corresponde."""
+        token = peticion["cabeceras"].get("authorization", "").removeprefix("Bearer ").strip()
+        sesion = self._sesiones.get(token)
+        if sesion is None or sesion[1] < time.monotonic():
+            self._sesiones.pop(token, None)
+            raise ErrorHTTP(HTTPStatus.UNAUTHORIZED, "Sesión inválida o vencida.")
+        if rol is not None and sesion[0]["rol"] != rol:
+            raise ErrorHTTP(HTTPStatus.FORBIDDEN, "No tiene permiso para esta operación.")
+        return sesion[0]
+
+    # --- Rutas ---
+
+    async def estado(self, peticion):
+        return HTTPStatus.OK, {
+            "solicitudes": self.solicitudes,
+            "escrituras": self._escritor.escrituras,
+            "lotes_escritura": self._escritor.lotes,
+            "sesiones": len(self._sesiones),
+            "segundos_activo": round(time.monotonic() - self.inicio, 1),
+            "cache": cache_catalogo.estadisticas(),
+        }
+
+    async def producto(self, peticion, id_producto):
+        producto = await self._leer(obtener_producto_por_id, int(id_producto))
+        if producto is None:
+            raise LookupError(f"No existe el producto {id_producto}.")
+        return HTTPStatus.OK, _producto(producto)
+
+    async def productos(self, peticion):
+        """Varios productos en un solo pedido (`ids=1,2,3`) o uno por nombre exacto (`nombre=...`)."""
+        consulta = peticion["consulta"]
+        if "ids" in consulta:
+            ids = [int(i) for i in consulta["ids"].split(",") if i]
+            filas = await self._leer(lambda: [obtener_producto_por_id(i) for i in ids])
+            return HTTPStatus.OK, {"productos": [_producto(f) for f in filas if f is not None]}
+        if "nombre" in consulta:
+            producto = await self._leer(obtener_producto_por_nombre, consulta["nombre"])
+            if producto is None:
+                raise LookupError(f"No existe el producto '{consulta['nombre']}'.")
+            return HTTPStatus.OK, _producto(producto)
+        raise ValueError("Indique 'ids' o 'nombre'.")
+
+    async def buscar(self, peticion):
+        consulta = peticion["consulta"]
+        filas = await self._leer(buscar_productos, consulta.get("texto", ""), int(consulta.get("limit", 200)))
+        return HTTPStatus.OK, {"productos": [_producto(f) for f in filas]}
+
+    async def pagina(self, peticion):
+        """Página de la vista de stock, como `obtener_productos_pagina`."""
+        consulta = peticion["consulta"]
+        orden = consulta.get("orden", "id")
+        if orden not in COLUMNAS_PRODUCTO:
+            raise ValueError(f"No se puede ordenar productos por '{orden}'.")
+        limit = _entero(consulta.get("limit", 200), "limit")
+        if limit > config.SERVIDOR_MAX_PAGINA:
+            raise ValueError(f"'limit' no puede superar {config.SERVIDOR_MAX_PAGINA}.")
+        after_id = _entero(consulta["after_id"], "after_id", minimo=None) if "after_id" in consulta else None
+        after_valor = consulta.get("after_valor")
+        if after_valor is not None:
+            after_valor = (int, str, int, float, str)[COLUMNAS_PRODUCTO.index(orden)](after_valor)
+        nuevos_desde = _entero(consulta["nuevos_desde"], "nuevos_desde", minimo=0) if "nuevos_desde" in consulta else None
+        filas = await self._leer(obtener_productos_pagina, after_id, limit, orden, consulta.get("filtro"),
+                                 consulta.get("desc") == "1", after_valor, nuevos_desde)
+        return HTTPStatus.OK, {"productos": [_producto(f) for f in filas]}
+
+    async def contar(self, peticion):
+        return HTTPStatus.OK, {"total": await self._leer(contar_productos, peticion["consulta"].get("filtro"))}
+
+    async def codigo(self, peticion, codigo):
+        producto = await self._leer(obtener_producto_por_codigo, codigo)
+        if producto is None:
+            raise LookupError(f"No hay un producto con el código {codigo}.")
+        return HTTPStatus.OK, _producto(producto)
+
+    async def iniciar_sesion(self, peticion):
+        datos = peticion["datos"]
+        # PBKDF2 tarda: se verifica en hilos propios para no demorar las lecturas
+        usuario = await asyncio.get_running_loop().run_in_executor(
+            self._hash, autenticar_usuario, str(datos.get("usuario", "")), str(datos.get("password", "")))
+        if usuario is None:
+            raise ErrorHTTP(HTTPStatus.UNAUTHORIZED, "Usuario o contraseña incorrectos.")
+        ahora = time.monotonic()
+        for token, (_, vence) in list(self._sesiones.items()):
+            if vence < ahora:
+                del self._sesiones[token]
+        token = secrets.token_urlsafe(24)
+        self._sesiones[token] = (usuario, ahora + config.SERVIDOR_TTL_SESION)
+        return HTTPStatus.CREATED, {"token": token, "usuario": usuario}
+
+    async def cobrar(self, peticion):
+        usuario = self._usuario(peticion)
+        lineas = peticion["datos"].get("lineas") or []
+        if not isinstance(lineas, list):
+            raise ValueError("'lineas' debe ser una lista.")
+        pedido = [(_entero(linea["producto_id"], "producto_id"), _entero(linea["cantidad"], "cantidad"))
+                  for linea in lineas]
+        if not pedido:
+            raise ValueError("El carrito está vacío.")
+        ticket_id = peticion["datos"].get("ticket_id")
+        if ticket_id is not None and not (isinstance(ticket_id, str) and re.fullmatch(r"[0-9a-f]{32}", ticket_id)):
+            raise ValueError("'ticket_id' debe ser un UUID en hexadecimal.")
+        ticket = await self._escritor.escribir(_cobrar, pedido, usuario["id"], ticket_id)
+        logger.debug("🔍 Ticket %s cobrado por %s", ticket["ticket_id"], usuario["username"])
+        return HTTPStatus.CREATED, ticket
+
+    async def ajustar_stock(self, peticion, id_producto):
+        self._usuario(peticion, rol="admin")
+        diferencia = _entero(peticion["datos"]["diferencia"], "diferencia", minimo=None)
+        return HTTPStatus.OK, await self._escritor.escribir(_ajustar_stock, int(id_producto), diferencia)
+
+def servir(host=config.SERVIDOR_HOST, puerto=config.SERVIDOR_PUERTO, lectores=config.SERVIDOR_LECTORES,
+           lote_escrituras=config.SERVIDOR_LOTE_ESCRITURAS):
+    """Ejecuta el servidor hasta Ctrl+C."""
+    try:
+        asyncio.run(ServidorAPI(host, puerto, lectores, lote_escrituras).servir())
+    except KeyboardInterrupt:
+        pass
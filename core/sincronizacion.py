@@ -0,0 +1,406 @@
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from core.cache import cache_catalogo
+from core.conexion import abrir_conexion, liberar_conexion
+from core.database import conectar_db
+from core.reportes import actualizar_resumenes
+from core.ventas import aplicar_tickets
+from utils import config
+
+logger = logging.getLogger(__name__)
+
+### **🔹 Réplica local**
+# Una caja sin conexión trabaja sobre su propia base: el catálogo es una réplica
+# de la base central y las ventas se anotan en `cambios_ventas` hasta subirlas.
+# La central es la dueña del catálogo; la caja solo le envía ventas. Cada cambio
+# de productos en la central tiene un número de secuencia (`cambios_productos`,
+# migración 10), así que cada sincronización trae solo lo que cambió desde la
+# anterior y cuesta en proporción a los cambios, no al tamaño del catálogo.
+#
+# La central suele estar en una carpeta compartida: las cajas la abren con el
+# journal clásico (DELETE), porque WAL necesita memoria compartida en un solo
+# equipo y en una unidad de red corrompe la base. Por eso nadie debe abrirla en
+# WAL (p. ej. la aplicación normal con `ORDICO_DB_PATH` apuntando a ella) mientras
+# haya cajas sincronizando: la sincronización falla hasta que la suelte.
+
+def preparar_replica(conn):
+    """Crea en la base de la caja las tablas de la sincronización (solo existen en las cajas).
+
+    Tiene que correr antes de la primera venta: `inicializar_db` la llama cuando
+    hay una central configurada, aunque la central no esté disponible.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sincronizacion_estado (
+            clave TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL
+        )
+    ''')
+    # Tickets cobrados en la caja que la central todavía no tiene
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS cambios_ventas (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS tickets_cambios_ai AFTER INSERT ON tickets BEGIN
+            INSERT INTO cambios_ventas (ticket_id) VALUES (new.id);
+        END
+    ''')
+    conn.commit()
+
+def _estado(cursor, clave):
+    fila = cursor.execute("SELECT valor FROM sincronizacion_estado WHERE clave = ?", (clave,)).fetchone()
+    return fila[0] if fila else 0
+
+def _guardar_estado(cursor, clave, valor):
+    cursor.execute("INSERT OR REPLACE INTO sincronizacion_estado (clave, valor) VALUES (?, ?)", (clave, valor))
+
+def _marcadores(valores):
+    return ", ".join("?" * len(valores))
+
+### **🔹 Envío de ventas**
+def _leer_tickets(cursor, ids):
+    """Arma los tickets `ids` de la base local en el formato de `aplicar_tickets`, en el mismo orden."""
+    cursor.execute(f"SELECT id, usuario_id, fecha, total FROM tickets WHERE id IN ({_marcadores(ids)})", ids)
+    tickets = {id_ticket: {"ticket_id": id_ticket, "usuario_id": usuario_id, "fecha": fecha, "total": total,
+                           "lineas": []}
+               for id_ticket, usuario_id, fecha, total in cursor.fetchall()}
+    cursor.execute(f"""
+        SELECT ticket_id, producto_id, cantidad, precio_unitario FROM ventas
+        WHERE ticket_id IN ({_marcadores(ids)}) ORDER BY id
+    """, ids)
+    for id_ticket, producto_id, cantidad, precio in cursor.fetchall():
+        tickets[id_ticket]["lineas"].append({"producto_id": producto_id, "cantidad": cantidad, "precio": precio})
+    return [tickets[id_ticket] for id_ticket in dict.fromkeys(ids) if id_ticket in tickets]
+
+def _enviar_ventas(local, central, lote):
+    """Sube a la central los tickets pendientes, de a `lote` por transacción.
+
+    Un lote se borra de `cambios_ventas` recién después de confirmarse en la
+    central; si la caja se corta entre los dos pasos, el reenvío no duplica nada
+    porque `aplicar_tickets` omite los tickets que la central ya tiene.
+    """
+    resultado = {"tickets_enviados": 0, "tickets_sin_stock": 0}
+    cursor_local, cursor_central = local.cursor(), central.cursor()
+    while True:
+        pendientes = cursor_local.execute("SELECT seq, ticket_id FROM cambios_ventas ORDER BY seq LIMIT ?",
+                                          (lote,)).fetchall()
+        local.commit()
+        if not pendientes:
+            break
+        tickets = _leer_tickets(cursor_local, [id_ticket for _, id_ticket in pendientes])
+        local.commit()
+        try:
+            cursor_central.execute("BEGIN IMMEDIATE")
+            aplicados, _, sin_stock = aplicar_tickets(cursor_central, tickets)
+            actualizar_resumenes(cursor_central)
+            central.commit()
+        except sqlite3.Error:
+            central.rollback()
+            raise
+        cursor_local.execute("DELETE FROM cambios_ventas WHERE seq <= ?", (pendientes[-1][0],))
+        local.commit()
+        resultado["tickets_enviados"] += aplicados
+        resultado["tickets_sin_stock"] += len(sin_stock)
+        if len(pendientes) < lote:
+            break
+    return resultado
+
+### **🔹 Recepción del catálogo**
+# Regla de conflictos del stock: la central manda. El stock local de un producto
+# pasa a ser el de la central menos lo vendido en la caja que aún no se subió
+# (nunca menos de cero), de modo que una venta sin conexión no se "devuelve" al
+# traer el catálogo y tampoco se descuenta dos veces una vez subida.
+SQL_PENDIENTES = """
+    SELECT v.producto_id, SUM(v.cantidad)
+    FROM cambios_ventas c JOIN ventas v ON v.ticket_id = c.ticket_id
+    GROUP BY v.producto_id
+"""
+
+def _aplicar_catalogo(cursor, ids, productos, codigos):
+    """Deja los productos `ids` de la réplica (todos si es None) iguales a los de la central.
+
+    `productos` son las filas `(id, nombre, cantidad, precio, categoria)` de la
+    central y `codigos` los pares `(codigo, producto_id)`. Si solo cambian stock o
+    precio no se toca el nombre, para no reescribir el índice de búsqueda. Debe
+    llamarse dentro de una transacción de escritura. Devuelve la cantidad de
+    productos borrados.
+    """
+    pendientes = dict(cursor.execute(SQL_PENDIENTES).fetchall())
+    filtro, parametros = ("", []) if ids is None else (f" WHERE id IN ({_marcadores(ids)})", ids)
+    cursor.execute(f"SELECT id, nombre, categoria FROM productos{filtro}", parametros)
+    locales = {id_producto: (nombre, categoria) for id_producto, nombre, categoria in cursor.fetchall()}
+    centrales = {fila[0] for fila in productos}
+    borrados = [(id_producto,) for id_producto in locales if id_producto not in centrales]
+    cursor.executemany("DELETE FROM productos WHERE id = ?", borrados)
+    for id_producto, nombre, cantidad, precio, categoria in productos:
+        cantidad = max(cantidad - pendientes.get(id_producto, 0), 0)
+        while True:
+            try:
+                if id_producto not in locales:
+                    cursor.execute("INSERT INTO productos (id, nombre, cantidad, precio, categoria) VALUES (?, ?, ?, ?, ?)",
+                                   (id_producto, nombre, cantidad, precio, categoria))
+                elif locales[id_producto] == (nombre, categoria):
+                    cursor.execute("UPDATE productos SET cantidad = ?, precio = ? WHERE id = ?",
+                                   (cantidad, precio, id_producto))
+                else:
+                    cursor.execute("UPDATE productos SET nombre = ?, cantidad = ?, precio = ?, categoria = ? WHERE id = ?",
+                                   (nombre, cantidad, precio, categoria, id_producto))
+                break
+            except sqlite3.IntegrityError:
+                # Otro producto local todavía tiene este nombre: en la central ya lo cambió, así
+                # que se borra y vuelve con su cambio (en este lote o en uno siguiente)
+                fila = cursor.execute("SELECT id FROM productos WHERE nombre = ? COLLATE NOCASE AND id <> ?",
+                                      (nombre, id_producto)).fetchone()
+                if fila is None:
+                    raise
+                cursor.execute("DELETE FROM productos WHERE id = ?", fila)
+                locales.pop(fila[0], None)
+
+    filtro = filtro.replace("id IN", "producto_id IN")
+    locales = set(cursor.execute(f"SELECT codigo, producto_id FROM codigos_producto{filtro}", parametros).fetchall())
+    centrales = set(codigos)
+    cursor.executemany("DELETE FROM codigos_producto WHERE codigo = ? AND producto_id = ?", locales - centrales)
+    cursor.executemany("INSERT OR REPLACE INTO codigos_producto (codigo, producto_id) VALUES (?, ?)",
+                       centrales - locales)
+    return len(borrados)
+
+def _secuencia_central(cursor):
+    fila = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'cambios_productos'").fetchone()
+    return fila[0] if fila else 0
+
+def _copiar_catalogo(local, central):
+    """Copia el catálogo y los usuarios completos de la central (primera vez o caja muy atrasada)."""
+    cursor_central = central.cursor()
+    cursor_central.execute("BEGIN")  # Una sola lectura consistente de la central
+    try:
+        secuencia = _secuencia_central(cursor_central)
+        productos = cursor_central.execute("SELECT id, nombre, cantidad, precio, categoria FROM productos").fetchall()
+        codigos = cursor_central.execute("SELECT codigo, producto_id FROM codigos_producto").fetchall()
+        usuarios = cursor_central.execute("SELECT id, nombre, password, email, dni, rol FROM usuarios").fetchall()
+    finally:
+        central.rollback()
+    cursor = local.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        borrados = _aplicar_catalogo(cursor, None, productos, codigos)
+        cursor.execute("DELETE FROM usuarios")
+        cursor.executemany("INSERT INTO usuarios (id, nombre, password, email, dni, rol) VALUES (?, ?, ?, ?, ?, ?)",
+                           usuarios)
+        _guardar_estado(cursor, "ultimo_seq", secuencia)
+        cursor.execute("DELETE FROM cambios_productos")
+        local.commit()
+    except sqlite3.Error:
+        local.rollback()
+        raise
+    cache_catalogo.invalidar()
+    logger.info("✅ Catálogo copiado de la central: %s productos, %s usuarios.", len(productos), len(usuarios))
+    return {"copia_completa": True, "cambios_recibidos": 0, "productos_actualizados": len(productos),
+            "productos_borrados": borrados, "ultimo_seq": secuencia}
+
+def _traer_catalogo(local, central, lote, completa=False):
+    """Trae los cambios del catálogo posteriores a la última sincronización, de a `lote`."""
+    cursor, cursor_central = local.cursor(), central.cursor()
+    ultimo = _estado(cursor, "ultimo_seq")
+    local.commit()
+    cursor_central.execute("BEGIN")
+    try:
+        if not cursor_central.execute("SELECT 1 FROM sqlite_master WHERE name = 'cambios_productos'").fetchone():
+            raise sqlite3.DatabaseError("la base central no registra cambios del catálogo: ejecutar `migrate` en ella")
+        minimo = cursor_central.execute("SELECT MIN(seq) FROM cambios_productos").fetchone()[0]
+        secuencia = _secuencia_central(cursor_central)
+    finally:
+        central.rollback()
+    # Copia completa si es la primera vez, si la central ya podó cambios que la caja no vio
+    # o si la central está por detrás de la caja (se restauró de una copia, por ejemplo)
+    if completa or not ultimo or (minimo is not None and minimo > ultimo + 1) or secuencia < ultimo:
+        return _copiar_catalogo(local, central)
+
+    resultado = {"copia_completa": False, "cambios_recibidos": 0, "productos_actualizados": 0,
+                 "productos_borrados": 0, "ultimo_seq": ultimo}
+    while True:
+        cursor_central.execute("BEGIN")
+        try:
+            cambios = cursor_central.execute("""
+                SELECT seq, producto_id FROM cambios_productos WHERE seq > ? ORDER BY seq LIMIT ?
+            """, (ultimo, lote)).fetchall()
+            ids = sorted({producto_id for _, producto_id in cambios})
+            if ids:
+                productos = cursor_central.execute(f"""
+                    SELECT id, nombre, cantidad, precio, categoria FROM productos WHERE id IN ({_marcadores(ids)})
+                """, ids).fetchall()
+                codigos = cursor_central.execute(f"""
+                    SELECT codigo, producto_id FROM codigos_producto WHERE producto_id IN ({_marcadores(ids)})
+                """, ids).fetchall()
+        finally:
+            central.rollback()
+        if not cambios:
+            break
+        ultimo = cambios[-1][0]
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            borrados = _aplicar_catalogo(cursor, ids, productos, codigos)
+            _guardar_estado(cursor, "ultimo_seq", ultimo)
+            local.commit()
+        except sqlite3.Error:
+            local.rollback()
+            raise
+        for id_producto in ids:
+            cache_catalogo.invalidar(id_producto)
+        resultado["cambios_recibidos"] += len(cambios)
+        resultado["productos_actualizados"] += len(productos)
+        resultado["productos_borrados"] += borrados
+        resultado["ultimo_seq"] = ultimo
+        if len(cambios) < lote:
+            break
+    # Los cambios que registra la propia caja no los lee nadie
+    cursor.execute("DELETE FROM cambios_productos")
+    local.commit()
+    return resultado
+
+### **🔹 Sincronización**
+def _sincronizar(local, central, lote, completa=False):
+    """Sube las ventas y después trae el catálogo, para que el stock recibido ya las incluya."""
+    inicio = time.perf_counter()
+    preparar_replica(local)
+    resultado = _enviar_ventas(local, central, lote)
+    resultado.update(_traer_catalogo(local, central, lote, completa))
+    resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+    if resultado["tickets_enviados"] or resultado["cambios_recibidos"] or resultado["copia_completa"]:
+        logger.info("✅ Sincronizado con la central: %s tickets enviados, %s cambios del catálogo recibidos.",
+                    resultado["tickets_enviados"], resultado["cambios_recibidos"])
+    return resultado
+
+def sincronizar(ruta_central=config.SINC_CENTRAL, lote=config.SINC_LOTE, completa=False):
+    """Sincroniza una vez la base de esta caja con la central en `ruta_central`.
+
+    Devuelve un diccionario con los tickets enviados, los cambios del catálogo
+    recibidos y si hizo una copia completa (`completa=True` la fuerza, por ejemplo
+    para traer usuarios nuevos), o None si hubo un error.
+    """
+    try:
+        central = abrir_conexion(ruta_central, crear=False, wal=False)
+    except sqlite3.Error as e:
+        logger.error("❌ No se pudo abrir la base central '%s': %s", ruta_central, e)
+        return None
+    try:
+        return _sincronizar(conectar_db(), central, lote, completa)
+    except sqlite3.Error as e:
+        logger.error("❌ Error al sincronizar con la base central: %s", e)
+        return None
+    finally:
+        central.close()
+
+def podar_cambios_catalogo(conservar=config.SINC_CAMBIOS_CONSERVADOS):
+    """Borra de la central los cambios del catálogo más viejos que los últimos `conservar`.
+
+    Una caja que quedó más atrás hace una copia completa en su próxima
+    sincronización. Devuelve la cantidad de cambios borrados, o None si hubo un error.
+    """
+    try:
+        with conectar_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM cambios_productos WHERE seq <= (SELECT MAX(seq) FROM cambios_productos) - ?",
+                           (conservar,))
+            return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error("❌ Error al podar los cambios del catálogo: %s", e)
+        return None
+
+class Sincronizador:
+    """Hilo que sincroniza la caja con la base central cada `intervalo` segundos.
+
+    Mantiene abierta la conexión a la central entre una sincronización y otra. Si
+    la central no está disponible la caja sigue vendiendo sobre su réplica, y los
+    reintentos se espacian hasta `espera_maxima`.
+    """
+
+    def __init__(self, ruta_central=config.SINC_CENTRAL, intervalo=config.SINC_INTERVALO, lote=config.SINC_LOTE,
+                 espera_maxima=config.SINC_ESPERA_MAXIMA):
+        self.ruta_central = ruta_central
+        self.intervalo = intervalo
+        self.lote = lote
+        self.espera_maxima = espera_maxima
+        self._central = None
+        self._aviso = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self.ultimo_resultado = None
+        self.fallos = 0
+
+    def iniciar(self):
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="sincronizador", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        """Detiene el hilo al terminar la sincronización en curso."""
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._aviso.set()
+        self._hilo.join()
+        self._hilo = None
+
+    def avisar(self):
+        """Adelanta la próxima sincronización."""
+        self._aviso.set()
+
+    def sincronizar_ahora(self):
+        if self._central is None:
+            self._central = abrir_conexion(self.ruta_central, crear=False, wal=False)
+        return _sincronizar(conectar_db(), self._central, self.lote)
+
+    def _cerrar_central(self):
+        if self._central is not None:
+            self._central.close()
+            self._central = None
+
+    def _bucle(self):
+        try:
+            while not self._detener.is_set():
+                try:
+                    self.ultimo_resultado = self.sincronizar_ahora()
+                    self.fallos = 0
+                    espera = self.intervalo
+                except Exception as e:
+                    # Ni la central caída ni un error inesperado deben matar el hilo de la caja
+                    self._cerrar_central()
+                    self.fallos += 1
+                    espera = min(self.intervalo * 2 ** self.fallos, self.espera_maxima)
+                    if isinstance(e, sqlite3.Error):
+                        logger.warning("⚠️ No se pudo sincronizar con la central (%s); se reintentará en %.0f s.",
+                                       e, espera)
+                    else:
+                        logger.exception("❌ Error inesperado al sincronizar; se reintentará en %.0f s.", espera)
+                self._aviso.wait(espera)
+                self._aviso.clear()
+        finally:
+            self._cerrar_central()
+            liberar_conexion()
+
+_sincronizador = None
+_lock_sincronizador = threading.Lock()
+
+def obtener_sincronizador():
+    """Devuelve el sincronizador del proceso, iniciándolo la primera vez (con `config.SINC_CENTRAL`)."""
+    global _sincronizador
+    with _lock_sincronizador:
+        if _sincronizador is None:
+            preparar_replica(conectar_db())
+            _sincronizador = Sincronizador().iniciar()
+            atexit.register(detener_sincronizador)
+        return _sincronizador
+
+def detener_sincronizador():
+    """Detiene el sincronizador, si estaba en marcha. Las ventas no enviadas quedan en la réplica."""
+    global _sincronizador
+    with _lock_sincronizador:
+        if _sincronizador is not None:
+            _sincronizador.detener()
+            _sincronizador = None
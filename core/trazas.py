@@ -0,0 +1,328 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from utils import config
+from utils.registro import FormateadorJSON, en_cola
+
+logger = logging.getLogger(__name__)
+
+### **🔹 Parámetros sensibles**
+# Columnas cuyos valores nunca se escriben en las trazas
+_COLUMNA_SENSIBLE = re.compile(r"password", re.IGNORECASE)
+# Hashes de werkzeug: se ocultan aunque lleguen por una columna con otro nombre
+_PREFIJOS_HASH = ("pbkdf2:", "scrypt:")
+OCULTO = "***"
+
+_INSERT = re.compile(r"INSERT\s+(?:OR\s+\w+\s+)?INTO\s+\w+\s*\(([^)]*)\)\s*VALUES\s*\(([^)]*)\)", re.IGNORECASE)
+_ASIGNACION = re.compile(r"(\w+)\s*=\s*\?")
+
+@lru_cache(maxsize=1024)
+def posiciones_sensibles(sql):
+    """Índices de los `?` de `sql` que reciben el valor de una columna sensible."""
+    posiciones = set()
+    insert = _INSERT.search(sql)
+    if insert:
+        columnas = [c.strip() for c in insert.group(1).split(",")]
+        primero = sql[:insert.start(2)].count("?")
+        indice = primero
+        for columna, valor in zip(columnas, insert.group(2).split(",")):
+            if valor.strip() == "?":
+                if _COLUMNA_SENSIBLE.search(columna):
+                    posiciones.add(indice)
+                indice += 1
+    for asignacion in _ASIGNACION.finditer(sql):
+        if _COLUMNA_SENSIBLE.search(asignacion.group(1)):
+            posiciones.add(sql[:asignacion.end()].count("?") - 1)
+    return frozenset(posiciones)
+
+def _ocultar_valor(valor):
+    if isinstance(valor, str) and valor.startswith(_PREFIJOS_HASH):
+        return OCULTO
+    return valor
+
+def ocultar_parametros(sql, parametros):
+    """Copia de `parametros` con los valores de las columnas sensibles reemplazados por `***`."""
+    if parametros is None:
+        return None
+    if isinstance(parametros, dict):
+        return {clave: OCULTO if _COLUMNA_SENSIBLE.search(clave) else _ocultar_valor(valor)
+                for clave, valor in parametros.items()}
+    sensibles = posiciones_sensibles(sql)
+    return [OCULTO if i in sensibles else _ocultar_valor(valor) for i, valor in enumerate(parametros)]
+
+_LISTA_IN = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+
+@lru_cache(maxsize=4096)
+def normalizar_sql(sql):
+    """Texto con el que se agrupan las estadísticas: espacios colapsados y listas `IN (?, ?, ...)` unificadas."""
+    return _LISTA_IN.sub("IN (?, ...)", " ".join(sql.split()))
+
+### **🔹 Estadísticas y registro de consultas lentas**
+# Sentencias sin plan de ejecución que mostrar
+_SIN_PLAN = ("BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE", "PRAGMA", "CREATE", "DROP", "ALTER",
+             "ANALYZE", "VACUUM", "ATTACH", "DETACH", "REINDEX")
+
+class EstadisticasSQL:
+    """Acumula, por sentencia, cantidad de ejecuciones, tiempo total y tiempo máximo.
+
+    También conserva las últimas `recientes` sentencias ejecutadas (con sus
+    parámetros ya ocultos) y escribe en el registro de consultas lentas las que
+    superan `umbral_lento` segundos, junto con su `EXPLAIN QUERY PLAN`.
+    """
+
+    def __init__(self, umbral_lento=config.TRAZAS_SQL_UMBRAL_LENTO, recientes=config.TRAZAS_SQL_RECIENTES,
+                 archivo_lento=config.TRAZAS_SQL_ARCHIVO_LENTO):
+        self.umbral_lento = umbral_lento
+        self.archivo_lento = archivo_lento
+        self._lock = threading.Lock()
+        self._por_sentencia = {}  # sql normalizado -> [cantidad, total, máximo, filas, errores]
+        self._recientes = deque(maxlen=recientes)
+        self._registro_lento = None
+        self.consultas_lentas = 0
+
+    def registrar(self, conn, sql, parametros, duracion, filas, error=None):
+        """Anota una ejecución de `sql` que tardó `duracion` segundos y afectó o devolvió `filas` filas."""
+        clave = normalizar_sql(sql)
+        ocultos = ocultar_parametros(sql, parametros)
+        with self._lock:
+            acumulado = self._por_sentencia.get(clave)
+            if acumulado is None:
+                acumulado = self._por_sentencia[clave] = [0, 0.0, 0.0, 0, 0]
+            acumulado[0] += 1
+            acumulado[1] += duracion
+            acumulado[2] = max(acumulado[2], duracion)
+            acumulado[3] += max(filas, 0)
+            acumulado[4] += error is not None
+            self._recientes.append({"sql": clave, "parametros": ocultos, "duracion_ms": duracion * 1000,
+                                    "filas": filas, "error": error})
+        logger.debug("🔹 SQL %.2f ms, %s filas: %s %s", duracion * 1000, filas, clave, ocultos)
+        if duracion >= self.umbral_lento:
+            self._anotar_lenta(conn, sql, clave, parametros, ocultos, duracion, filas)
+
+    def _anotar_lenta(self, conn, sql, clave, parametros, ocultos, duracion, filas):
+        plan = []
+        if conn is not None and not clave.upper().startswith(_SIN_PLAN):
+            try:
+                # Se llama al método de sqlite3.Connection para que el EXPLAIN no quede trazado
+                plan = [fila[-1] for fila in sqlite3.Connection.execute(
+                    conn, f"EXPLAIN QUERY PLAN {sql}", parametros if parametros is not None else ())]
+            except sqlite3.Error as e:
+                plan = [f"(sin plan: {e})"]
+        with self._lock:
+            self.consultas_lentas += 1
+        logger.warning("⚠️ Consulta lenta (%.0f ms): %s", duracion * 1000, clave[:200])
+        registro = self._obtener_registro_lento()
+        if registro is not None:
+            registro.info("Consulta lenta", extra={"duracion_ms": round(duracion * 1000, 3), "filas": filas,
+                                                   "sql": clave, "parametros": ocultos, "plan": plan})
+
+    def _obtener_registro_lento(self):
+        """Logger que escribe una línea JSON por consulta lenta en `archivo_lento`, desde un hilo aparte."""
+        if self._registro_lento is None and self.archivo_lento:
+            with self._lock:
+                if self._registro_lento is None:
+                    registro = logging.getLogger("ordico.sql_lento")
+                    registro.setLevel(logging.INFO)
+                    registro.propagate = False
+                    if not registro.handlers:
+                        manejador = logging.FileHandler(self.archivo_lento, encoding="utf-8")
+                        manejador.setFormatter(FormateadorJSON())
+                        en_cola(registro, manejador)
+                    self._registro_lento = registro
+        return self._registro_lento
+
+    def estadisticas(self):
+        """Estadísticas por sentencia, de la que más tiempo total consumió a la que menos."""
+        with self._lock:
+            filas = [{
+                "sql": sql,
+                "cantidad": cantidad,
+                "total_ms": total * 1000,
+                "media_ms": total * 1000 / cantidad,
+                "maximo_ms": maximo * 1000,
+                "filas": filas_totales,
+                "errores": errores,
+            } for sql, (cantidad, total, maximo, filas_totales, errores) in self._por_sentencia.items()]
+        filas.sort(key=lambda fila: fila["total_ms"], reverse=True)
+        return filas
+
+    def recientes(self):
+        """Últimas sentencias ejecutadas, de la más vieja a la más nueva."""
+        with self._lock:
+            return list(self._recientes)
+
+    def reiniciar_estadisticas(self):
+        """Descarta lo acumulado (útil para medir un período concreto)."""
+        with self._lock:
+            self._por_sentencia.clear()
+            self._recientes.clear()
+            self.consultas_lentas = 0
+
+# Estadísticas compartidas por todas las conexiones trazadas del proceso
+estadisticas_sql = EstadisticasSQL()
+
+def volcar_estadisticas(ruta):
+    """Guarda en `ruta` (JSON) las estadísticas por sentencia y las últimas sentencias ejecutadas."""
+    try:
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump({
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "umbral_lento_ms": estadisticas_sql.umbral_lento * 1000,
+                "consultas_lentas": estadisticas_sql.consultas_lentas,
+                "sentencias": estadisticas_sql.estadisticas(),
+                "recientes": estadisticas_sql.recientes(),
+            }, f, ensure_ascii=False, indent=2, default=str)
+        logger.info("✅ Estadísticas de SQL guardadas en '%s'.", ruta)
+        return True
+    except OSError as e:
+        logger.error("❌ Error al guardar las estadísticas de SQL en '%s': %s", ruta, e)
+        return False
+
+### **🔹 Conexión y cursor trazados**
+class CursorTrazado(sqlite3.Cursor):
+    """Cursor que mide cada sentencia desde `execute` hasta que se terminan de leer sus filas.
+
+    En las consultas la mayor parte del trabajo ocurre al leer, así que la traza
+    se cierra recién cuando se agotan las filas, se ejecuta otra sentencia con el
+    mismo cursor, o el cursor se cierra o se libera.
+    """
+
+    def __init__(self, conn):
+        super().__init__(conn)
+        self._traza = None  # [sql, parámetros, segundos, filas]
+
+    def _abrir_traza(self, sql, parametros, inicio):
+        self._traza = [sql, parametros, time.perf_counter() - inicio, 0]
+        if self.description is None:
+            # No es una consulta: ya terminó y rowcount tiene las filas afectadas
+            self._cerrar_traza(self.rowcount)
+
+    def _cerrar_traza(self, filas=None, error=None):
+        traza, self._traza = self._traza, None
+        if traza is not None:
+            sql, parametros, duracion, leidas = traza
+            estadisticas_sql.registrar(self.connection, sql, parametros, duracion,
+                                       leidas if filas is None else filas, error)
+
+    def _fallo(self, sql, parametros, inicio, error):
+        self._traza = [sql, parametros, time.perf_counter() - inicio, 0]
+        self._cerrar_traza(-1, str(error))
+
+    def execute(self, sql, parametros=()):
+        self._cerrar_traza()
+        inicio = time.perf_counter()
+        try:
+            super().execute(sql, parametros)
+        except sqlite3.Error as e:
+            self._fallo(sql, parametros, inicio, e)
+            raise
+        self._abrir_traza(sql, parametros, inicio)
+        return self
+
+    def executemany(self, sql, secuencia):
+        self._cerrar_traza()
+        primeros = []
+
+        def recordar_primero(filas):
+            # Solo se guardan los parámetros de la primera fila (puede ser un generador)
+            for fila in filas:
+                if not primeros:
+                    primeros.append(fila)
+                yield fila
+
+        inicio = time.perf_counter()
+        try:
+            super().executemany(sql, recordar_primero(secuencia))
+        except sqlite3.Error as e:
+            self._fallo(sql, primeros[0] if primeros else None, inicio, e)
+            raise
+        self._abrir_traza(sql, primeros[0] if primeros else None, inicio)
+        return self
+
+    def executescript(self, script):
+        self._cerrar_traza()
+        inicio = time.perf_counter()
+        try:
+            super().executescript(script)
+        except sqlite3.Error as e:
+            self._fallo(script, None, inicio, e)
+            raise
+        self._traza = [script, None, time.perf_counter() - inicio, 0]
+        self._cerrar_traza(-1)
+        return self
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        fila = super().fetchone()
+        if self._traza is not None:
+            self._traza[2] += time.perf_counter() - inicio
+            if fila is None:
+                self._cerrar_traza()
+            else:
+                self._traza[3] += 1
+        return fila
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        inicio = time.perf_counter()
+        filas = super().fetchmany(size)
+        if self._traza is not None:
+            self._traza[2] += time.perf_counter() - inicio
+            self._traza[3] += len(filas)
+            if len(filas) < size:
+                self._cerrar_traza()
+        return filas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        filas = super().fetchall()
+        if self._traza is not None:
+            self._traza[2] += time.perf_counter() - inicio
+            self._traza[3] += len(filas)
+            self._cerrar_traza()
+        return filas
+
+    def __next__(self):
+        inicio = time.perf_counter()
+        try:
+            fila = super().__next__()
+        except StopIteration:
+            if self._traza is not None:
+                self._traza[2] += time.perf_counter() - inicio
+                self._cerrar_traza()
+            raise
+        if self._traza is not None:
+            self._traza[2] += time.perf_counter() - inicio
+            self._traza[3] += 1
+        return fila
+
+    def close(self):
+        self._cerrar_traza()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._cerrar_traza()
+        except sqlite3.Error:
+            pass  # La conexión ya estaba cerrada
+
+class ConexionTrazada(sqlite3.Connection):
+    """Conexión cuyos cursores (incluidos los de `execute` y `executemany`) son `CursorTrazado`."""
+
+    def cursor(self, factory=CursorTrazado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, secuencia):
+        return self.cursor().executemany(sql, secuencia)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
@@ -3,12 +3,12 @@ import logging
 from core.database import conectar_db  # Importamos la conexión a la BD
 
 # Configuración del logger
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
 
 def agregar_usuario(nombre, password, email, dni, rol):
     """Inserta un nuevo usuario en la base de datos."""
     if not nombre or not password or not email or not dni:
-        logging.warning("⚠️ Error: Todos los campos son obligatorios para registrar un usuario.")
+        logger.warning("⚠️ Error: Todos los campos son obligatorios para registrar un usuario.")
         return False
 
     try:
@@ -19,15 +19,42 @@ def agregar_usuario(nombre, password, email, dni, rol):
                 VALUES (?, ?, ?, ?, ?)
             """, (nombre.strip(), password, email.strip().lower(), dni.strip(), rol.strip()))
             conn.commit()
-            logging.info(f"✅ Usuario agregado: {nombre} - Rol: {rol}")
+            logger.info("✅ Usuario agregado: %s - Rol: %s", nombre, rol)
             return True
     except sqlite3.IntegrityError:
-        logging.warning(f"⚠️ El usuario '{nombre}' ya existe en la base de datos.")
+        logger.warning("⚠️ El usuario '%s' ya existe en la base de datos.", nombre)
         return False
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al agregar usuario: {e}")
+        logger.error("❌ Error al agregar usuario: %s", e)
         return False
 
+def agregar_usuarios(usuarios):
+    """Inserta varios usuarios `(nombre, password, email, dni, rol)` en una sola transacción.
+
+    Las contraseñas ya deben venir hasheadas. Los que chocan con un nombre, email
+    o DNI existente se omiten sin afectar al resto. Devuelve `(agregados,
+    duplicados)`, con los índices en `usuarios` de los omitidos, o `(0, None)`
+    si hubo un error de la base.
+    """
+    agregados, duplicados = 0, []
+    try:
+        with conectar_db() as conn:
+            cursor = conn.cursor()
+            for indice, (nombre, password, email, dni, rol) in enumerate(usuarios):
+                try:
+                    cursor.execute("""
+                        INSERT INTO usuarios (nombre, password, email, dni, rol)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (nombre.strip(), password, email.strip().lower(), dni.strip(), rol.strip()))
+                    agregados += 1
+                except sqlite3.IntegrityError:
+                    duplicados.append(indice)  # SQLite deshace solo esta sentencia: la transacción sigue
+        logger.info("✅ %s usuarios agregados, %s ya existían.", agregados, len(duplicados))
+        return agregados, duplicados
+    except sqlite3.Error as e:
+        logger.error("❌ Error al agregar usuarios: %s", e)
+        return 0, None
+
 def obtener_usuarios():
     """Obtiene la lista de todos los usuarios."""
     try:
@@ -36,13 +63,13 @@ def obtener_usuarios():
             cursor.execute("SELECT id, nombre, email, dni, rol FROM usuarios")
             return cursor.fetchall()
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al obtener usuarios: {e}")
+        logger.error("❌ Error al obtener usuarios: %s", e)
         return []
 
 def obtener_usuario_por_dni(dni):
     """Obtiene un usuario por su DNI."""
     if not dni:
-        logging.warning("⚠️ DNI inválido para la búsqueda.")
+        logger.warning("⚠️ DNI inválido para la búsqueda.")
         return None
 
     try:
@@ -51,13 +78,13 @@ def obtener_usuario_por_dni(dni):
             cursor.execute("SELECT id, nombre, password, email, dni, rol FROM usuarios WHERE dni = ?", (dni.strip(),))
             return cursor.fetchone()
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al obtener usuario por DNI {dni}: {e}")
+        logger.error("❌ Error al obtener usuario por DNI %s: %s", dni, e)
         return None
 
 def obtener_usuario_por_nombre(nombre):
     """Obtiene un usuario por su nombre de usuario."""
     if not nombre:
-        logging.warning("⚠️ Nombre inválido para la búsqueda.")
+        logger.warning("⚠️ Nombre inválido para la búsqueda.")
         return None
 
     try:
@@ -66,13 +93,13 @@ def obtener_usuario_por_nombre(nombre):
             cursor.execute("SELECT id, nombre, password, email, dni, rol FROM usuarios WHERE nombre = ?", (nombre.strip(),))
             return cursor.fetchone()
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al obtener usuario por nombre '{nombre}': {e}")
+        logger.error("❌ Error al obtener usuario por nombre '%s': %s", nombre, e)
         return None
 
 def obtener_usuario_por_email(email):
     """Obtiene un usuario por su correo electrónico."""
     if not email:
-        logging.warning("⚠️ Email inválido para la búsqueda.")
+        logger.warning("⚠️ Email inválido para la búsqueda.")
         return None
 
     try:
@@ -85,13 +112,39 @@ def obtener_usuario_por_email(email):
             """, (email.strip().lower(),))
             return cursor.fetchone()
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al obtener usuario por email '{email}': {e}")
+        logger.error("❌ Error al obtener usuario por email '%s': %s", email, e)
+        return None
+
+def obtener_usuario_para_login(entrada):
+    """Busca un usuario por email o por nombre en una sola consulta.
+
+    Usa los índices únicos de `email` (guardado en minúsculas) y de `nombre`. Si
+    la entrada coincide con el email de un usuario y el nombre de otro, gana el email.
+    """
+    if not entrada or not entrada.strip():
+        return None
+
+    nombre = entrada.strip()
+    email = nombre.lower()
+    try:
+        with conectar_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, nombre, password, email, dni, rol
+                FROM usuarios
+                WHERE email = ? OR nombre = ?
+                ORDER BY email = ? DESC
+                LIMIT 1
+            """, (email, nombre, email))
+            return cursor.fetchone()
+    except sqlite3.Error as e:
+        logger.error("❌ Error al buscar el usuario '%s' para iniciar sesión: %s", entrada, e)
         return None
 
 def eliminar_usuario(id_usuario):
     """Elimina un usuario por su ID."""
     if not id_usuario:
-        logging.warning("⚠️ ID de usuario inválido para la eliminación.")
+        logger.warning("⚠️ ID de usuario inválido para la eliminación.")
         return False
 
     try:
@@ -99,24 +152,24 @@ def eliminar_usuario(id_usuario):
             cursor = conn.cursor()
             cursor.execute("DELETE FROM usuarios WHERE id = ?", (id_usuario,))
             if cursor.rowcount == 0:
-                logging.warning(f"⚠️ No se encontró el usuario con ID {id_usuario}.")
+                logger.warning("⚠️ No se encontró el usuario con ID %s.", id_usuario)
                 return False
             conn.commit()
-            logging.info(f"✅ Usuario con ID {id_usuario} eliminado correctamente.")
+            logger.info("✅ Usuario con ID %s eliminado correctamente.", id_usuario)
             return True
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al eliminar usuario con ID '{id_usuario}': {e}")
+        logger.error("❌ Error al eliminar usuario con ID '%s': %s", id_usuario, e)
         return False
 
 def actualizar_password(email, nueva_password):
     """Actualiza la contraseña de un usuario dado su correo electrónico."""
     if not email or not nueva_password:
-        logging.warning("⚠️ Email y nueva contraseña son obligatorios.")
+        logger.warning("⚠️ Email y nueva contraseña son obligatorios.")
         return False
 
     usuario = obtener_usuario_por_email(email)
     if not usuario:
-        logging.warning(f"⚠️ No se encontró el usuario con email: {email}")
+        logger.warning("⚠️ No se encontró el usuario con email: %s", email)
         return False
 
     try:
@@ -124,21 +177,38 @@ def actualizar_password(email, nueva_password):
             cursor = conn.cursor()
             cursor.execute("UPDATE usuarios SET password = ? WHERE email = ?", (nueva_password, email.strip().lower()))
             conn.commit()
-            logging.info(f"✅ Contraseña actualizada para el usuario con email: {email}")
+            logger.info("✅ Contraseña actualizada para el usuario con email: %s", email)
             return True
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al actualizar contraseña para '{email}': {e}")
+        logger.error("❌ Error al actualizar contraseña para '%s': %s", email, e)
+        return False
+
+def reemplazar_hash_password(id_usuario, hash_anterior, hash_nuevo):
+    """Cambia el hash guardado de un usuario solo si sigue siendo `hash_anterior`.
+
+    Se usa para actualizar el costo del hash al iniciar sesión: si la contraseña
+    cambió mientras tanto, no se pisa.
+    """
+    try:
+        with conectar_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE usuarios SET password = ? WHERE id = ? AND password = ?",
+                           (hash_nuevo, id_usuario, hash_anterior))
+            conn.commit()
+            return cursor.rowcount == 1
+    except sqlite3.Error as e:
+        logger.error("❌ Error al actualizar el hash de la contraseña del usuario %s: %s", id_usuario, e)
         return False
 
 def actualizar_rol_usuario(id_usuario, nuevo_rol):
     """Actualiza el rol de un usuario en la base de datos."""
     if not id_usuario or not nuevo_rol:
-        logging.warning("⚠️ ID de usuario y nuevo rol son obligatorios.")
+        logger.warning("⚠️ ID de usuario y nuevo rol son obligatorios.")
         return False
 
     usuario = obtener_usuario_por_dni(id_usuario)
     if not usuario:
-        logging.warning(f"⚠️ No se encontró el usuario con ID: {id_usuario}")
+        logger.warning("⚠️ No se encontró el usuario con ID: %s", id_usuario)
         return False
 
     try:
@@ -146,10 +216,10 @@ def actualizar_rol_usuario(id_usuario, nuevo_rol):
             cursor = conn.cursor()
             cursor.execute("UPDATE usuarios SET rol = ? WHERE id = ?", (nuevo_rol.strip(), id_usuario))
             conn.commit()
-            logging.info(f"✅ Rol actualizado para usuario ID {id_usuario}: {nuevo_rol}")
+            logger.info("✅ Rol actualizado para usuario ID %s: %s", id_usuario, nuevo_rol)
             return True
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al actualizar rol para usuario ID {id_usuario}: {e}")
+        logger.error("❌ Error al actualizar rol para usuario ID %s: %s", id_usuario, e)
         return False
 
 def obtener_cantidad_usuarios():
@@ -161,5 +231,5 @@ def obtener_cantidad_usuarios():
             cantidad = cursor.fetchone()[0]
             return cantidad
     except sqlite3.Error as e:
-        logging.error(f"❌ Error al obtener cantidad de usuarios: {e}")
+        logger.error("❌ Error al obtener cantidad de usuarios: %s", e)
         return 0
@@ -0,0 +1,227 @@
+import logging
+import sqlite3
+import uuid
+from datetime import datetime
+from core.cache import cache_catalogo
+from core.database import conectar_db
+from core.reportes import actualizar_resumenes
+from utils import config
+
+logger = logging.getLogger(__name__)
+
+class StockInsuficiente(Exception):
+    """No hay stock suficiente para una línea del ticket; la venta no se registró."""
+
+    def __init__(self, producto_id, nombre, solicitado, disponible):
+        super().__init__(f"Stock insuficiente para '{nombre}': se pidieron {solicitado}, hay {disponible}.")
+        self.producto_id = producto_id
+        self.nombre = nombre
+        self.solicitado = solicitado
+        self.disponible = disponible
+
+class Carrito:
+    """Líneas de un ticket en preparación, agrupadas por producto.
+
+    El precio de cada línea se toma al agregar el producto, que es el que ve el cliente.
+    """
+
+    def __init__(self):
+        self._lineas = {}  # producto_id -> {"producto_id", "nombre", "cantidad", "precio"}
+
+    def agregar(self, producto, cantidad=1):
+        """Agrega `cantidad` unidades de un producto `(id, nombre, cantidad, precio, ...)`."""
+        if cantidad <= 0:
+            raise ValueError("La cantidad debe ser mayor que cero.")
+        producto_id, nombre, _, precio = producto[:4]
+        linea = self._lineas.setdefault(producto_id, {"producto_id": producto_id, "nombre": nombre,
+                                                      "cantidad": 0, "precio": precio})
+        linea["cantidad"] += cantidad
+        return linea
+
+    def cambiar_cantidad(self, producto_id, cantidad):
+        """Fija la cantidad de una línea; con 0 la quita."""
+        if cantidad <= 0:
+            self.quitar(producto_id)
+        else:
+            self._lineas[producto_id]["cantidad"] = cantidad
+
+    def quitar(self, producto_id):
+        """Quita la línea de un producto."""
+        self._lineas.pop(producto_id, None)
+
+    def vaciar(self):
+        """Quita todas las líneas."""
+        self._lineas.clear()
+
+    def lineas(self):
+        """Líneas en el orden en que se agregaron."""
+        return list(self._lineas.values())
+
+    def total(self):
+        """Importe total del ticket, redondeado a centavos."""
+        return round(sum(l["cantidad"] * l["precio"] for l in self._lineas.values()), 2)
+
+    def __len__(self):
+        return len(self._lineas)
+
+SQL_DESCONTAR_STOCK = "UPDATE productos SET cantidad = cantidad - ? WHERE id = ? AND cantidad >= ?"
+
+def _faltante(cursor, lineas):
+    """Devuelve la primera línea sin stock suficiente (se llama tras un UPDATE fallido)."""
+    for linea in lineas:
+        fila = cursor.execute("SELECT cantidad FROM productos WHERE id = ?", (linea["producto_id"],)).fetchone()
+        disponible = fila[0] if fila else 0
+        if disponible < linea["cantidad"]:
+            return StockInsuficiente(linea["producto_id"], linea["nombre"], linea["cantidad"], disponible)
+    return None
+
+def _insertar_ticket(cursor, ticket_id, usuario_id, fecha, total, lineas):
+    cursor.execute("INSERT INTO tickets (id, usuario_id, fecha, total) VALUES (?, ?, ?, ?)",
+                   (ticket_id, usuario_id, fecha, total))
+    cursor.executemany("""
+        INSERT INTO ventas (ticket_id, usuario_id, producto_id, cantidad, precio_unitario, fecha)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(ticket_id, usuario_id, l["producto_id"], l["cantidad"], l["precio"], fecha) for l in lineas])
+
+def aplicar_tickets(cursor, tickets):
+    """Registra, dentro de la transacción en curso, tickets que ya se cobraron en otro lado.
+
+    Es el camino del diario de ventas y de las cajas sin conexión: los tickets que
+    ya están en la base se omiten (`tickets.id` es único), y como la venta ya se
+    hizo, si el stock no alcanza se registra igual y el stock queda en cero.
+    Devuelve `(aplicados, productos, sin_stock)`: la cantidad de tickets nuevos,
+    los IDs de productos tocados y los IDs de los tickets que no tenían stock.
+    """
+    if not tickets:
+        return 0, set(), []
+    ids = [ticket["ticket_id"] for ticket in tickets]
+    cursor.execute(f"SELECT id FROM tickets WHERE id IN ({', '.join('?' * len(ids))})", ids)
+    existentes = {fila[0] for fila in cursor.fetchall()}
+    productos, sin_stock = set(), []
+    aplicados = 0
+    for ticket in tickets:
+        if ticket["ticket_id"] in existentes:
+            continue
+        lineas = ticket["lineas"]
+        cursor.execute("SAVEPOINT ticket")
+        cursor.executemany(SQL_DESCONTAR_STOCK, [(l["cantidad"], l["producto_id"], l["cantidad"]) for l in lineas])
+        if cursor.rowcount != len(lineas):
+            cursor.execute("ROLLBACK TO ticket")
+            cursor.executemany("UPDATE productos SET cantidad = MAX(cantidad - ?, 0) WHERE id = ?",
+                               [(l["cantidad"], l["producto_id"]) for l in lineas])
+            logger.warning("⚠️ Ticket %s registrado con stock insuficiente: revisar el inventario.", ticket['ticket_id'])
+            sin_stock.append(ticket["ticket_id"])
+        cursor.execute("RELEASE ticket")
+        _insertar_ticket(cursor, ticket["ticket_id"], ticket["usuario_id"], ticket["fecha"], ticket["total"], lineas)
+        existentes.add(ticket["ticket_id"])
+        aplicados += 1
+        productos.update(l["producto_id"] for l in lineas)
+    return aplicados, productos, sin_stock
+
+def registrar_venta(carrito, usuario_id, ticket_id=None, fecha=None):
+    """Registra el ticket completo en una sola transacción `BEGIN IMMEDIATE`.
+
+    Descuenta el stock con `UPDATE ... WHERE cantidad >= ?`, de modo que dos cajas
+    simultáneas nunca lo dejan negativo: si alguna línea no alcanza, se revierte
+    todo y se lanza `StockInsuficiente`. Los resúmenes de `core.reportes` se
+    actualizan en la misma transacción. Devuelve un diccionario con `ticket_id`,
+    `fecha`, `total` y `lineas`, o None si hubo un error de base de datos.
+    """
+    lineas = carrito.lineas()
+    if not lineas:
+        raise ValueError("El carrito está vacío.")
+    ticket_id = ticket_id or uuid.uuid4().hex
+    fecha = fecha or datetime.now().isoformat(sep=" ", timespec="seconds")
+    total = carrito.total()
+
+    conn = conectar_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.executemany(SQL_DESCONTAR_STOCK, [(l["cantidad"], l["producto_id"], l["cantidad"]) for l in lineas])
+        if cursor.rowcount != len(lineas):
+            error = _faltante(cursor, lineas)
+            conn.rollback()
+            logger.warning("⚠️ Venta rechazada: %s", error)
+            raise error
+        _insertar_ticket(cursor, ticket_id, usuario_id, fecha, total, lineas)
+        actualizar_resumenes(cursor)
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.error("❌ Error al registrar la venta %s: %s", ticket_id, e)
+        return None
+
+    for linea in lineas:
+        cache_catalogo.invalidar(linea["producto_id"])
+    logger.info("✅ Venta registrada - Ticket: %s, Líneas: %s, Total: %s", ticket_id, len(lineas), total)
+    return {"ticket_id": ticket_id, "fecha": fecha, "total": total, "lineas": lineas}
+
+def cobrar_ticket(carrito, usuario_id):
+    """Registra el ticket directo en la base o, con `DIARIO_VENTAS_ACTIVO`, a través del diario de ventas."""
+    if config.DIARIO_VENTAS_ACTIVO:
+        from core.diario import obtener_diario
+        return obtener_diario().registrar(carrito, usuario_id)
+    return registrar_venta(carrito, usuario_id)
+
+def sumar_stock(cursor, producto_id, diferencia):
+    """Suma `diferencia` (positiva o negativa) al stock sin dejarlo por debajo de cero.
+
+    Corre dentro de la transacción en curso y devuelve el nuevo stock. Lanza
+    `LookupError` si el producto no existe y `StockInsuficiente` si no alcanza.
+    """
+    fila = cursor.execute("UPDATE productos SET cantidad = cantidad + ? WHERE id = ? AND cantidad + ? >= 0 "
+                          "RETURNING cantidad", (diferencia, producto_id, diferencia)).fetchone()
+    if fila is None:
+        actual = cursor.execute("SELECT nombre, cantidad FROM productos WHERE id = ?", (producto_id,)).fetchone()
+        if actual is None:
+            raise LookupError(f"No existe el producto {producto_id}.")
+        raise StockInsuficiente(producto_id, actual[0], -diferencia, actual[1])
+    return fila[0]
+
+def ajustar_stock(producto_id, diferencia):
+    """Suma `diferencia` al stock de un producto (ingreso de mercadería, rotura, recuento...).
+
+    Devuelve el nuevo stock, o None si el producto no existe o hubo un error de
+    base de datos. Si restar deja el stock negativo lanza `StockInsuficiente`.
+    """
+    conn = conectar_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cantidad = sumar_stock(cursor, producto_id, diferencia)
+        conn.commit()
+    except (StockInsuficiente, LookupError) as e:
+        conn.rollback()
+        logger.warning("⚠️ No se ajustó el stock del producto %s: %s", producto_id, e)
+        if isinstance(e, StockInsuficiente):
+            raise
+        return None
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.error("❌ Error al ajustar el stock del producto %s: %s", producto_id, e)
+        return None
+    cache_catalogo.invalidar(producto_id)
+    logger.info("✅ Stock del producto %s ajustado en %+d: quedan %s.", producto_id, diferencia, cantidad)
+    return cantidad
+
+def obtener_ticket(ticket_id):
+    """Obtiene un ticket y sus líneas `(producto_id, nombre, cantidad, precio_unitario)`."""
+    try:
+        with conectar_db() as conn:
+            cursor = conn.cursor()
+            ticket = cursor.execute("SELECT id, usuario_id, fecha, total FROM tickets WHERE id = ?",
+                                    (ticket_id,)).fetchone()
+            if ticket is None:
+                return None
+            cursor.execute("""
+                SELECT v.producto_id, p.nombre, v.cantidad, v.precio_unitario
+                FROM ventas v LEFT JOIN productos p ON p.id = v.producto_id
+                WHERE v.ticket_id = ?
+                ORDER BY v.id
+            """, (ticket_id,))
+            return {"ticket_id": ticket[0], "usuario_id": ticket[1], "fecha": ticket[2],
+                    "total": ticket[3], "lineas": cursor.fetchall()}
+    except sqlite3.Error as e:
+        logger.error("❌ Error al obtener el ticket %s: %s", ticket_id, e)
+        return None
@@ -3,6 +3,8 @@ from PyQt5.QtWidgets import QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem
 from core.database import conectar_db, eliminar_usuario
 import logging
 
+logger = logging.getLogger(__name__)
+
 class AdminUsersDialog(QDialog):
     def __init__(self):
         super().__init__()
@@ -47,8 +49,8 @@ class AdminUsersDialog(QDialog):
         """
         username = self.table.item(row, 0).text()
         if eliminar_usuario(username):
-            logging.info(f"Usuario eliminado: {username}")
+            logger.info("Usuario eliminado: %s", username)
             self.table.removeRow(row)
         else:
-            logging.error(f"No se pudo eliminar al usuario: {username}")
+            logger.error("No se pudo eliminar al usuario: %s", username)
 # Compare this snippet from ui/main_window.py:
@@ -1,15 +1,19 @@
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QComboBox, QPushButton, QMessageBox
 from core.auth import registrar_usuario
+from gui.trabajadores import TareaCredenciales
 import logging
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QComboBox, QPushButton, QMessageBox
 from core.auth import registrar_usuario
 import logging
 
+logger = logging.getLogger(__name__)
+
 class AdminUsersDialog(QDialog):
     """Ventana de administración de usuarios."""
     
     def __init__(self):
         super().__init__()
+        self._tarea = None  # Registro en curso
         self.init_ui()
 
     def init_ui(self):
@@ -65,11 +69,21 @@ class AdminUsersDialog(QDialog):
             QMessageBox.warning(self, "Error", "Todos los campos son obligatorios.")
             return
 
-        mensaje = registrar_usuario(username, password, email, dni, rol)
+        # El hash de la contraseña se calcula fuera del hilo de la interfaz
+        self.btn_registrar.setEnabled(False)
+        self.btn_registrar.setText("Registrando...")
+        self._tarea = TareaCredenciales(registrar_usuario, username, password, email, dni, rol)
+        self._tarea.senales.terminado.connect(self._al_registrar)
+        self._tarea.senales.fallido.connect(lambda: self._al_registrar("No se pudo registrar el usuario."))
+        self._tarea.iniciar()
 
+    def _al_registrar(self, mensaje):
+        self._tarea = None
+        self.btn_registrar.setEnabled(True)
+        self.btn_registrar.setText("Registrar Usuario")
         if "exitosamente" in mensaje:
             QMessageBox.information(self, "Éxito", mensaje)
-            logging.info(f"✅ Usuario creado: {username} con rol {rol}")
+            logger.info("✅ Usuario creado: %s con rol %s", self.input_username.text().strip(), self.combo_roles.currentText())
             self.accept()
         else:
             QMessageBox.warning(self, "Error", mensaje)
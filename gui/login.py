@@ -1,15 +1,24 @@
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
-from core.auth import autenticar_usuario  
+from PyQt5.QtCore import Qt
+from utils import config
+if config.SERVIDOR_URL:  # Modo cliente: el servidor verifica la contraseña y entrega el token de la caja
+    from core.cliente import autenticar_usuario
+else:
+    from core.auth import autenticar_usuario
 from gui.register import RegistroDialog  
 from gui.recovery import RecuperarContrasenaDialog  
+from gui.trabajadores import TareaCredenciales
 import logging
 
+logger = logging.getLogger(__name__)
+
 class LoginDialog(QDialog):
     """Ventana de inicio de sesión con diseño optimizado."""
 
     def __init__(self):
         super().__init__()
         self.authenticated_user = None  # Guardar usuario autenticado
+        self._tarea = None  # Verificación de la contraseña en curso
         self.init_ui()
 
     def init_ui(self):
@@ -58,7 +67,7 @@ class LoginDialog(QDialog):
         layout.addWidget(self.forgot_password_button)
 
         self.setLayout(layout)
-        logging.info("✅ Ventana de inicio de sesión mostrada correctamente.")
+        logger.info("✅ Ventana de inicio de sesión mostrada correctamente.")
 
         # Conectar botones a sus funciones
         self.login_button.clicked.connect(self.login)
@@ -74,27 +83,53 @@ class LoginDialog(QDialog):
             QMessageBox.warning(self, "Error", "Debe ingresar usuario/email y contraseña.")
             return
 
-        logging.info(f"🔍 Intentando iniciar sesión con usuario/email: {entrada}")
+        logger.info("🔍 Intentando iniciar sesión con usuario/email: %s", entrada)
         
-        # 🔹 Pasamos la contraseña sin hashear (la comparación se hace en `auth.py`)
-        usuario = autenticar_usuario(entrada, password)  
-
+        # 🔹 El hash de la contraseña se verifica fuera del hilo de la interfaz
+        self._esperando(True)
+        self._tarea = TareaCredenciales(autenticar_usuario, entrada, password)
+        self._tarea.senales.terminado.connect(self._al_autenticar)
+        self._tarea.senales.fallido.connect(lambda: self._al_autenticar(None))
+        self._tarea.iniciar()
+
+    def _al_autenticar(self, usuario):
+        self._tarea = None
+        self._esperando(False)
         if usuario:
-            logging.info(f"✅ Inicio de sesión exitoso. Usuario: {usuario['username']}")
+            logger.info("✅ Inicio de sesión exitoso. Usuario: %s", usuario['username'])
             self.authenticated_user = usuario
             QMessageBox.information(self, "Éxito", f"Bienvenido {usuario['username']} ({usuario['rol']})")
             self.accept()
         else:
-            logging.warning("❌ Credenciales incorrectas.")
+            logger.warning("❌ Credenciales incorrectas.")
             QMessageBox.warning(self, "Error", "Usuario o contraseña incorrectos.")
 
+    def _esperando(self, activo):
+        """Bloquea los botones mientras se verifica la contraseña."""
+        for boton in (self.login_button, self.register_button, self.forgot_password_button):
+            boton.setEnabled(not activo)
+        self.login_button.setText("Verificando..." if activo else "Iniciar Sesión")
+        if activo:
+            self.setCursor(Qt.BusyCursor)
+        else:
+            self.unsetCursor()
+
     def open_register(self):
         """Abre la ventana de registro."""
+        if config.SERVIDOR_URL:
+            # Los usuarios viven en la base del servidor, que no expone altas
+            QMessageBox.information(self, "Modo cliente", "El registro no está disponible en modo cliente: "
+                                    "pida el alta al administrador del servidor.")
+            return
         self.registro_dialog = RegistroDialog()
         self.registro_dialog.exec_()
 
     def open_recovery(self):
         """Abre la ventana de recuperación de contraseña."""
+        if config.SERVIDOR_URL:
+            QMessageBox.information(self, "Modo cliente", "La recuperación de contraseña no está disponible en modo "
+                                    "cliente: pídala al administrador del servidor.")
+            return
         self.recuperar_contrasena_dialog = RecuperarContrasenaDialog()
         self.recuperar_contrasena_dialog.exec_()
 
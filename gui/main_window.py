@@ -1,9 +1,10 @@
-import pandas as pd
 from PyQt5.QtWidgets import QFileDialog, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton, QLabel, QAction, QMessageBox
 from PyQt5.QtCore import Qt
 import logging
 from gui.admin import AdminUsersDialog  # Asegurar que esta ruta es correcta
 
+logger = logging.getLogger(__name__)
+
 class MainWindow(QMainWindow):
     """Ventana principal mejorada con diseño tipo Excel e importación de archivos."""
 
@@ -108,16 +109,17 @@ class MainWindow(QMainWindow):
 
         if archivo:
             try:
-                logging.info(f"🔹 Importando archivo: {archivo}")
+                logger.info("🔹 Importando archivo: %s", archivo)
+                import pandas as pd  # Solo al importar: pandas demora el arranque
                 df = pd.read_excel(archivo)  # Leer archivo Excel
 
                 if df.empty:
-                    logging.warning("⚠️ El archivo Excel está vacío.")
+                    logger.warning("⚠️ El archivo Excel está vacío.")
                     QMessageBox.warning(self, "Advertencia", "El archivo Excel está vacío.")
                     return
 
                 if not all(isinstance(col, str) for col in df.columns):
-                    logging.warning("⚠️ El archivo Excel no tiene el formato correcto.")
+                    logger.warning("⚠️ El archivo Excel no tiene el formato correcto.")
                     QMessageBox.warning(self, "Advertencia", "El archivo Excel no tiene el formato correcto.")
                     return
 
@@ -131,22 +133,22 @@ class MainWindow(QMainWindow):
                         item = QTableWidgetItem(str(df.iloc[fila, columna]))
                         self.tabla.setItem(fila, columna, item)
 
-                logging.info("✅ Archivo importado exitosamente.")
+                logger.info("✅ Archivo importado exitosamente.")
                 QMessageBox.information(self, "Éxito", "Archivo importado exitosamente.")
 
             except Exception as e:
-                logging.error(f"❌ Error al importar el archivo: {e}")
+                logger.error("❌ Error al importar el archivo: %s", e)
                 QMessageBox.critical(self, "Error", f"No se pudo importar el archivo.\n{e}")
 
     # ✅ FUNCIONES DE BOTONES (Se implementarán en pasos siguientes)
     def agregar_producto(self):
-        logging.info("🔹 Agregar Producto (Función en desarrollo)")
+        logger.info("🔹 Agregar Producto (Función en desarrollo)")
 
     def eliminar_producto(self):
-        logging.info("🔹 Eliminar Producto (Función en desarrollo)")
+        logger.info("🔹 Eliminar Producto (Función en desarrollo)")
 
     def editar_producto(self):
-        logging.info("🔹 Editar Producto (Función en desarrollo)")
+        logger.info("🔹 Editar Producto (Función en desarrollo)")
 
     def gestionar_stock(self):
         """Función temporal para gestionar stock."""
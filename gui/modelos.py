@@ -0,0 +1,336 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+from core.cache import clave_nombre
+from core.database import COLUMNAS_PRODUCTO
+from utils import config
+
+if config.SERVIDOR_URL:
+    from core.cliente import buscar_productos, contar_productos, obtener_productos_pagina, obtener_productos_por_ids
+else:
+    from core.database import buscar_productos, contar_productos, obtener_productos_pagina, obtener_productos_por_ids
+
+class ModeloProductos(QAbstractTableModel):
+    """Modelo de tabla que carga los productos por páginas a medida que la vista los necesita.
+
+    Solo se guardan en memoria las filas ya mostradas; al ordenar o filtrar se
+    descarta lo cargado y se vuelve a pedir la primera página. Con una búsqueda
+    activa se muestran los mejores resultados del índice de texto completo.
+
+    Después de agregar, editar o borrar productos, `aplicar_cambios` corrige solo
+    esas filas: las inserta, mueve o quita según el orden y el filtro actuales,
+    sin volver a pedir las páginas ya cargadas.
+    """
+
+    ENCABEZADOS = ("ID", "Nombre", "Categoría", "Cantidad", "Precio")
+    CAMPOS = ("id", "nombre", "categoria", "cantidad", "precio")  # Campo de la fila que muestra cada columna
+    _POSICIONES = tuple(COLUMNAS_PRODUCTO.index(campo) for campo in CAMPOS)
+    COLUMNAS_EDITABLES = (1, 2, 3, 4)
+    CAMBIOS_SUELTOS = 20  # Con más cambios a la vez se reordena una sola vez en lugar de mover fila por fila
+
+    def __init__(self, tamano_pagina=200, limite_busqueda=500, parent=None):
+        super().__init__(parent)
+        self.tamano_pagina = tamano_pagina
+        self.limite_busqueda = limite_busqueda
+        self._filas = []
+        self._hay_mas = True
+        self._orden = "id"
+        self._descendente = False
+        self._filtro = None
+        self._busqueda = None
+        self._limite = None  # (id, valor de la columna de orden) de la última fila leída de la base
+
+    # --- Interfaz de QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._filas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ENCABEZADOS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        valor = self._filas[index.row()][self._POSICIONES[index.column()]]
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return str(valor) if role == Qt.DisplayRole else valor
+        if role == Qt.TextAlignmentRole and index.column() in (0, 3, 4):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def setData(self, index, valor, role=Qt.EditRole):
+        """Guarda en memoria la edición de una celda; se persiste con el botón Editar."""
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        tipo = (int, str, str, int, float)[index.column()]
+        try:
+            valor = tipo(valor)
+        except (TypeError, ValueError):
+            return False
+        fila = list(self._filas[index.row()])
+        fila[self._POSICIONES[index.column()]] = valor
+        self._filas[index.row()] = tuple(fila)
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def flags(self, index):
+        base = super().flags(index)
+        return base | Qt.ItemIsEditable if index.column() in self.COLUMNAS_EDITABLES else base
+
+    def headerData(self, seccion, orientacion, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientacion == Qt.Horizontal:
+            return self.ENCABEZADOS[seccion]
+        return super().headerData(seccion, orientacion, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._hay_mas
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._hay_mas:
+            return
+        # La página sigue a la última fila leída, no a la última en memoria: esa pudo haberse
+        # editado o borrado después
+        columna = COLUMNAS_PRODUCTO.index(self._orden)
+        pagina = obtener_productos_pagina(
+            after_id=self._limite[0] if self._limite else None,
+            limit=self.tamano_pagina,
+            orden=self._orden,
+            filtro=self._filtro,
+            descendente=self._descendente,
+            after_valor=self._limite[1] if self._limite else None,
+        )
+        self._hay_mas = len(pagina) == self.tamano_pagina
+        if pagina:
+            self._limite = (pagina[-1][0], pagina[-1][columna])
+            self.beginInsertRows(QModelIndex(), len(self._filas), len(self._filas) + len(pagina) - 1)
+            self._filas.extend(pagina)
+            self.endInsertRows()
+
+    def sort(self, columna, orden=Qt.AscendingOrder):
+        """Ordena en la base de datos y recarga desde la primera página."""
+        self._orden = self.CAMPOS[columna]
+        self._descendente = orden == Qt.DescendingOrder
+        if self._busqueda:
+            # Los resultados de búsqueda ya están completos en memoria
+            self.layoutAboutToBeChanged.emit()
+            posicion = self._POSICIONES[columna]
+            self._filas.sort(key=lambda fila: fila[posicion], reverse=self._descendente)
+            self.layoutChanged.emit()
+        else:
+            self.recargar()
+
+    # --- Operaciones propias ---
+
+    def recargar(self):
+        """Descarta las filas cargadas y vuelve a pedir la primera página."""
+        self.beginResetModel()
+        if self._busqueda:
+            self._filas = buscar_productos(self._busqueda, self.limite_busqueda)
+            self._hay_mas = False
+        else:
+            self._filas = []
+            self._hay_mas = True
+        self._limite = None
+        self.endResetModel()
+        self.fetchMore()
+
+    def filtrar(self, texto):
+        """Muestra solo los productos cuyo nombre contiene `texto`."""
+        self._filtro = texto.strip() or None
+        self._busqueda = None
+        self.recargar()
+
+    def buscar(self, texto):
+        """Muestra los productos que coinciden con `texto` en el índice de búsqueda."""
+        self._busqueda = texto.strip() or None
+        self._filtro = None
+        self.recargar()
+
+    def total(self):
+        """Cantidad total de productos que coinciden con el filtro actual."""
+        if self._busqueda:
+            return len(self._filas)
+        return contar_productos(self._filtro)
+
+    def producto(self, fila):
+        """Devuelve la tupla `(id, nombre, cantidad, precio, categoria)` de una fila."""
+        return self._filas[fila]
+
+    # --- Cambios puntuales ---
+
+    def _clave_de(self, id_producto, valor):
+        """Clave de orden igual a la de `obtener_productos_pagina` (desempata por ID)."""
+        if self._orden == "id":
+            return (True, id_producto, 0)
+        if self._orden == "nombre":
+            valor = clave_nombre(valor)
+        return (valor is not None, valor, id_producto)
+
+    def _clave(self, fila):
+        return self._clave_de(fila[0], fila[COLUMNAS_PRODUCTO.index(self._orden)])
+
+    def _antes(self, clave_a, clave_b):
+        return clave_a > clave_b if self._descendente else clave_a < clave_b
+
+    def _posicion(self, clave):
+        """Posición que le toca a `clave` entre las filas cargadas (búsqueda binaria)."""
+        bajo, alto = 0, len(self._filas)
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self._antes(self._clave(self._filas[medio]), clave):
+                bajo = medio + 1
+            else:
+                alto = medio
+        return bajo
+
+    def _indice_de(self, id_producto):
+        """Fila en la que se muestra el producto, o None si no está cargado."""
+        if self._orden == "id" and not self._busqueda:
+            fila = self._posicion(self._clave_de(id_producto, id_producto))
+            return fila if fila < len(self._filas) and self._filas[fila][0] == id_producto else None
+        return next((n for n, fila in enumerate(self._filas) if fila[0] == id_producto), None)
+
+    def _corresponde(self, fila):
+        """Si la fila debe verse ya: cumple el filtro y no queda después de lo leído de la base."""
+        if self._filtro and clave_nombre(self._filtro) not in clave_nombre(fila[1]):
+            return False
+        # Más allá del límite la traerá `fetchMore` cuando la vista llegue ahí
+        return not self._hay_mas or self._limite is None or not self._antes(self._clave_de(*self._limite),
+                                                                             self._clave(fila))
+
+    def _quitar(self, desde, hasta):
+        self.beginRemoveRows(QModelIndex(), desde, hasta)
+        del self._filas[desde:hasta + 1]
+        self.endRemoveRows()
+
+    def _insertar(self, posicion, filas):
+        self.beginInsertRows(QModelIndex(), posicion, posicion + len(filas) - 1)
+        self._filas[posicion:posicion] = filas
+        self.endInsertRows()
+
+    def _aplicar_fila(self, nueva):
+        """Pone una fila `(id, nombre, cantidad, precio, categoria)` donde corresponde."""
+        actual = self._indice_de(nueva[0])
+        if self._busqueda:
+            # Los resultados de una búsqueda no se completan ni se reordenan: solo se corrigen
+            if actual is not None:
+                self._filas[actual] = nueva
+                self.dataChanged.emit(self.index(actual, 0), self.index(actual, len(self.ENCABEZADOS) - 1))
+            return
+        if not self._corresponde(nueva):
+            if actual is not None:
+                self._quitar(actual, actual)
+            return
+        if actual is None:
+            self._insertar(self._posicion(self._clave(nueva)), [nueva])
+            return
+        anterior = self._filas.pop(actual)
+        destino = self._posicion(self._clave(nueva))
+        self._filas.insert(actual, anterior)
+        if destino != actual:
+            # `beginMoveRows` cuenta el destino antes de quitar la fila: al bajar es uno más
+            self.beginMoveRows(QModelIndex(), actual, actual, QModelIndex(), destino + (destino > actual))
+            del self._filas[actual]
+            self._filas.insert(destino, anterior)
+            self.endMoveRows()
+        self._filas[destino] = nueva
+        self.dataChanged.emit(self.index(destino, 0), self.index(destino, len(self.ENCABEZADOS) - 1))
+
+    def _aplicar_lote(self, nuevas, eliminados):
+        """Aplica muchos cambios juntos: el orden se suspende y las filas se reubican una sola vez."""
+        nuevas = {fila[0]: fila for fila in nuevas}
+        eliminados = set(eliminados)
+        quitar = [n for n, fila in enumerate(self._filas) if fila[0] in eliminados
+                  or (fila[0] in nuevas and not self._busqueda and not self._corresponde(nuevas[fila[0]]))]
+        # Se quitan de abajo hacia arriba, un rango contiguo por vez
+        while quitar:
+            hasta = desde = quitar.pop()
+            while quitar and quitar[-1] == desde - 1:
+                desde = quitar.pop()
+            self._quitar(desde, hasta)
+        cargados = set()
+        for n, fila in enumerate(self._filas):
+            if fila[0] in nuevas:
+                self._filas[n] = nuevas[fila[0]]
+                cargados.add(fila[0])
+        if cargados:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._filas) - 1, len(self.ENCABEZADOS) - 1))
+        if self._busqueda:
+            return
+        agregar = [fila for id_producto, fila in nuevas.items() if id_producto not in cargados
+                   and id_producto not in eliminados and self._corresponde(fila)]
+        if agregar:
+            self._insertar(len(self._filas), agregar)
+        self._reordenar()
+
+    def _reordenar(self):
+        """Ordena las filas cargadas conservando la selección (un solo cambio de disposición)."""
+        self.layoutAboutToBeChanged.emit()
+        persistentes = self.persistentIndexList()
+        ids = [self._filas[indice.row()][0] for indice in persistentes]
+        self._filas.sort(key=self._clave, reverse=self._descendente)
+        if persistentes:
+            posiciones = {fila[0]: n for n, fila in enumerate(self._filas)}
+            self.changePersistentIndexList(persistentes, [self.index(posiciones[id_producto], indice.column())
+                                                          for id_producto, indice in zip(ids, persistentes)])
+        self.layoutChanged.emit()
+
+    def aplicar_cambios(self, productos=(), eliminados=()):
+        """Refleja productos escritos o borrados sin volver a leer las demás filas.
+
+        `productos` son filas `(id, nombre, cantidad, precio, categoria)`, como las
+        que devuelven `agregar_producto` y `actualizar_producto`; `eliminados`, IDs.
+        Unos pocos cambios se ubican de a uno; muchos, en un solo reordenamiento.
+        """
+        nuevas = list(productos)
+        eliminados = list(eliminados)
+        if len(nuevas) + len(eliminados) > self.CAMBIOS_SUELTOS:
+            self._aplicar_lote(nuevas, eliminados)
+            return
+        for id_producto in eliminados:
+            fila = self._indice_de(id_producto)
+            if fila is not None:
+                self._quitar(fila, fila)
+        for fila in nuevas:
+            self._aplicar_fila(fila)
+
+    def refrescar_cargadas(self, nuevos_desde=None):
+        """Vuelve a leer solo las filas cargadas y, si se indica, los productos con ID mayor a `nuevos_desde`.
+
+        Es lo que necesita la vista después de una importación: consulta por ID
+        las filas que ya tiene en vez de volver a paginar desde el principio. Una
+        importación cambia cantidades y precios, así que si se ordena por una de
+        esas columnas las filas no cargadas pudieron entrar en lo visible: ahí se recarga.
+        """
+        if self._orden in ("cantidad", "precio") and not self._busqueda:
+            self.recargar()
+            return
+        cargados = {fila[0] for fila in self._filas}
+        filas = obtener_productos_por_ids(cargados)
+        eliminados = cargados - {fila[0] for fila in filas}
+        if nuevos_desde is not None and not self._busqueda:
+            filas.extend(self._leer_nuevos(nuevos_desde))
+        self._aplicar_lote(filas, eliminados)
+
+    def _leer_nuevos(self, nuevos_desde):
+        """Productos con ID mayor a `nuevos_desde` en el orden actual, solo hasta el límite de lo ya leído."""
+        if not self._hay_mas:
+            return obtener_productos_pagina(limit=-1, orden=self._orden, filtro=self._filtro,
+                                            descendente=self._descendente, nuevos_desde=nuevos_desde)
+        columna = COLUMNAS_PRODUCTO.index(self._orden)
+        limite = self._clave_de(*self._limite) if self._limite else None
+        nuevos, ultimo = [], None
+        while True:
+            pagina = obtener_productos_pagina(
+                after_id=ultimo[0] if ultimo else None,
+                limit=self.tamano_pagina,
+                orden=self._orden,
+                filtro=self._filtro,
+                descendente=self._descendente,
+                after_valor=ultimo[1] if ultimo else None,
+                nuevos_desde=nuevos_desde,
+            )
+            nuevos.extend(pagina)
+            # La página que pasa el límite es la última: lo que sigue lo traerá `fetchMore`
+            if (len(pagina) < self.tamano_pagina or limite is None
+                    or self._antes(limite, self._clave(pagina[-1]))):
+                return nuevos
+            ultimo = (pagina[-1][0], pagina[-1][columna])
@@ -1,11 +1,13 @@
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
 from core.auth import registrar_usuario
+from gui.trabajadores import TareaCredenciales
 
 class RegistroDialog(QDialog):
     """Ventana de registro de usuarios con validación y diseño optimizado."""
     
     def __init__(self):
         super().__init__()
+        self._tarea = None  # Registro en curso
         self.init_ui()
 
     def init_ui(self):
@@ -66,8 +68,18 @@ class RegistroDialog(QDialog):
             QMessageBox.warning(self, "Error", "Todos los campos son obligatorios.")
             return
 
-        mensaje = registrar_usuario(username, password, email, dni, "usuario")
+        # El hash de la contraseña se calcula fuera del hilo de la interfaz
+        self.register_button.setEnabled(False)
+        self.register_button.setText("Registrando...")
+        self._tarea = TareaCredenciales(registrar_usuario, username, password, email, dni, "usuario")
+        self._tarea.senales.terminado.connect(self._al_registrar)
+        self._tarea.senales.fallido.connect(lambda: self._al_registrar("No se pudo registrar el usuario."))
+        self._tarea.iniciar()
 
+    def _al_registrar(self, mensaje):
+        self._tarea = None
+        self.register_button.setEnabled(True)
+        self.register_button.setText("Registrarse")
         if "exitosamente" in mensaje:
             QMessageBox.information(self, "Éxito", mensaje)
             self.accept()
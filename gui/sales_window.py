@@ -1,15 +1,143 @@
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox,
+                             QSpinBox, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView)
+from core.ventas import Carrito, StockInsuficiente
+from utils import config
+import logging
+
+if config.SERVIDOR_URL:  # Modo cliente: catálogo y cobros a través del servidor (core.servidor)
+    from core.cliente import (obtener_producto_por_codigo, precargar_codigos, obtener_producto_por_id,
+                              obtener_producto_por_nombre, buscar_productos, precargar_catalogo, cobrar_ticket)
+else:
+    from core.codigos import obtener_producto_por_codigo, precargar_codigos
+    from core.database import obtener_producto_por_id, obtener_producto_por_nombre, buscar_productos, precargar_catalogo
+    from core.ventas import cobrar_ticket
+
+logger = logging.getLogger(__name__)
 
 class SalesWindow(QDialog):
     "ventana de ventas (para cajeros)"
-    def __init__(self):
+    def __init__(self, user_data=None):
         super().__init__()
+        self.user_data = user_data or {}
+        self.carrito = Carrito()
         self.init_ui()
+        # El escáner resuelve los códigos en memoria desde la primera lectura
+        precargar_catalogo()
+        precargar_codigos()
+
     def init_ui(self):
         self.setWindowTitle("Ventas-Cajero")
         self.setGeometry(150, 150, 600, 400) # Ajustar tamaño proporcional
 
-        layout=QVBoxLayout()
-        label=QLabel("en desarrollo")
-        layout.addWidget(label)
+        layout = QVBoxLayout()
+
+        # Ingreso de productos
+        ingreso_layout = QHBoxLayout()
+        self.input_producto = QLineEdit()
+        self.input_producto.setPlaceholderText("Código de barras, ID o nombre del producto")
+        self.input_cantidad = QSpinBox()
+        self.input_cantidad.setRange(1, 9999)
+        self.btn_agregar = QPushButton("Agregar")
+        ingreso_layout.addWidget(self.input_producto)
+        ingreso_layout.addWidget(self.input_cantidad)
+        ingreso_layout.addWidget(self.btn_agregar)
+        layout.addLayout(ingreso_layout)
+
+        # Líneas del ticket
+        self.tabla_ticket = QTableWidget(0, 5)
+        self.tabla_ticket.setHorizontalHeaderLabels(["ID", "Producto", "Cantidad", "Precio", "Subtotal"])
+        self.tabla_ticket.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.tabla_ticket.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tabla_ticket.setSelectionBehavior(QAbstractItemView.SelectRows)
+        layout.addWidget(self.tabla_ticket)
+
+        self.label_total = QLabel("Total: $0.00")
+        layout.addWidget(self.label_total)
+
+        botones_layout = QHBoxLayout()
+        self.btn_quitar = QPushButton("Quitar línea")
+        self.btn_cancelar = QPushButton("Cancelar venta")
+        self.btn_cobrar = QPushButton("Cobrar")
+        botones_layout.addWidget(self.btn_quitar)
+        botones_layout.addWidget(self.btn_cancelar)
+        botones_layout.addWidget(self.btn_cobrar)
+        layout.addLayout(botones_layout)
+
+        self.input_producto.returnPressed.connect(self.agregar_producto)
+        self.btn_agregar.clicked.connect(self.agregar_producto)
+        self.btn_quitar.clicked.connect(self.quitar_linea)
+        self.btn_cancelar.clicked.connect(self.cancelar_venta)
+        self.btn_cobrar.clicked.connect(self.cobrar)
+
         self.setLayout(layout)
+
+    def buscar_producto(self, texto):
+        """Busca un producto por código, ID, nombre exacto o, si no, el más relevante del buscador."""
+        producto = obtener_producto_por_codigo(texto)
+        if producto:
+            return producto
+        if texto.isdigit():
+            producto = obtener_producto_por_id(int(texto))
+            if producto:
+                return producto
+        producto = obtener_producto_por_nombre(texto)
+        if producto:
+            return producto
+        resultados = buscar_productos(texto, limit=1)
+        return resultados[0] if resultados else None
+
+    def agregar_producto(self):
+        """Agrega el producto ingresado al ticket."""
+        texto = self.input_producto.text().strip()
+        if not texto:
+            return
+        producto = self.buscar_producto(texto)
+        if producto is None:
+            QMessageBox.warning(self, "Error", f"No se encontró el producto '{texto}'.")
+            return
+        self.carrito.agregar(producto, self.input_cantidad.value())
+        self.input_producto.clear()
+        self.input_cantidad.setValue(1)
+        self.mostrar_ticket()
+
+    def quitar_linea(self):
+        """Quita del ticket la línea seleccionada."""
+        fila = self.tabla_ticket.currentRow()
+        if fila == -1:
+            QMessageBox.warning(self, "Error", "Seleccione una línea para quitar.")
+            return
+        self.carrito.quitar(int(self.tabla_ticket.item(fila, 0).text()))
+        self.mostrar_ticket()
+
+    def cancelar_venta(self):
+        """Descarta el ticket en curso."""
+        self.carrito.vaciar()
+        self.mostrar_ticket()
+
+    def mostrar_ticket(self):
+        """Muestra las líneas del carrito y el total."""
+        lineas = self.carrito.lineas()
+        self.tabla_ticket.setRowCount(len(lineas))
+        for i, linea in enumerate(lineas):
+            valores = (linea["producto_id"], linea["nombre"], linea["cantidad"],
+                       f"{linea['precio']:.2f}", f"{linea['cantidad'] * linea['precio']:.2f}")
+            for j, valor in enumerate(valores):
+                self.tabla_ticket.setItem(i, j, QTableWidgetItem(str(valor)))
+        self.label_total.setText(f"Total: ${self.carrito.total():.2f}")
+
+    def cobrar(self):
+        """Registra el ticket completo en la base de datos."""
+        if not len(self.carrito):
+            QMessageBox.warning(self, "Error", "El ticket no tiene productos.")
+            return
+        try:
+            ticket = cobrar_ticket(self.carrito, self.user_data.get("id"))
+        except StockInsuficiente as e:
+            QMessageBox.warning(self, "Stock insuficiente", str(e))
+            return
+        if ticket is None:
+            QMessageBox.warning(self, "Error", "No se pudo registrar la venta.")
+            return
+        logger.info("✅ Ticket %s cobrado por %s", ticket['ticket_id'], self.user_data.get('username'))
+        QMessageBox.information(self, "Venta registrada", f"Total cobrado: ${ticket['total']:.2f}")
+        self.cancelar_venta()
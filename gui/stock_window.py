@@ -1,9 +1,24 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton,
-                             QHBoxLayout, QMessageBox, QTableWidget, QTableWidgetItem,
-                             QHeaderView, QFileDialog, QDialog, QFormLayout, QSpinBox, QDoubleSpinBox, QComboBox)
-from core.database import obtener_productos, agregar_producto, actualizar_producto, eliminar_producto, importar_desde_excel
+                             QHBoxLayout, QMessageBox, QTableView, QAbstractItemView,
+                             QHeaderView, QFileDialog, QDialog, QFormLayout, QSpinBox, QDoubleSpinBox, QComboBox,
+                             QProgressDialog, QInputDialog)
+from PyQt5.QtCore import Qt, QTimer
+from core.codigos import agregar_codigo, obtener_producto_por_codigo
+from core.database import agregar_producto, actualizar_producto, eliminar_producto
+from core.ventas import StockInsuficiente
+from gui.modelos import ModeloProductos
+from core.exportacion import exportar_productos
+from gui.trabajadores import TrabajadorExportacion, TrabajadorImportacion
+from utils import config
 import logging
 
+if config.SERVIDOR_URL:  # Modo cliente: la tabla se lee del servidor y el stock se ajusta a través de él
+    from core.cliente import ajustar_stock
+else:
+    from core.ventas import ajustar_stock
+
+MENSAJE_MODO_CLIENTE = "No disponible en modo cliente: hágalo en el equipo del servidor."
+
 class StockWindow(QWidget):
     """Ventana para la gestión del stock de productos."""
 
@@ -25,57 +40,90 @@ class StockWindow(QWidget):
         self.campo_busqueda = QLineEdit()
         self.campo_busqueda.setPlaceholderText("Buscar producto...")
         layout.addWidget(self.campo_busqueda)
-        self.campo_busqueda.textChanged.connect(self.filtrar_productos)
+        # La búsqueda espera a que el usuario deje de escribir
+        self.temporizador_busqueda = QTimer(self)
+        self.temporizador_busqueda.setSingleShot(True)
+        self.temporizador_busqueda.setInterval(250)
+        self.temporizador_busqueda.timeout.connect(self.filtrar_productos)
+        self.campo_busqueda.textChanged.connect(self.temporizador_busqueda.start)
 
-        # Tabla de productos
-        self.tabla_stock = QTableWidget()
-        self.tabla_stock.setColumnCount(5)
-        self.tabla_stock.setHorizontalHeaderLabels(["ID", "Nombre", "Categoría", "Cantidad", "Precio"])
-        self.tabla_stock.setSortingEnabled(True)
+        # Tabla de productos (se carga por páginas al desplazarse)
+        self.modelo_stock = ModeloProductos(parent=self)
+        self.tabla_stock = QTableView()
+        self.tabla_stock.setModel(self.modelo_stock)
+        self.tabla_stock.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tabla_stock.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.tabla_stock.verticalHeader().setVisible(False)
         self.tabla_stock.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.tabla_stock.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
+        self.tabla_stock.setSortingEnabled(True)
         layout.addWidget(self.tabla_stock)
 
+        self.label_total = QLabel()
+        layout.addWidget(self.label_total)
+
         # Botones de acciones
         botones_layout = QHBoxLayout()
         self.btn_actualizar = QPushButton("Actualizar")
         self.btn_agregar = QPushButton("Agregar")
         self.btn_editar = QPushButton("Editar")
+        self.btn_ajustar = QPushButton("Ajustar stock")
         self.btn_eliminar = QPushButton("Eliminar")
-        self.btn_importar = QPushButton("Importar desde Excel")
+        self.btn_importar = QPushButton("Importar productos")
+        self.btn_exportar = QPushButton("Exportar productos")
 
         botones_layout.addWidget(self.btn_actualizar)
         botones_layout.addWidget(self.btn_agregar)
         botones_layout.addWidget(self.btn_editar)
+        botones_layout.addWidget(self.btn_ajustar)
         botones_layout.addWidget(self.btn_eliminar)
         botones_layout.addWidget(self.btn_importar)
+        botones_layout.addWidget(self.btn_exportar)
         layout.addLayout(botones_layout)
 
         # Conectar botones a funciones
         self.btn_actualizar.clicked.connect(self.cargar_stock)
         self.btn_agregar.clicked.connect(self.mostrar_dialogo_agregar_producto)
         self.btn_editar.clicked.connect(self.editar_producto)
+        self.btn_ajustar.clicked.connect(self.ajustar_stock)
         self.btn_eliminar.clicked.connect(self.eliminar_producto)
         self.btn_importar.clicked.connect(self.importar_desde_excel)
+        self.btn_exportar.clicked.connect(self.exportar_productos)
+
+        if config.SERVIDOR_URL:
+            # El servidor solo expone lecturas y ajustes de stock: el resto se hace en su equipo
+            self.tabla_stock.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            for boton in (self.btn_agregar, self.btn_editar, self.btn_eliminar, self.btn_importar, self.btn_exportar):
+                boton.setEnabled(False)
+                boton.setToolTip(MENSAJE_MODO_CLIENTE)
+            self.label.setText(f"Gestión de Stock (servidor {config.SERVIDOR_URL}: solo consulta y ajuste de stock)")
 
         self.setLayout(layout)
-        self.cargar_stock()
+        self.actualizar_total()
 
     def cargar_stock(self):
-        """Carga el stock de productos en la tabla."""
-        self.tabla_stock.setRowCount(0)
-        productos = obtener_productos() or []
-        for producto in productos:
-            fila = self.tabla_stock.rowCount()
-            self.tabla_stock.insertRow(fila)
-            for j, dato in enumerate(producto):
-                self.tabla_stock.setItem(fila, j, QTableWidgetItem(str(dato)))
+        """Recarga el stock desde la primera página de productos."""
+        self.modelo_stock.recargar()
+        self.actualizar_total()
+
+    def actualizar_total(self):
+        """Muestra cuántos productos coinciden con la búsqueda actual."""
+        total = self.modelo_stock.total()
+        if self.campo_busqueda.text().strip():
+            limite = self.modelo_stock.limite_busqueda
+            self.label_total.setText(f"Resultados: {total:,}" + (" (se muestran los más relevantes)" if total >= limite else ""))
+        else:
+            self.label_total.setText(f"Productos: {total:,}")
 
     def filtrar_productos(self):
-        """Filtra los productos en la tabla según el texto ingresado."""
-        texto = self.campo_busqueda.text().lower()
-        for fila in range(self.tabla_stock.rowCount()):
-            item = self.tabla_stock.item(fila, 1)
-            self.tabla_stock.setRowHidden(fila, texto not in item.text().lower())
+        """Busca los productos en el índice de texto completo según el texto ingresado."""
+        self.modelo_stock.buscar(self.campo_busqueda.text())
+        self.actualizar_total()
+
+    def producto_seleccionado(self):
+        """Devuelve la fila `(id, nombre, cantidad, precio, categoria)` seleccionada, o None."""
+        indice = self.tabla_stock.currentIndex()
+        return self.modelo_stock.producto(indice.row()) if indice.isValid() else None
 
     def mostrar_dialogo_agregar_producto(self):
         """Muestra un cuadro de diálogo para agregar un nuevo producto."""
@@ -84,6 +132,8 @@ class StockWindow(QWidget):
         layout = QFormLayout()
 
         input_nombre = QLineEdit()
+        input_codigo = QLineEdit()
+        input_codigo.setPlaceholderText("Opcional")
         input_categoria = QComboBox()
         input_categoria.addItems(["Comestibles", "Productos de limpieza", "Bebidas", "Frutas y verduras", "Golosinas", "Otros"])
         input_cantidad = QSpinBox()
@@ -93,64 +143,191 @@ class StockWindow(QWidget):
         input_precio.setDecimals(2)
 
         layout.addRow("Nombre:", input_nombre)
+        layout.addRow("Código de barras:", input_codigo)
         layout.addRow("Categoría:", input_categoria)
         layout.addRow("Cantidad:", input_cantidad)
         layout.addRow("Precio:", input_precio)
 
         btn_guardar = QPushButton("Guardar")
-        btn_guardar.clicked.connect(lambda: self.guardar_producto(dialogo, input_nombre.text(), input_categoria.currentText(), input_cantidad.value(), input_precio.value()))
+        btn_guardar.clicked.connect(lambda: self.guardar_producto(dialogo, input_nombre.text(), input_categoria.currentText(), input_cantidad.value(), input_precio.value(), input_codigo.text()))
         layout.addRow(btn_guardar)
 
         dialogo.setLayout(layout)
         dialogo.exec_()
 
-    def guardar_producto(self, dialogo, nombre, categoria, cantidad, precio):
+    def guardar_producto(self, dialogo, nombre, categoria, cantidad, precio, codigo=""):
         """Guarda un nuevo producto en la base de datos."""
         if not nombre.strip():
             QMessageBox.warning(self, "Error", "El nombre del producto no puede estar vacío.")
             return
-        if agregar_producto(nombre, categoria, cantidad, precio):
+        if codigo.strip() and obtener_producto_por_codigo(codigo):
+            QMessageBox.warning(self, "Error", f"El código {codigo.strip()} ya está asignado a otro producto.")
+            return
+        producto = agregar_producto(nombre, categoria, cantidad, precio)
+        if producto:
+            if codigo.strip():
+                agregar_codigo(producto[0], codigo)
             QMessageBox.information(self, "Éxito", "Producto agregado correctamente.")
-            self.cargar_stock()
+            self.modelo_stock.aplicar_cambios([producto])
+            self.actualizar_total()
             dialogo.accept()
         else:
             QMessageBox.warning(self, "Error", "No se pudo agregar el producto.")
 
     def editar_producto(self):
         """Edita el producto seleccionado."""
-        fila = self.tabla_stock.currentRow()
-        if fila == -1:
+        producto = self.producto_seleccionado()
+        if producto is None:
             QMessageBox.warning(self, "Error", "Seleccione un producto para editar.")
             return
-        id_producto = int(self.tabla_stock.item(fila, 0).text())
-        nombre = self.tabla_stock.item(fila, 1).text()
-        categoria = self.tabla_stock.item(fila, 2).text()
-        cantidad = int(self.tabla_stock.item(fila, 3).text())
-        precio = float(self.tabla_stock.item(fila, 4).text())
-        if actualizar_producto(id_producto, nombre, categoria, cantidad, precio):
+        id_producto, nombre, cantidad, precio, categoria = producto
+        actualizado = actualizar_producto(id_producto, nombre, categoria, cantidad, precio)
+        if actualizado:
             QMessageBox.information(self, "Éxito", "Producto actualizado correctamente.")
-            self.cargar_stock()
+            # Solo se corrige (y si cambió la columna de orden, se mueve) esa fila
+            self.modelo_stock.aplicar_cambios([actualizado])
+            self.actualizar_total()
         else:
             QMessageBox.warning(self, "Error", "No se pudo actualizar el producto.")
 
+    def ajustar_stock(self):
+        """Suma o resta unidades al stock del producto seleccionado (ingreso de mercadería, roturas...)."""
+        producto = self.producto_seleccionado()
+        if producto is None:
+            QMessageBox.warning(self, "Error", "Seleccione un producto para ajustar su stock.")
+            return
+        id_producto, nombre, cantidad, precio, categoria = producto
+        diferencia, aceptado = QInputDialog.getInt(
+            self, "Ajustar stock", f"Unidades a sumar a '{nombre}' (negativo para restar):", 0, -1_000_000, 1_000_000)
+        if not aceptado or diferencia == 0:
+            return
+        try:
+            nueva_cantidad = ajustar_stock(id_producto, diferencia)
+        except StockInsuficiente as e:
+            QMessageBox.warning(self, "Stock insuficiente", str(e))
+            return
+        if nueva_cantidad is None:
+            QMessageBox.warning(self, "Error", "No se pudo ajustar el stock.")
+            return
+        self.modelo_stock.aplicar_cambios([(id_producto, nombre, nueva_cantidad, precio, categoria)])
+
     def eliminar_producto(self):
         """Elimina el producto seleccionado."""
-        fila = self.tabla_stock.currentRow()
-        if fila == -1:
+        producto = self.producto_seleccionado()
+        if producto is None:
             QMessageBox.warning(self, "Error", "Seleccione un producto para eliminar.")
             return
-        id_producto = int(self.tabla_stock.item(fila, 0).text())
+        id_producto = producto[0]
         if eliminar_producto(id_producto):
             QMessageBox.information(self, "Éxito", "Producto eliminado correctamente.")
-            self.cargar_stock()
+            self.modelo_stock.aplicar_cambios(eliminados=[id_producto])
+            self.actualizar_total()
         else:
             QMessageBox.warning(self, "Error", "No se pudo eliminar el producto.")
 
     def importar_desde_excel(self):
-        """Importa productos desde un archivo Excel."""
-        archivo, _ = QFileDialog.getOpenFileName(self, "Seleccionar archivo", "", "Archivos de Excel (*.xlsx)")
-        if archivo and importar_desde_excel(archivo):
-            QMessageBox.information(self, "Éxito", "Productos importados correctamente.")
-            self.cargar_stock()
-        else:
-            QMessageBox.warning(self, "Error", "No se pudo importar los productos.")
+        """Importa productos desde un archivo Excel, CSV o Parquet en segundo plano."""
+        archivo, _ = QFileDialog.getOpenFileName(self, "Seleccionar archivo", "",
+                                                 "Listas de productos (*.xlsx *.xlsm *.csv *.parquet)")
+        if not archivo:
+            return
+
+        self.btn_importar.setEnabled(False)
+        self.dialogo_progreso = QProgressDialog("Importando productos...", "Cancelar", 0, 0, self)
+        self.dialogo_progreso.setWindowTitle("Importación")
+        self.dialogo_progreso.setWindowModality(Qt.WindowModal)
+        self.dialogo_progreso.setMinimumDuration(0)
+        self.dialogo_progreso.setAutoClose(False)
+        self.dialogo_progreso.setAutoReset(False)
+
+        self.trabajador_importacion = TrabajadorImportacion(archivo, parent=self)
+        self.trabajador_importacion.total_estimado.connect(self.dialogo_progreso.setMaximum)
+        self.trabajador_importacion.progreso.connect(self.actualizar_progreso_importacion)
+        self.trabajador_importacion.terminado.connect(self.importacion_terminada)
+        self.trabajador_importacion.cancelado.connect(self.importacion_cancelada)
+        self.trabajador_importacion.fallido.connect(self.importacion_fallida)
+        self.trabajador_importacion.finished.connect(self.finalizar_importacion)
+        self.dialogo_progreso.canceled.connect(self.trabajador_importacion.cancelar)
+        self.trabajador_importacion.start()
+
+    def actualizar_progreso_importacion(self, filas, filas_por_segundo, segundos_restantes):
+        """Muestra filas procesadas, velocidad y tiempo restante estimado."""
+        if self.dialogo_progreso.maximum():
+            self.dialogo_progreso.setValue(min(filas, self.dialogo_progreso.maximum()))
+        texto = f"Filas procesadas: {filas:,}  ({filas_por_segundo:,.0f} filas/s)"
+        if segundos_restantes >= 0:
+            texto += f"\nTiempo restante estimado: {int(segundos_restantes // 60)}:{int(segundos_restantes % 60):02d}"
+        self.dialogo_progreso.setLabelText(texto)
+
+    def importacion_terminada(self, resultado):
+        """Informa el resultado y actualiza de una vez las filas cargadas y los productos nuevos."""
+        self.dialogo_progreso.close()
+        mensaje = (f"Productos importados correctamente.\n\n"
+                   f"Nuevos: {resultado['insertados']}\n"
+                   f"Actualizados: {resultado['actualizados']}\n"
+                   f"Rechazados: {resultado['rechazados']}")
+        if resultado["reporte"]:
+            mensaje += f"\n\nDetalle de rechazos: {resultado['reporte']}"
+        QMessageBox.information(self, "Éxito", mensaje)
+        self.modelo_stock.refrescar_cargadas(nuevos_desde=resultado["ultimo_id_anterior"])
+        self.actualizar_total()
+
+    def importacion_cancelada(self):
+        """Informa que la importación se canceló y se revirtió."""
+        self.dialogo_progreso.close()
+        QMessageBox.information(self, "Importación cancelada", "La importación se canceló. No se guardaron cambios.")
+
+    def importacion_fallida(self):
+        """Informa que el archivo no se pudo importar."""
+        self.dialogo_progreso.close()
+        QMessageBox.warning(self, "Error", "No se pudo importar los productos.")
+
+    def finalizar_importacion(self):
+        """Libera el hilo de importación y vuelve a habilitar el botón."""
+        self.btn_importar.setEnabled(True)
+        self.trabajador_importacion.deleteLater()
+        self.trabajador_importacion = None
+
+    def exportar_productos(self):
+        """Exporta todos los productos a CSV o Excel en segundo plano."""
+        archivo, _ = QFileDialog.getSaveFileName(self, "Guardar productos", "productos.xlsx",
+                                                 "Excel (*.xlsx);;CSV (*.csv)")
+        if not archivo:
+            return
+
+        self.btn_exportar.setEnabled(False)
+        self.dialogo_exportacion = QProgressDialog("Exportando productos...", "Cancelar", 0, 0, self)
+        self.dialogo_exportacion.setWindowTitle("Exportación")
+        self.dialogo_exportacion.setWindowModality(Qt.WindowModal)
+        self.dialogo_exportacion.setMinimumDuration(0)
+        self.dialogo_exportacion.setAutoClose(False)
+        self.dialogo_exportacion.setAutoReset(False)
+
+        self.trabajador_exportacion = TrabajadorExportacion(exportar_productos, archivo, parent=self)
+        self.trabajador_exportacion.progreso.connect(
+            lambda filas, velocidad: self.dialogo_exportacion.setLabelText(
+                f"Filas exportadas: {filas:,}  ({velocidad:,.0f} filas/s)"))
+        self.trabajador_exportacion.terminado.connect(self.exportacion_terminada)
+        self.trabajador_exportacion.cancelado.connect(self.dialogo_exportacion.close)
+        self.trabajador_exportacion.fallido.connect(self.exportacion_fallida)
+        self.trabajador_exportacion.finished.connect(self.finalizar_exportacion)
+        self.dialogo_exportacion.canceled.connect(self.trabajador_exportacion.cancelar)
+        self.trabajador_exportacion.start()
+
+    def exportacion_terminada(self, resultado):
+        """Informa cuántas filas se exportaron y a qué velocidad."""
+        self.dialogo_exportacion.close()
+        QMessageBox.information(self, "Éxito", f"Se exportaron {resultado['filas']:,} productos en "
+                                f"{resultado['segundos']:.1f} s ({resultado['filas_por_segundo']:,.0f} filas/s).\n\n"
+                                f"Archivo: {resultado['archivo']}")
+
+    def exportacion_fallida(self):
+        """Informa que no se pudo escribir el archivo."""
+        self.dialogo_exportacion.close()
+        QMessageBox.warning(self, "Error", "No se pudo exportar los productos.")
+
+    def finalizar_exportacion(self):
+        """Libera el hilo de exportación y vuelve a habilitar el botón."""
+        self.btn_exportar.setEnabled(True)
+        self.trabajador_exportacion.deleteLater()
+        self.trabajador_exportacion = None
@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from PyQt5.QtCore import QObject, QRunnable, QThread, QThreadPool, pyqtSignal
+from core.conexion import liberar_conexion
+from core.exportacion import ExportacionCancelada
+from core.importacion import ImportacionCancelada, TAMANO_LOTE, estimar_filas, importar_productos
+
+logger = logging.getLogger(__name__)
+
+class TrabajadorImportacion(QThread):
+    """Ejecuta `importar_productos` fuera del hilo de la interfaz.
+
+    Emite `progreso(filas, filas_por_segundo, segundos_restantes)`; los segundos
+    restantes son -1 cuando no se puede estimar el tamaño del archivo.
+    """
+
+    progreso = pyqtSignal(int, float, float)
+    total_estimado = pyqtSignal(int)
+    terminado = pyqtSignal(dict)
+    cancelado = pyqtSignal()
+    fallido = pyqtSignal()
+
+    def __init__(self, archivo, tamano_lote=TAMANO_LOTE, parent=None):
+        super().__init__(parent)
+        self.archivo = archivo
+        self.tamano_lote = tamano_lote
+        self._cancelar = threading.Event()
+        self._total = None
+        self._inicio = None
+
+    def cancelar(self):
+        """Pide cancelar la importación; se hace efectiva antes del próximo lote."""
+        self._cancelar.set()
+
+    def run(self):
+        self._inicio = time.perf_counter()
+        self._total = estimar_filas(self.archivo)
+        if self._total:
+            self.total_estimado.emit(self._total)
+        try:
+            resultado = importar_productos(self.archivo, tamano_lote=self.tamano_lote,
+                                           progreso=self._informar_progreso, cancelado=self._cancelar.is_set)
+        except ImportacionCancelada:
+            self.cancelado.emit()
+            return
+        finally:
+            liberar_conexion()  # El hilo termina: no dejar su conexión abierta
+
+        if resultado:
+            self.terminado.emit(resultado)
+        else:
+            self.fallido.emit()
+
+    def _informar_progreso(self, filas):
+        transcurrido = max(time.perf_counter() - self._inicio, 1e-6)
+        velocidad = filas / transcurrido
+        restante = max(self._total - filas, 0) / velocidad if self._total and velocidad else -1.0
+        self.progreso.emit(filas, velocidad, restante)
+
+class TrabajadorExportacion(QThread):
+    """Ejecuta una función de `core.exportacion` fuera del hilo de la interfaz.
+
+    `exportar` es, por ejemplo, `exportar_productos` o `exportar_ventas`; `opciones`
+    son sus filtros. Emite `progreso(filas, filas_por_segundo)`.
+    """
+
+    progreso = pyqtSignal(int, float)
+    terminado = pyqtSignal(dict)
+    cancelado = pyqtSignal()
+    fallido = pyqtSignal()
+
+    def __init__(self, exportar, archivo, parent=None, **opciones):
+        super().__init__(parent)
+        self.exportar = exportar
+        self.archivo = archivo
+        self.opciones = opciones
+        self._cancelar = threading.Event()
+        self._inicio = None
+
+    def cancelar(self):
+        """Pide cancelar la exportación; se hace efectiva antes del próximo lote."""
+        self._cancelar.set()
+
+    def run(self):
+        self._inicio = time.perf_counter()
+        try:
+            resultado = self.exportar(self.archivo, progreso=self._informar_progreso,
+                                      cancelado=self._cancelar.is_set, **self.opciones)
+        except ExportacionCancelada:
+            self.cancelado.emit()
+            return
+        finally:
+            liberar_conexion()
+
+        if resultado:
+            self.terminado.emit(resultado)
+        else:
+            self.fallido.emit()
+
+    def _informar_progreso(self, filas):
+        self.progreso.emit(filas, filas / max(time.perf_counter() - self._inicio, 1e-6))
+
+class SenalesTarea(QObject):
+    terminado = pyqtSignal(object)
+    fallido = pyqtSignal()
+
+class TareaCredenciales(QRunnable):
+    """Ejecuta `funcion(*args)` (inicio de sesión o registro) en el pool de hilos de Qt.
+
+    El hash de la contraseña tarda cientos de milisegundos a propósito; fuera del
+    hilo de la interfaz la ventana sigue respondiendo. El resultado llega por
+    `senales.terminado(resultado)`. Quien la lanza debe conservar una referencia
+    a la tarea hasta recibir la señal.
+
+    Los hilos del pool conservan su conexión entre tareas (cerrarla en cada una
+    haría que la siguiente vuelva a abrirla y a configurar SQLite). Para eso no se
+    dejan vencer: Python no se entera de que un hilo de Qt terminó.
+    """
+
+    def __init__(self, funcion, *args):
+        super().__init__()
+        self.funcion = funcion
+        self.args = args
+        self.senales = SenalesTarea()
+
+    def iniciar(self):
+        pool = QThreadPool.globalInstance()
+        pool.setExpiryTimeout(-1)
+        pool.start(self)
+
+    def run(self):
+        try:
+            resultado = self.funcion(*self.args)
+        except Exception:
+            logger.exception("❌ Error en %s", self.funcion.__name__)
+            self.senales.fallido.emit()
+            return
+        self.senales.terminado.emit(resultado)
@@ -2,6 +2,8 @@ from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QTableWid
 from core.usuarios import obtener_usuarios, eliminar_usuario, actualizar_rol_usuario
 import logging
 
+logger = logging.getLogger(__name__)
+
 class UserManagementWindow(QWidget):
     """Ventana de administración de usuarios con optimización de interfaz."""
 
@@ -95,7 +97,7 @@ class UserManagementWindow(QWidget):
                 self.tabla_usuarios.setItem(i, 2, QTableWidgetItem(email))
                 self.tabla_usuarios.setItem(i, 3, QTableWidgetItem(rol))
             except ValueError as e:
-                logging.error(f"Error al cargar usuario en la tabla: {e}")
+                logger.error("Error al cargar usuario en la tabla: %s", e)
                 QMessageBox.warning(self, "Error", "Formato de datos incorrecto.")
 
     def eliminar_usuario(self):
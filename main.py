@@ -1,13 +1,25 @@
 import sys
-import logging
-from PyQt5.QtWidgets import QPushButton, QVBoxLayout, QWidget, QMainWindow, QApplication, QHBoxLayout
-from gui.login import LoginDialog
-from gui.stock_window import StockWindow  
-from gui.user_management_window import UserManagementWindow  
-from gui.sales_window import SalesWindow  
-from core.database import inicializar_db
-# Configuración de logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+from utils import perfil_arranque
+
+# `--profile-startup` mide cada importación y fase hasta mostrar el inicio de sesión, y sale
+if "--profile-startup" in sys.argv:
+    sys.argv.remove("--profile-startup")
+    perfil_arranque.activar()
+
+with perfil_arranque.fase("importaciones"):
+    import logging
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import (QPushButton, QVBoxLayout, QWidget, QMainWindow, QApplication, QHBoxLayout, QMessageBox,
+                                 QFileDialog)
+    from gui.login import LoginDialog
+    from core.database import inicializar_db
+    from core.diario import obtener_diario, recuperar_diario
+    from core.email_service import obtener_enviador
+    from core.sincronizacion import obtener_sincronizador
+    from utils import config
+    from utils.registro import configurar_registro
+
+logger = logging.getLogger("main")
 
 class MainWindow(QMainWindow):
     """Ventana principal según el rol del usuario."""
@@ -57,6 +69,17 @@ class MainWindow(QMainWindow):
         self.btn_stock.clicked.connect(self.abrir_stock_window)
         self.btn_users.clicked.connect(self.abrir_users_window)
 
+        if config.TRAZAS_SQL_ACTIVO:
+            # Solo con ORDICO_TRAZAS_SQL=1 hay tiempos por sentencia para guardar
+            self.btn_estadisticas_sql = QPushButton("Guardar estadísticas SQL")
+            self.btn_estadisticas_sql.setFixedSize(200, 40)
+            btn_layout_estadisticas = QHBoxLayout()
+            btn_layout_estadisticas.addStretch()
+            btn_layout_estadisticas.addWidget(self.btn_estadisticas_sql)
+            btn_layout_estadisticas.addStretch()
+            layout.addLayout(btn_layout_estadisticas)
+            self.btn_estadisticas_sql.clicked.connect(self.guardar_estadisticas_sql)
+
         self.central_widget.setLayout(layout)
 
     def show_cashier_interface(self):
@@ -85,51 +108,101 @@ class MainWindow(QMainWindow):
 
     def abrir_stock_window(self):
         """Abre la ventana de gestión de stock."""
+        from gui.stock_window import StockWindow  # Cada ventana se importa recién al abrirla
         self.stock_window = StockWindow()
         self.stock_window.show()
 
     def abrir_users_window(self):
         """Abre la ventana de gestión de usuarios."""
+        if config.SERVIDOR_URL:
+            # Los usuarios viven en la base del servidor, que no expone su gestión
+            QMessageBox.information(self, "Modo cliente", "La gestión de usuarios no está disponible en modo cliente: "
+                                    "hágala en el equipo del servidor.")
+            return
+        from gui.user_management_window import UserManagementWindow
         self.user_management_window = UserManagementWindow()
         self.user_management_window.show()
 
+    def guardar_estadisticas_sql(self):
+        """Guarda en JSON los tiempos acumulados por sentencia SQL de este proceso."""
+        from core.trazas import volcar_estadisticas
+        archivo, _ = QFileDialog.getSaveFileName(self, "Guardar estadísticas SQL", "estadisticas_sql.json",
+                                                 "Archivos JSON (*.json)")
+        if archivo:
+            if volcar_estadisticas(archivo):
+                QMessageBox.information(self, "Éxito", f"Estadísticas guardadas en {archivo}.")
+            else:
+                QMessageBox.warning(self, "Error", "No se pudieron guardar las estadísticas.")
+
     def abrir_sales_window(self):
         """Abre la ventana de ventas."""
-        self.sales_window = SalesWindow()
+        from gui.sales_window import SalesWindow
+        self.sales_window = SalesWindow(self.user_data)
         self.sales_window.show()
 
+def _terminar_perfil(login_dialog):
+    """Con `--profile-startup`: anota que el inicio de sesión ya se ve, imprime el informe y cierra."""
+    perfil_arranque.marcar("LoginDialog visible")
+    perfil_arranque.informe()
+    login_dialog.reject()
+
 def main():
     """Punto de entrada de la aplicación."""
+    fase = perfil_arranque.fase
     try:
-        logging.info("✅ Inicializando la base de datos...")
-        inicializar_db()  
-
-        logging.info("✅ Creando la aplicación PyQt5...")
-        app = QApplication.instance() or QApplication(sys.argv)  # ✅ Indentado correctamente
-
-        logging.info("✅ Mostrando ventana de inicio de sesión...")
-        login_dialog = LoginDialog()
+        if config.SERVIDOR_URL:
+            # Modo cliente: la base, el diario y los correos son del servidor
+            logger.info("✅ Modo cliente: usando el servidor %s", config.SERVIDOR_URL)
+        else:
+            logger.info("✅ Inicializando la base de datos...")
+            with fase("inicializar_db"):
+                inicializar_db()
+            # Tickets que quedaron en el diario de ventas si el programa se cerró antes de volcarlos
+            with fase("diario de ventas"):
+                if config.DIARIO_VENTAS_ACTIVO:
+                    obtener_diario()
+                else:
+                    recuperar_diario()
+            # Correos encolados (incluidos los que quedaron de la sesión anterior) se envían en segundo plano
+            with fase("enviador de correos"):
+                obtener_enviador()
+            # Caja sin conexión: vende sobre su réplica y sincroniza con la central en segundo plano
+            if config.SINC_CENTRAL:
+                with fase("sincronizador"):
+                    obtener_sincronizador()
+
+        logger.info("✅ Creando la aplicación PyQt5...")
+        with fase("QApplication"):
+            app = QApplication.instance() or QApplication(sys.argv)  # ✅ Indentado correctamente
+
+        logger.info("✅ Mostrando ventana de inicio de sesión...")
+        with fase("LoginDialog"):
+            login_dialog = LoginDialog()
+        if perfil_arranque.activo():
+            # El temporizador corre en cuanto `exec_()` muestra el diálogo y entra al bucle de eventos
+            QTimer.singleShot(0, lambda: _terminar_perfil(login_dialog))
 
         if login_dialog.exec_():  
             user_data = login_dialog.get_authenticated_user()  
 
             if not user_data:
-                logging.error("❌ No se obtuvo información del usuario autenticado. Saliendo del programa.")
+                logger.error("❌ No se obtuvo información del usuario autenticado. Saliendo del programa.")
                 sys.exit(1)
 
-            logging.info(f"✅ Usuario autenticado: {user_data}")
+            logger.info("✅ Usuario autenticado: %s", user_data)
             main_window = MainWindow(user_data)  
             main_window.show()
             sys.exit(app.exec_())  
         else:
-            logging.info("❌ El usuario cerró la ventana de login. Saliendo del programa.")
+            logger.info("❌ El usuario cerró la ventana de login. Saliendo del programa.")
             sys.exit(0)
 
     except Exception as e:
-        logging.error(f"❌ Error crítico en la aplicación: {e}", exc_info=True)
+        logger.error("❌ Error crítico en la aplicación: %s", e, exc_info=True)
         print("❌ Ocurrió un error inesperado. Revisa el archivo de logs.")
         sys.exit(1)
 
 if __name__ == "__main__":
-    logging.info("🚀 Iniciando aplicación...")
+    configurar_registro()
+    logger.info("🚀 Iniciando aplicación...")
     main()
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import uuid
+
+from benchmarks.generador import generar
+from core import conexion
+from core.servidor import EscritorAgrupado, _cobrar, _entero
+
+class EscritorAgrupadoTest(unittest.IsolatedAsyncioTestCase):
+    """Una escritura que falla de forma inesperada no deja al escritor trabado ni la base bloqueada."""
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.ruta = os.path.join(self.directorio, "servidor.db")
+        generar(self.ruta, productos=20, usuarios=2, ventas=0, iteraciones=1_000)
+        conexion.configurar_ruta_db(self.ruta)
+
+    def tearDown(self):
+        conexion.cerrar_conexiones()
+        shutil.rmtree(self.directorio)
+
+    def test_entero_fuera_de_rango(self):
+        with self.assertRaises(ValueError):
+            _entero(10 ** 20, "cantidad")
+        with self.assertRaises(ValueError):
+            _entero(-10 ** 20, "diferencia", minimo=None)
+        self.assertEqual(_entero(2 ** 63 - 1, "cantidad"), 2 ** 63 - 1)
+
+    async def test_error_inesperado_no_detiene_al_escritor(self):
+        escritor = EscritorAgrupado().iniciar()
+        # Sin pasar por `_entero`, SQLite no puede guardar la cantidad: OverflowError
+        with self.assertRaises(OverflowError):
+            await asyncio.wait_for(escritor.escribir(_cobrar, [(1, 10 ** 20)], 1), 5)
+        ticket = await asyncio.wait_for(escritor.escribir(_cobrar, [(1, 1)], 1), 5)
+        self.assertEqual(ticket["lineas"][0]["cantidad"], 1)
+        await asyncio.wait_for(escritor.detener(), 5)
+
+        # El bloqueo de escritura quedó libre y solo se registró el ticket válido
+        with sqlite3.connect(self.ruta, timeout=0) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0], 1)
+            conn.rollback()
+
+    async def test_reintento_de_un_cobro_no_lo_repite(self):
+        escritor = EscritorAgrupado().iniciar()
+        with sqlite3.connect(self.ruta) as conn:
+            stock_inicial = conn.execute("SELECT cantidad FROM productos WHERE id = 1").fetchone()[0]
+        ticket_id = uuid.uuid4().hex
+        primero = await asyncio.wait_for(escritor.escribir(_cobrar, [(1, 2)], 1, ticket_id), 5)
+        reintento = await asyncio.wait_for(escritor.escribir(_cobrar, [(1, 2)], 1, ticket_id), 5)
+        with self.assertRaises(ValueError):  # El ID de un ticket ajeno no se puede reusar
+            await asyncio.wait_for(escritor.escribir(_cobrar, [(1, 2)], 2, ticket_id), 5)
+        await asyncio.wait_for(escritor.detener(), 5)
+
+        self.assertEqual(primero, reintento)
+        with sqlite3.connect(self.ruta) as conn:
+            self.assertEqual(conn.execute("SELECT cantidad FROM productos WHERE id = 1").fetchone()[0], stock_inicial - 2)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM ventas WHERE ticket_id = ?", (ticket_id,)).fetchone()[0], 1)
+
+if __name__ == "__main__":
+    unittest.main()
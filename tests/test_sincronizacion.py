@@ -0,0 +1,74 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from contextlib import closing
+
+from benchmarks.generador import generar
+from core import conexion
+from core.database import inicializar_db, obtener_producto_por_id
+from core.sincronizacion import sincronizar
+from core.ventas import Carrito, cobrar_ticket
+from utils import config
+
+class VentaSinConexionTest(unittest.TestCase):
+    """Una caja que arranca sin central vende, y la primera sincronización sube esa venta."""
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.central = os.path.join(self.directorio, "central.db")
+        self.caja = os.path.join(self.directorio, "caja.db")
+        generar(self.central, productos=50, usuarios=2, ventas=0, iteraciones=1_000)
+        conexion.configurar_ruta_db(self.central)
+        inicializar_db()
+        conexion.cerrar_conexiones()
+        shutil.copy(self.central, self.caja)  # Caja preparada con una copia de la central
+        self.sinc_central_anterior = config.SINC_CENTRAL
+        config.SINC_CENTRAL = os.path.join(self.directorio, "central_inalcanzable.db")
+
+    def tearDown(self):
+        config.SINC_CENTRAL = self.sinc_central_anterior
+        conexion.cerrar_conexiones()
+        shutil.rmtree(self.directorio)
+
+    def _stock_central(self, id_producto):
+        with closing(sqlite3.connect(self.central)) as conn:
+            return conn.execute("SELECT cantidad FROM productos WHERE id = ?", (id_producto,)).fetchone()[0]
+
+    def test_vender_sin_conexion_y_primera_sincronizacion(self):
+        conexion.configurar_ruta_db(self.caja)
+        inicializar_db()
+        self.assertIsNone(sincronizar(config.SINC_CENTRAL))  # La central no está disponible
+
+        producto = obtener_producto_por_id(1)
+        stock_inicial = self._stock_central(1)
+        carrito = Carrito()
+        carrito.agregar(producto, 3)
+        ticket = cobrar_ticket(carrito, 1)
+        self.assertIsNotNone(ticket)
+
+        resultado = sincronizar(self.central)
+        self.assertEqual(resultado["tickets_enviados"], 1)
+        self.assertTrue(resultado["copia_completa"])
+        self.assertEqual(self._stock_central(1), stock_inicial - 3)
+        self.assertEqual(obtener_producto_por_id(1)[2], stock_inicial - 3)
+        with closing(sqlite3.connect(self.central)) as conn:
+            self.assertIsNotNone(conn.execute("SELECT 1 FROM tickets WHERE id = ?", (ticket["ticket_id"],)).fetchone())
+            # La central (en una carpeta de red) quedó con el journal clásico, sin memoria compartida
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+
+    def test_central_abierta_en_wal_no_se_sincroniza(self):
+        conexion.configurar_ruta_db(self.caja)
+        inicializar_db()
+        otra = sqlite3.connect(self.central)
+        try:
+            otra.execute("PRAGMA journal_mode = WAL")
+            otra.execute("SELECT COUNT(*) FROM productos").fetchone()
+            self.assertIsNone(sincronizar(self.central))
+        finally:
+            otra.close()
+        self.assertIsNotNone(sincronizar(self.central))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,18 +1,93 @@
 import os
-from dotenv import load_dotenv
 
-# Cargar variables de entorno desde un archivo .env (opcional)
-load_dotenv()
+def _buscar_dotenv(directorio):
+    """Busca un `.env` desde `directorio` hacia arriba, como `find_dotenv()`."""
+    while True:
+        ruta = os.path.join(directorio, ".env")
+        if os.path.isfile(ruta):
+            return ruta
+        padre = os.path.dirname(directorio)
+        if padre == directorio:
+            return None
+        directorio = padre
+
+# Cargar variables de entorno desde un archivo .env (opcional); python-dotenv solo se importa si hay uno
+_DOTENV = _buscar_dotenv(os.path.dirname(os.path.abspath(__file__)))
+if _DOTENV:
+    from dotenv import load_dotenv
+    load_dotenv(_DOTENV)
 
 # Configuración de la base de datos
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # Obtiene el directorio actual
-DB_PATH = "ordico.db"
+DB_PATH = os.getenv("ORDICO_DB_PATH", "ordico.db")
+DB_MAX_CONEXIONES = 8  # Conexiones persistentes simultáneas antes de avisar
+DB_INTERVALO_VERIFICACION = 30  # Segundos entre verificaciones de salud de una conexión
+CACHE_CATALOGO_CAPACIDAD = 50000  # Productos que se mantienen en la caché en memoria
+CACHE_INTERVALO_VERIFICACION = 0.2  # Segundos entre controles de escrituras de otras terminales
+
+# Trazas de SQL: mide cada sentencia y anota las lentas con su plan de ejecución (desactivado por defecto)
+TRAZAS_SQL_ACTIVO = os.getenv("ORDICO_TRAZAS_SQL", "0") == "1"
+TRAZAS_SQL_UMBRAL_LENTO = float(os.getenv("ORDICO_TRAZAS_SQL_UMBRAL", "0.1"))  # Segundos para considerar lenta una sentencia
+TRAZAS_SQL_ARCHIVO_LENTO = os.getenv("ORDICO_TRAZAS_SQL_ARCHIVO", "ordico_sql_lento.log")
+TRAZAS_SQL_RECIENTES = 500  # Últimas sentencias que se conservan para inspección
+
+# Diario de ventas: la caja anota el ticket en un archivo y un hilo lo vuelca a la base por lotes
+DIARIO_VENTAS_ACTIVO = os.getenv("ORDICO_DIARIO_VENTAS", "0") == "1"
+DIARIO_VENTAS_RUTA = os.getenv("ORDICO_DIARIO_VENTAS_RUTA", "ordico_ventas.diario")
+DIARIO_INTERVALO_VOLCADO = 0.05  # Segundos que el volcador espera para juntar tickets
+DIARIO_LOTE_MAXIMO = 500  # Tickets por transacción de volcado
+DIARIO_FSYNC = True  # fsync del diario en cada ticket (desactivar solo para pruebas)
+DIARIO_ESPERA_MAXIMA = 30.0  # Espera máxima entre reintentos si el volcado sigue fallando
+
+# Hash de contraseñas (PBKDF2-SHA256). Subir las iteraciones actualiza cada hash en el próximo inicio de sesión
+HASH_ITERACIONES = int(os.getenv("ORDICO_HASH_ITERACIONES", "1000000"))
+HASH_LARGO_SAL = 16
+HASH_HILOS = os.cpu_count() or 1  # Hilos para hashear contraseñas en altas masivas
+AUTH_TTL_INEXISTENTES = 5.0  # Segundos que se recuerda que un usuario no existe
+AUTH_INEXISTENTES_MAXIMO = 10000  # Entradas de esa caché antes de podarla
+
+# Registro (logging): nivel general, archivo JSON y niveles por módulo ("core.trazas=DEBUG,core.importacion=WARNING")
+LOG_NIVEL = os.getenv("ORDICO_LOG_NIVEL", "INFO").upper()
+LOG_ARCHIVO = os.getenv("ORDICO_LOG_ARCHIVO", "ordico.log")
+LOG_NIVELES_MODULO = os.getenv("ORDICO_LOG_NIVELES", "")
 
 # Configuración del correo electrónico
-SMTP_SERVER = "smtp.gmail.com"
-SMTP_PORT = 587
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_TLS = os.getenv("SMTP_TLS", "starttls")  # starttls, ssl o ninguno (p. ej. un servidor local de pruebas)
+SMTP_TIMEOUT = 30  # Segundos de espera de cada operación SMTP
 EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS", "tu_correo@gmail.com")  # Reemplaza con tu correo
-EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD", "tu_contraseña_de_aplicación")  # Usa una contraseña de aplicación de Gmail
+EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD", "tu_contraseña_de_aplicación")  # Usa una contraseña de aplicación de Gmail; vacía = sin login
+
+# Bandeja de salida: los correos se guardan en la base y un hilo los envía reutilizando la conexión SMTP
+CORREO_LOTE = 100  # Correos por tanda
+CORREO_INTERVALO = 5.0  # Segundos entre revisiones de la bandeja cuando no hay avisos
+CORREO_MAX_INTENTOS = 5  # Intentos antes de marcar un correo como fallido
+CORREO_ESPERA_REINTENTO = 30.0  # Espera antes del primer reintento; se duplica en cada uno
+CORREO_ESPERA_MAXIMA = 3600.0
+CORREO_INACTIVIDAD = 60.0  # Segundos sin envíos tras los que se cierra la conexión SMTP
+
+# Servidor JSON opcional (core.servidor): las cajas comparten un solo proceso con la base
+SERVIDOR_HOST = os.getenv("ORDICO_SERVIDOR_HOST", "127.0.0.1")
+SERVIDOR_PUERTO = int(os.getenv("ORDICO_SERVIDOR_PUERTO", "8765"))
+SERVIDOR_LECTORES = 4  # Hilos (y conexiones) de lectura
+SERVIDOR_HILOS_HASH = 2  # Hilos para verificar contraseñas, aparte de los lectores
+SERVIDOR_LOTE_ESCRITURAS = 256  # Escrituras que comparten una transacción
+SERVIDOR_TTL_SESION = 12 * 3600  # Segundos de validez del token de una caja
+SERVIDOR_INACTIVIDAD = 30.0  # Segundos sin pedidos tras los que se cierra una conexión
+SERVIDOR_MAX_CUERPO = 1 << 20  # Bytes máximos del cuerpo de un pedido
+SERVIDOR_MAX_PAGINA = 5000  # Filas máximas de una página de `GET /productos/pagina`
+# Modo cliente: con una URL (p. ej. http://192.168.0.10:8765) la caja usa el servidor en vez de la base local
+SERVIDOR_URL = os.getenv("ORDICO_SERVIDOR_URL", "")
+SERVIDOR_TIMEOUT_CLIENTE = 10.0
+
+# Caja sin conexión (core.sincronizacion): réplica local del catálogo sincronizada con una base central
+# Ruta de la base central (p. ej. en una carpeta compartida, que se abre sin WAL); vacía = no sincronizar
+SINC_CENTRAL = os.getenv("ORDICO_SINC_CENTRAL", "")
+SINC_INTERVALO = 30.0  # Segundos entre sincronizaciones
+SINC_LOTE = 500  # Tickets o cambios del catálogo por transacción
+SINC_ESPERA_MAXIMA = 600.0  # Espera máxima entre reintentos si la central no responde
+SINC_CAMBIOS_CONSERVADOS = 1_000_000  # Cambios del catálogo que guarda la central; una caja más atrasada copia todo
 
 # Otras configuraciones generales
 APP_NAME = "ORDICO"
@@ -0,0 +1,83 @@
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+_importar_original = builtins.__import__
+_activo = False
+_inicio = 0.0
+_importaciones = {}  # modulo: [acumulado, propio] en segundos
+_pila = []  # Tiempo de las importaciones hijas de cada importación en curso
+_fases = []  # (nombre, duración, segundos desde el inicio al terminar)
+
+def activo():
+    return _activo
+
+def activar():
+    """Empieza a medir cada importación nueva y las fases marcadas con `fase()`."""
+    global _activo, _inicio
+    if _activo:
+        return
+    _activo = True
+    _inicio = time.perf_counter()
+    builtins.__import__ = _importar
+
+def desactivar():
+    global _activo
+    _activo = False
+    builtins.__import__ = _importar_original
+
+def _importar(nombre, globals=None, locals=None, fromlist=(), level=0):
+    # Solo interesan las importaciones del hilo principal que cargan módulos nuevos
+    if threading.current_thread() is not threading.main_thread():
+        return _importar_original(nombre, globals, locals, fromlist, level)
+    cargados = len(sys.modules)
+    _pila.append(0.0)
+    inicio = time.perf_counter()
+    try:
+        return _importar_original(nombre, globals, locals, fromlist, level)
+    finally:
+        acumulado = time.perf_counter() - inicio
+        hijas = _pila.pop()
+        if _pila:
+            _pila[-1] += acumulado
+        if len(sys.modules) != cargados:
+            if level and globals and globals.get("__package__"):
+                paquete = globals["__package__"].rsplit(".", level - 1)[0]
+                nombre = f"{paquete}.{nombre}" if nombre else paquete
+            tiempos = _importaciones.setdefault(nombre, [0.0, 0.0])
+            tiempos[0] += acumulado
+            tiempos[1] += acumulado - hijas
+
+@contextmanager
+def fase(nombre):
+    """Mide el bloque como una fase del arranque; no hace nada si el perfil no está activo."""
+    if not _activo:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fin = time.perf_counter()
+        _fases.append((nombre, fin - inicio, fin - _inicio))
+
+def marcar(nombre):
+    """Anota un instante del arranque (una fase de duración cero)."""
+    if _activo:
+        _fases.append((nombre, 0.0, time.perf_counter() - _inicio))
+
+def informe(cantidad=25, salida=None):
+    """Imprime las fases y las `cantidad` importaciones más lentas (tiempo acumulado y propio)."""
+    salida = salida or sys.stdout
+    total = time.perf_counter() - _inicio
+    print(f"Perfil de arranque: {total * 1000:,.1f} ms desde que se activó el perfil", file=salida)
+    print("\nFases                                   duración     desde el inicio", file=salida)
+    for nombre, duracion, desde_inicio in _fases:
+        print(f"  {nombre:<36} {duracion * 1000:>9,.1f} ms {desde_inicio * 1000:>12,.1f} ms", file=salida)
+    lentas = sorted(_importaciones.items(), key=lambda item: item[1][0], reverse=True)[:cantidad]
+    print(f"\nImportaciones más lentas ({len(_importaciones)} módulos)  acumulado       propio", file=salida)
+    for modulo, (acumulado, propio) in lentas:
+        print(f"  {modulo:<36} {acumulado * 1000:>9,.1f} ms {propio * 1000:>9,.1f} ms", file=salida)
+    salida.flush()
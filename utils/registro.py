@@ -0,0 +1,113 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from datetime import datetime
+from utils import config
+
+FORMATO_CONSOLA = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Atributos que todo LogRecord trae; el resto llegó por `extra=` y se agrega al JSON
+_ATRIBUTOS_ESTANDAR = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+class FormateadorJSON(logging.Formatter):
+    """Una línea JSON por registro: fecha, nivel, módulo, hilo, mensaje y los campos de `extra=`."""
+
+    def format(self, record):
+        datos = {
+            "fecha": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "modulo": record.name,
+            "hilo": record.threadName,
+            "mensaje": record.getMessage(),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_ESTANDAR:
+                datos[clave] = valor
+        if record.exc_info:
+            datos["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+class ManejadorCola(logging.handlers.QueueHandler):
+    """Encola el registro tal cual, sin formatearlo en el hilo que lo emite.
+
+    `QueueHandler.prepare()` arma el mensaje antes de encolar, que es justo el
+    costo que se quiere sacar de la caja y de las importaciones. Como la cola no
+    sale del proceso, alcanza con encolar el registro: el hilo escucha hace el
+    `%` de los argumentos, el JSON y la escritura en disco.
+    """
+
+    def prepare(self, record):
+        return record
+
+_escuchas = []
+_lock = threading.Lock()
+_configurado = False
+
+def en_cola(logger, *manejadores):
+    """Conecta `logger` a `manejadores` a través de una cola atendida por un hilo propio."""
+    cola = queue.SimpleQueue()
+    escucha = logging.handlers.QueueListener(cola, *manejadores, respect_handler_level=True)
+    escucha.start()
+    logger.addHandler(ManejadorCola(cola))
+    with _lock:
+        if not _escuchas:
+            atexit.register(detener_registro)
+        _escuchas.append((logger, escucha))
+    return escucha
+
+def niveles_por_modulo(texto):
+    """Interpreta `"core.database=DEBUG,core.trazas=WARNING"` como `{modulo: nivel}`."""
+    niveles = {}
+    for par in filter(None, (p.strip() for p in texto.split(","))):
+        modulo, _, nivel = par.partition("=")
+        niveles[modulo.strip()] = nivel.strip().upper()
+    return niveles
+
+def configurar_registro(nivel=config.LOG_NIVEL, archivo=config.LOG_ARCHIVO, niveles=config.LOG_NIVELES_MODULO,
+                        consola=True):
+    """Configura el registro de la aplicación una sola vez.
+
+    Los mensajes van por cola a la consola (texto legible) y a `archivo` (una
+    línea JSON por registro). `niveles` ajusta el nivel de módulos puntuales,
+    como `{"core.trazas": "DEBUG"}` o el texto de `ORDICO_LOG_NIVELES`.
+    """
+    global _configurado
+    with _lock:
+        if _configurado:
+            return
+        _configurado = True
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel)
+    if isinstance(niveles, str):
+        niveles = niveles_por_modulo(niveles)
+    for modulo, nivel_modulo in (niveles or {}).items():
+        logging.getLogger(modulo).setLevel(nivel_modulo)
+
+    manejadores = []
+    if consola:
+        manejador_consola = logging.StreamHandler()
+        manejador_consola.setFormatter(logging.Formatter(FORMATO_CONSOLA))
+        manejadores.append(manejador_consola)
+    if archivo:
+        manejador_archivo = logging.FileHandler(archivo, encoding="utf-8")
+        manejador_archivo.setFormatter(FormateadorJSON())
+        manejadores.append(manejador_archivo)
+    en_cola(raiz, *manejadores)
+
+def detener_registro():
+    """Escribe lo que quede en las colas y desconecta los manejadores (se ejecuta también al salir)."""
+    global _configurado
+    with _lock:
+        escuchas = list(_escuchas)
+        _escuchas.clear()
+        _configurado = False
+    for logger, escucha in escuchas:
+        escucha.stop()
+        for manejador in list(logger.handlers):
+            if isinstance(manejador, ManejadorCola):
+                logger.removeHandler(manejador)
+        for manejador in escucha.handlers:
+            manejador.close()